@@ -0,0 +1,30 @@
+"""add_admin_counters
+
+Revision ID: abababababab
+Revises: ffffffffffff
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'abababababab'
+down_revision = 'ffffffffffff'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Materialized admin KPI counters (filled by core.admin_counters.reconcile)
+    op.create_table(
+        'admin_counters',
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('value', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('admin_counters')
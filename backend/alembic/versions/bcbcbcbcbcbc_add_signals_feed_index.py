@@ -0,0 +1,31 @@
+"""add_signals_feed_index
+
+Revision ID: bcbcbcbcbcbc
+Revises: abababababab
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bcbcbcbcbcbc'
+down_revision = 'abababababab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset cursor for GET /signals: saved rows ordered by (timestamp, id)
+    op.create_index(
+        'ix_signals_feed',
+        'signals',
+        ['timestamp', 'id'],
+        postgresql_where=sa.text('is_saved = 1'),
+        sqlite_where=sa.text('is_saved = 1'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_signals_feed', table_name='signals')
@@ -0,0 +1,41 @@
+"""add_notification_outbox
+
+Revision ID: cccccccccccc
+Revises: bbbbbbbbbbbb
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cccccccccccc'
+down_revision = 'bbbbbbbbbbbb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Transactional outbox for push / telegram delivery (written with the signal insert)
+    op.create_table(
+        'notification_outbox',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('signal_id', sa.Integer(), sa.ForeignKey('signals.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('channel', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=True, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('claimed_by', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('available_at', sa.DateTime(), nullable=True),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_outbox_status_available', 'notification_outbox', ['status', 'available_at'])
+
+
+def downgrade():
+    op.drop_index('ix_outbox_status_available', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
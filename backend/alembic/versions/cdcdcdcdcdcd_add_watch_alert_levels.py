@@ -0,0 +1,44 @@
+"""add_watch_alert_levels
+
+Revision ID: cdcdcdcdcdcd
+Revises: bcbcbcbcbcbc
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cdcdcdcdcdcd'
+down_revision = 'bcbcbcbcbcbc'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = [
+    sa.Column('strategy_id', sa.String(), nullable=True),
+    sa.Column('side', sa.String(), nullable=True),
+    sa.Column('trigger_price', sa.Float(), nullable=True),
+    sa.Column('distance_atr', sa.Float(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True, server_default='PENDING'),
+    sa.Column('fired_at', sa.DateTime(), nullable=True),
+    sa.Column('last_check_at', sa.DateTime(), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=True),
+]
+
+
+def upgrade():
+    # Price-level alert fields used by routers/alerts and services/alerts_checker
+    existing = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('watch_alerts')}
+    for col in COLUMNS:
+        if col.name not in existing:
+            op.add_column('watch_alerts', col)
+    op.create_index('ix_watch_alerts_status', 'watch_alerts', ['status'])
+
+
+def downgrade():
+    op.drop_index('ix_watch_alerts_status', table_name='watch_alerts')
+    for col in reversed(COLUMNS):
+        op.drop_column('watch_alerts', col.name)
@@ -0,0 +1,25 @@
+"""add_signal_emitted_at
+
+Revision ID: cececececece
+Revises: cdcdcdcdcdcd
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cececececece'
+down_revision = 'cdcdcdcdcdcd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Real emission time: the evaluator scans from here, not from the snapped bar open
+    op.add_column('signals', sa.Column('emitted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('signals', 'emitted_at')
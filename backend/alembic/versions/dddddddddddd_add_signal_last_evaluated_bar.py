@@ -0,0 +1,25 @@
+"""add_signal_last_evaluated_bar
+
+Revision ID: dddddddddddd
+Revises: cccccccccccc
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dddddddddddd'
+down_revision = 'cccccccccccc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Candle-path evaluator progress: open ts of the last closed bar already scanned
+    op.add_column('signals', sa.Column('last_evaluated_bar_ts', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('signals', 'last_evaluated_bar_ts')
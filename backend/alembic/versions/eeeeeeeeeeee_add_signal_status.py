@@ -0,0 +1,50 @@
+"""add_signal_status
+
+Revision ID: eeeeeeeeeeee
+Revises: dddddddddddd
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'eeeeeeeeeeee'
+down_revision = 'dddddddddddd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Lifecycle status: OPEN / WATCH -> CLOSED
+    op.add_column(
+        'signals',
+        sa.Column('status', sa.String(), nullable=False, server_default='OPEN'),
+    )
+
+    # Backfill from existing evaluations / watchlist sources
+    op.execute(
+        "UPDATE signals SET status = 'CLOSED' "
+        "WHERE id IN (SELECT signal_id FROM signal_evaluations WHERE signal_id IS NOT NULL)"
+    )
+    op.execute(
+        "UPDATE signals SET status = 'WATCH' "
+        "WHERE status = 'OPEN' AND LOWER(source) LIKE '%watchlist%'"
+    )
+
+    # Evaluator hot query only touches non-closed rows
+    op.create_index(
+        'ix_signals_open_timestamp',
+        'signals',
+        ['timestamp'],
+        postgresql_where=sa.text("status <> 'CLOSED'"),
+        sqlite_where=sa.text("status <> 'CLOSED'"),
+    )
+    op.create_index('ix_signals_token_timestamp', 'signals', ['token', 'timestamp'])
+
+
+def downgrade():
+    op.drop_index('ix_signals_token_timestamp', table_name='signals')
+    op.drop_index('ix_signals_open_timestamp', table_name='signals')
+    op.drop_column('signals', 'status')
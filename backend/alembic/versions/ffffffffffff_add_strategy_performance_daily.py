@@ -0,0 +1,39 @@
+"""add_strategy_performance_daily
+
+Revision ID: ffffffffffff
+Revises: eeeeeeeeeeee
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ffffffffffff'
+down_revision = 'eeeeeeeeeeee'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Incremental per-day strategy rollup (fill with tools/rebuild_strategy_rollups.py)
+    op.create_table(
+        'strategy_performance_daily',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('strategy_id', sa.String(), nullable=False),
+        sa.Column('token', sa.String(), nullable=False),
+        sa.Column('timeframe', sa.String(), nullable=False),
+        sa.Column('day', sa.String(), nullable=False),
+        sa.Column('wins', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('losses', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('breakeven', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sum_r', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('strategy_id', 'token', 'timeframe', 'day', name='uq_strategy_perf_day'),
+    )
+
+
+def downgrade():
+    op.drop_table('strategy_performance_daily')
@@ -0,0 +1,207 @@
+# backend/core/admin_counters.py
+"""
+Materialized counters for the admin KPI endpoint (/admin/stats).
+
+`admin_counters` holds one row per counter (name -> value). The write paths
+bump counters in the SAME transaction as the change:
+
+- user registration        -> user_created()
+- plan changes             -> plan_changed()  (self-service, admin, Stripe)
+- signal insert / delete   -> signals_created() / signal_deleted()
+- signal hide / unhide     -> signal_hidden_changed()
+
+Rolling 24h numbers use hourly buckets (`users_created:YYYYMMDDHH`,
+`signals_created:YYYYMMDDHH`); the last 24 buckets plus the current hour
+are summed (hour granularity).
+
+`reconcile()` recomputes everything with COUNT queries and prunes old
+buckets. It runs periodically from the scheduler
+(ADMIN_COUNTERS_RECONCILE_SECONDS) and on first read of an empty table, so
+write paths that bypass the helpers (scripts, manual SQL) self-heal.
+"""
+
+from __future__ import annotations
+
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from core.cache import cache
+
+RECONCILE_SECONDS = int(os.getenv("ADMIN_COUNTERS_RECONCILE_SECONDS", "900"))
+SNAPSHOT_TTL = int(os.getenv("ADMIN_STATS_TTL", "15"))
+SNAPSHOT_KEY = "admin:stats"
+
+USERS_TOTAL = "users_total"
+SIGNALS_TOTAL = "signals_total"
+SIGNALS_HIDDEN = "signals_hidden"
+USERS_PLAN = "users_plan:"
+USERS_CREATED = "users_created:"
+SIGNALS_CREATED = "signals_created:"
+
+# Buckets older than this are pruned on reconcile
+BUCKET_RETENTION_HOURS = 48
+
+# Prices updated per user request (Jan 2026)
+PRICE_TRADER = 49
+PRICE_PRO = 149
+
+
+def _hour(ts: Optional[datetime]) -> str:
+    return (ts or datetime.utcnow()).strftime("%Y%m%d%H")
+
+
+# === Write side (caller's transaction, no commit) ===
+def incr(db, deltas: Dict[str, int]) -> None:
+    """value = value + delta por contador (upsert atómico)."""
+    from models_db import AdminCounter
+
+    rows = [{"name": k, "value": v, "updated_at": datetime.utcnow()} for k, v in deltas.items() if v]
+    if not rows:
+        return
+
+    table = AdminCounter.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"value": table.c.value + stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+        )
+        db.execute(stmt, rows)
+        return
+
+    for r in rows:
+        counter = db.get(AdminCounter, r["name"], with_for_update=True)
+        if counter is None:
+            db.add(AdminCounter(**r))
+        else:
+            counter.value = (counter.value or 0) + r["value"]
+            counter.updated_at = r["updated_at"]
+    db.flush()
+
+
+def user_created(db, user) -> None:
+    incr(
+        db,
+        {
+            USERS_TOTAL: 1,
+            USERS_PLAN + (user.plan or "FREE").upper(): 1,
+            USERS_CREATED + _hour(user.created_at): 1,
+        },
+    )
+
+
+def plan_changed(db, old_plan: Optional[str], new_plan: Optional[str]) -> None:
+    old_plan = (old_plan or "FREE").upper()
+    new_plan = (new_plan or "FREE").upper()
+    if old_plan == new_plan:
+        return
+    incr(db, {USERS_PLAN + old_plan: -1, USERS_PLAN + new_plan: 1})
+
+
+def signals_created(db, timestamps: Iterable[Optional[datetime]]) -> None:
+    deltas: Dict[str, int] = defaultdict(int)
+    for ts in timestamps:
+        deltas[SIGNALS_TOTAL] += 1
+        deltas[SIGNALS_CREATED + _hour(ts)] += 1
+    incr(db, deltas)
+
+
+def signal_deleted(db, signal) -> None:
+    deltas = {SIGNALS_TOTAL: -1}
+    if signal.is_hidden:
+        deltas[SIGNALS_HIDDEN] = -1
+    if signal.timestamp:
+        deltas[SIGNALS_CREATED + _hour(signal.timestamp)] = -1
+    incr(db, deltas)
+
+
+def signal_hidden_changed(db, was_hidden: Any, is_hidden: Any) -> None:
+    if bool(was_hidden) == bool(is_hidden):
+        return
+    incr(db, {SIGNALS_HIDDEN: 1 if is_hidden else -1})
+
+
+# === Read side ===
+def snapshot(db, use_cache: bool = True) -> Dict[str, Any]:
+    """KPIs del admin dashboard: una lectura de `admin_counters` (cacheada)."""
+    if use_cache:
+        cached = cache.get(SNAPSHOT_KEY)
+        if cached is not None:
+            return cached
+
+    from models_db import AdminCounter
+
+    counters = {name: value or 0 for name, value in db.query(AdminCounter.name, AdminCounter.value).all()}
+    if not counters:
+        reconcile(db)
+        counters = {name: value or 0 for name, value in db.query(AdminCounter.name, AdminCounter.value).all()}
+
+    now = datetime.utcnow()
+    first_hour = _hour(now - timedelta(hours=24))
+
+    def last_24h(prefix: str) -> int:
+        return sum(v for k, v in counters.items() if k.startswith(prefix) and k[len(prefix):] >= first_hour)
+
+    plans = {k[len(USERS_PLAN):]: v for k, v in counters.items() if k.startswith(USERS_PLAN)}
+    count_trader = plans.get("TRADER", 0)
+    count_pro = plans.get("PRO", 0)
+
+    data = {
+        "total_users": counters.get(USERS_TOTAL, 0),
+        "users_24h": last_24h(USERS_CREATED),
+        "active_plans": sum(v for p, v in plans.items() if "PRO" in p),  # PRO or OWNER likely
+        "hidden_signals": counters.get(SIGNALS_HIDDEN, 0),
+        "total_signals": counters.get(SIGNALS_TOTAL, 0),
+        "signals_24h": last_24h(SIGNALS_CREATED),
+        "system_status": "ONLINE (Scheduler Active)",  # Placeholder until health check integration
+        "mrr": (count_trader * PRICE_TRADER) + (count_pro * PRICE_PRO),
+        "last_updated": now.isoformat(),
+    }
+    cache.set(SNAPSHOT_KEY, data, ttl=SNAPSHOT_TTL)
+    return data
+
+
+# === Reconciliation ===
+def reconcile(db) -> Dict[str, int]:
+    """
+    Recalcula todos los contadores desde las tablas fuente y los reemplaza.
+    Commits. Returns the fresh counters.
+    """
+    from sqlalchemy import func
+
+    from models_db import AdminCounter, Signal, User
+
+    since = datetime.utcnow() - timedelta(hours=BUCKET_RETENTION_HOURS)
+    since = since.replace(minute=0, second=0, microsecond=0)
+
+    counters: Dict[str, int] = defaultdict(int)
+    counters[USERS_TOTAL] = db.query(func.count(User.id)).scalar() or 0
+    counters[SIGNALS_TOTAL] = db.query(func.count(Signal.id)).scalar() or 0
+    counters[SIGNALS_HIDDEN] = db.query(func.count(Signal.id)).filter(Signal.is_hidden == 1).scalar() or 0
+
+    for plan, n in db.query(User.plan, func.count(User.id)).group_by(User.plan).all():
+        counters[USERS_PLAN + (plan or "FREE").upper()] += n
+
+    # Hourly buckets (only the retention window is scanned)
+    for (created_at,) in db.query(User.created_at).filter(User.created_at >= since):
+        counters[USERS_CREATED + _hour(created_at)] += 1
+    for (ts,) in db.query(Signal.timestamp).filter(Signal.timestamp >= since):
+        counters[SIGNALS_CREATED + _hour(ts)] += 1
+
+    now = datetime.utcnow()
+    db.query(AdminCounter).delete(synchronize_session=False)
+    db.bulk_insert_mappings(
+        AdminCounter, [{"name": k, "value": v, "updated_at": now} for k, v in counters.items()]
+    )
+    db.commit()
+    cache.delete(SNAPSHOT_KEY)
+    print(f"[ADMIN] Counters reconciled ({len(counters)} rows)")
+    return dict(counters)
@@ -0,0 +1,166 @@
+# backend/core/alert_index.py
+"""
+In-memory price-level index of PENDING watch alerts.
+
+Per token, two arrays sorted by (trigger_price, alert_id):
+
+- LONG  fires when price >= trigger -> the crossed alerts are a prefix
+- SHORT fires when price <= trigger -> the crossed alerts are a suffix
+
+`pop_crossed(token, high, low)` finds the boundary with a binary search and
+cuts it out. Alerts whose level was already reached are never left in the arrays,
+so whatever the new price crosses (since the previous one) is exactly the
+slice returned: cost O(log n + triggered), not O(pending).
+
+Kept in sync by:
+- routers.alerts: create -> add(), cancel / delete -> discard()
+- services.alerts_checker: expire -> discard(), trigger -> pop_crossed()
+- sync(db): picks up alerts created by other workers (id > last seen) and
+  does a full rebuild every ALERT_INDEX_REBUILD_SECONDS (cancellations made
+  elsewhere). Popped alerts are always re-read from the DB before firing.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+REBUILD_SECONDS = float(os.getenv("ALERT_INDEX_REBUILD_SECONDS", "300"))
+
+Level = Tuple[float, int]  # (trigger_price, alert_id)
+
+
+class _Book:
+    __slots__ = ("long", "short")
+
+    def __init__(self) -> None:
+        self.long: List[Level] = []
+        self.short: List[Level] = []
+
+    def side(self, side: str) -> List[Level]:
+        return self.long if side == "LONG" else self.short
+
+
+class AlertLevelIndex:
+    def __init__(self, rebuild_seconds: float = REBUILD_SECONDS):
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.Lock()
+        self._books: Dict[str, _Book] = {}
+        self._where: Dict[int, Tuple[str, str, float]] = {}  # alert_id -> (token, side, trigger)
+        self._max_id = 0
+        self._built_at: Optional[float] = None
+
+    # === Mutations ===
+    def add(self, alert: Any) -> bool:
+        """Indexes a PENDING alert (anything with id/token/side/trigger_price)."""
+        side = (alert.side or "").upper()
+        if side not in ("LONG", "SHORT") or alert.trigger_price is None or alert.id is None:
+            return False
+        if (getattr(alert, "status", None) or "PENDING") != "PENDING":
+            return False
+
+        token = (alert.token or "").upper()
+        trigger = float(alert.trigger_price)
+        with self._lock:
+            if alert.id in self._where:
+                return False
+            book = self._books.get(token)
+            if book is None:
+                book = self._books[token] = _Book()
+            insort(book.side(side), (trigger, alert.id))
+            self._where[alert.id] = (token, side, trigger)
+            self._max_id = max(self._max_id, alert.id)
+        return True
+
+    def discard(self, alert_id: int) -> bool:
+        with self._lock:
+            where = self._where.pop(alert_id, None)
+            if where is None:
+                return False
+            token, side, trigger = where
+            levels = self._books[token].side(side)
+            i = bisect_left(levels, (trigger, alert_id))
+            if i < len(levels) and levels[i] == (trigger, alert_id):
+                del levels[i]
+            self._drop_empty(token)
+        return True
+
+    def discard_many(self, alert_ids: Iterable[int]) -> int:
+        return sum(1 for a in alert_ids if self.discard(a))
+
+    def pop_crossed(self, token: str, price: float, low: Optional[float] = None) -> List[int]:
+        """
+        Removes and returns the ids of the alerts whose level was reached.
+        With a range (price feed tick): LONG checks `price` (the high), SHORT `low`.
+        """
+        token = (token or "").upper()
+        low = price if low is None else low
+        with self._lock:
+            book = self._books.get(token)
+            if book is None or not price or price <= 0 or not low or low <= 0:
+                return []
+            i = bisect_right(book.long, (price, math.inf))
+            j = bisect_left(book.short, (low, -math.inf))
+            crossed = book.long[:i] + book.short[j:]
+            del book.long[:i]
+            del book.short[j:]
+            for _, alert_id in crossed:
+                self._where.pop(alert_id, None)
+            self._drop_empty(token)
+        return [alert_id for _, alert_id in crossed]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._books.clear()
+            self._where.clear()
+            self._max_id = 0
+            self._built_at = None
+
+    # === DB sync ===
+    def sync(self, db, force: bool = False) -> int:
+        """
+        Full rebuild when stale (or forced), otherwise loads only the PENDING
+        alerts newer than the last indexed id. Returns alerts added.
+        """
+        from models_db import WatchAlert
+
+        rebuild = force or self._built_at is None or (time.monotonic() - self._built_at) >= self.rebuild_seconds
+        q = db.query(WatchAlert.id, WatchAlert.token, WatchAlert.side,
+                     WatchAlert.trigger_price, WatchAlert.status).filter(WatchAlert.status == "PENDING")
+        if not rebuild:
+            q = q.filter(WatchAlert.id > self._max_id)
+        rows = q.all()
+
+        if rebuild:
+            self.clear()
+        added = sum(1 for r in rows if self.add(r))
+        if rebuild:
+            self._built_at = time.monotonic()
+        return added
+
+    # === Introspection ===
+    def tokens(self) -> List[str]:
+        with self._lock:
+            return list(self._books)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, alert_id: int) -> bool:
+        return alert_id in self._where
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"alerts": len(self._where), "tokens": len(self._books), "max_id": self._max_id}
+
+    def _drop_empty(self, token: str) -> None:
+        book = self._books.get(token)
+        if book is not None and not book.long and not book.short:
+            del self._books[token]
+
+
+alert_index = AlertLevelIndex()
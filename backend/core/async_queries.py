@@ -0,0 +1,66 @@
+# backend/core/async_queries.py
+"""
+Hot queries for async endpoints, without blocking the event loop.
+
+Each query is written once as a plain function of a sync `Session`:
+
+- async engine available -> `AsyncSession.run_sync(fn)` (asyncpg / aiosqlite,
+  the DB round trips are awaited)
+- in-memory SQLite / ASYNC_DB_DISABLED -> `run_in_threadpool` with a sync
+  session (see database.async_db_enabled)
+
+Results are detached when returned: load what the caller needs inside `fn`.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+
+T = TypeVar("T")
+
+
+def _sync_session():
+    from database import SessionLocal
+
+    return SessionLocal()
+
+
+def _async_sessionmaker():
+    from database import async_db_enabled, get_async_sessionmaker
+
+    return get_async_sessionmaker() if async_db_enabled() else None
+
+
+async def run(fn: Callable[[Any], T]) -> T:
+    """Runs `fn(session)` on the async engine (or the threadpool fallback)."""
+    factory = _async_sessionmaker()
+    if factory is not None:
+        async with factory() as session:
+            return await session.run_sync(fn)
+
+    def _call():
+        db = _sync_session()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+
+    return await run_in_threadpool(_call)
+
+
+# === Queries ===
+def _user_by_email(db, email: str):
+    from sqlalchemy import select
+
+    from models_db import User
+
+    user = db.execute(select(User).where(User.email == email)).scalars().first()
+    if user is not None:
+        db.expunge(user)
+    return user
+
+
+async def user_by_email(email: str):
+    return await run(lambda db: _user_by_email(db, email))
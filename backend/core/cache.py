@@ -75,6 +75,17 @@ class CacheService:
         if len(self._memory_storage) > 1000:
             self._cleanup()
 
+    def delete(self, key: str):
+        # 1. Redis
+        if self.redis_client:
+            try:
+                self.redis_client.delete(key)
+            except Exception as e:
+                print(f"[CACHE] Redis DELETE Error: {e}")
+
+        # 2. Memory
+        self._memory_storage.pop(key, None)
+
     def _cleanup(self):
         now = time.time()
         keys_to_del = [k for k, v in self._memory_storage.items() if now > v[1]]
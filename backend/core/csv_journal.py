@@ -0,0 +1,321 @@
+# backend/core/csv_journal.py
+"""
+Write-behind journal for the CSV logs (signals, evaluations, legacy log_row).
+
+Callers enqueue rows and return immediately. A background writer thread:
+
+- drains the queue in batches and groups rows per file,
+- keeps file handles open (bounded) and writes the header only for new/empty files,
+- fsyncs dirty files every CSV_JOURNAL_FSYNC_SECONDS,
+- optionally rotates a file when it exceeds CSV_JOURNAL_MAX_BYTES (0 = off,
+  the default), or at day change when CSV_JOURNAL_ROTATE_DAILY=true (old
+  segment -> {stem}.{YYYYMMDD}[.n].csv),
+- flushes everything on shutdown (atexit + FastAPI shutdown hook).
+
+The API and the scheduler run one journal each on the same files: writes
+and rotations take an exclusive flock on `{file}.lock`, and a handle whose
+file was rotated by the other process is reopened before writing.
+
+The CSV format is unchanged: same csv.DictWriter, same headers, same paths.
+Readers of these files must call `csv_journal.flush()` first so queued rows
+are on disk, and read `segments(path)` (rotated segments + live file) when
+rotation is enabled.
+"""
+
+from __future__ import annotations
+
+import atexit
+import csv
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev setups only
+    fcntl = None
+
+FSYNC_SECONDS = float(os.getenv("CSV_JOURNAL_FSYNC_SECONDS", "5"))
+MAX_BYTES = int(os.getenv("CSV_JOURNAL_MAX_BYTES", "0"))
+ROTATE_DAILY = os.getenv("CSV_JOURNAL_ROTATE_DAILY", "false").lower() in ("1", "true", "yes")
+MAX_OPEN_FILES = int(os.getenv("CSV_JOURNAL_MAX_OPEN_FILES", "64"))
+BATCH_SIZE = 500
+
+
+def segments(path: Union[str, Path]) -> List[Path]:
+    """Rotated segments of `path` (oldest first) followed by the live file, if they exist."""
+    path = Path(path)
+    pattern = re.compile(rf"^{re.escape(path.stem)}\.(\d{{8}})(?:\.(\d+))?{re.escape(path.suffix)}$")
+    rotated = []
+    if path.parent.exists():
+        for p in path.parent.iterdir():
+            m = pattern.match(p.name)
+            if m:
+                rotated.append(((m.group(1), int(m.group(2) or 0)), p))
+    out = [p for _, p in sorted(rotated)]
+    if path.exists():
+        out.append(path)
+    return out
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Exclusive cross-process lock for writes / rotation of `path`."""
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+class _OpenFile:
+    __slots__ = ("handle", "fieldnames", "day", "dirty")
+
+    def __init__(self, handle, fieldnames: List[str], day: str):
+        self.handle = handle
+        self.fieldnames = fieldnames
+        self.day = day
+        self.dirty = False
+
+
+class CsvJournal:
+    def __init__(
+        self,
+        fsync_seconds: float = FSYNC_SECONDS,
+        max_bytes: int = MAX_BYTES,
+        rotate_daily: bool = ROTATE_DAILY,
+        max_open_files: int = MAX_OPEN_FILES,
+    ):
+        self.fsync_seconds = fsync_seconds
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.max_open_files = max(1, max_open_files)
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._files: "OrderedDict[Path, _OpenFile]" = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._last_fsync = time.monotonic()
+        self._stats = {"rows": 0, "batches": 0, "rotations": 0, "errors": 0}
+
+    # --- Public API ---
+    def append(
+        self,
+        path: Union[str, Path],
+        fieldnames: Sequence[str],
+        rows: Union[Dict[str, Any], List[Dict[str, Any]]],
+    ) -> None:
+        """Encola filas para `path` (no bloquea)."""
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not rows:
+            return
+        self._ensure_started()
+        self._queue.put((Path(path), list(fieldnames), list(rows)))
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Bloquea hasta que todo lo encolado antes de esta llamada esté en disco."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Flush + cierra handles (shutdown)."""
+        if self._thread is not None and self._thread.is_alive():
+            self.flush()
+        self._close_all()
+
+    def stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        s["queue_depth"] = self._queue.qsize()
+        s["open_files"] = len(self._files)
+        return s
+
+    # --- Writer thread ---
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="csv-journal", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.fsync_seconds)
+            except queue.Empty:
+                self._fsync_dirty()
+                continue
+
+            batch = [item]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._write_batch(batch)
+
+            if time.monotonic() - self._last_fsync >= self.fsync_seconds:
+                self._fsync_dirty()
+
+    def _write_batch(self, batch: List[Any]) -> None:
+        grouped: Dict[Path, List[Any]] = defaultdict(list)
+        order: List[Path] = []
+
+        for item in batch:
+            if isinstance(item, threading.Event):
+                # Barrier: write everything queued so far before releasing it
+                self._write_grouped(grouped, order)
+                grouped.clear()
+                order.clear()
+                self._fsync_dirty()
+                item.set()
+                continue
+            path, fieldnames, rows = item
+            if path not in grouped:
+                order.append(path)
+            grouped[path].append((fieldnames, rows))
+
+        self._write_grouped(grouped, order)
+        self._stats["batches"] += 1
+
+    def _write_grouped(self, grouped: Dict[Path, List[Any]], order: List[Path]) -> None:
+        for path in order:
+            try:
+                with _file_lock(path):
+                    for fieldnames, rows in grouped[path]:
+                        # Per group: one bad append must not drop the others queued for this file
+                        try:
+                            of = self._handle_for(path, fieldnames)
+                            # Columns follow the file's header; keys it doesn't have are dropped
+                            writer = csv.DictWriter(of.handle, fieldnames=of.fieldnames, extrasaction="ignore")
+                            writer.writerows(rows)
+                            of.handle.flush()
+                            of.dirty = True
+                            self._stats["rows"] += len(rows)
+                        except Exception as e:
+                            self._stats["errors"] += 1
+                            print(f"[CSV] ❌ Journal write error ({path}, {len(rows)} rows): {e}")
+            except Exception as e:
+                self._stats["errors"] += 1
+                print(f"[CSV] ❌ Journal lock error ({path}): {e}")
+
+    # --- File handles / rotation (caller holds _file_lock(path)) ---
+    def _handle_for(self, path: Path, fieldnames: List[str]) -> _OpenFile:
+        today = datetime.utcnow().strftime("%Y%m%d")
+        of = self._files.get(path)
+
+        if of is not None and not self._is_live(path, of):
+            # Rotated by the other process: our handle points at the old segment
+            self._close_file(path)
+            of = None
+
+        if of is not None:
+            needs_rotation = (self.rotate_daily and of.day != today) or (
+                self.max_bytes and path.stat().st_size >= self.max_bytes
+            )
+            if needs_rotation:
+                self._close_file(path)
+                self._rotate(path, of.day)
+                of = None
+            else:
+                self._files.move_to_end(path)
+
+        if of is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.exists() and path.stat().st_size > 0:
+                day = datetime.utcfromtimestamp(path.stat().st_mtime).strftime("%Y%m%d")
+                if (self.rotate_daily and day != today) or (
+                    self.max_bytes and path.stat().st_size >= self.max_bytes
+                ):
+                    self._rotate(path, day)
+
+            is_new = not path.exists() or path.stat().st_size == 0
+            header = list(fieldnames) if is_new else self._read_header(path) or list(fieldnames)
+            handle = path.open("a", newline="", encoding="utf-8")
+            of = _OpenFile(handle, header, today)
+            if is_new:
+                csv.DictWriter(handle, fieldnames=of.fieldnames).writeheader()
+                of.dirty = True
+            self._files[path] = of
+
+            while len(self._files) > self.max_open_files:
+                oldest = next(iter(self._files))
+                self._close_file(oldest)
+
+        return of
+
+    @staticmethod
+    def _read_header(path: Path) -> List[str]:
+        with path.open("r", newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), [])
+
+    @staticmethod
+    def _is_live(path: Path, of: _OpenFile) -> bool:
+        try:
+            return os.fstat(of.handle.fileno()).st_ino == path.stat().st_ino
+        except OSError:
+            return False
+
+    def _rotate(self, path: Path, day: str) -> None:
+        target = path.with_name(f"{path.stem}.{day}{path.suffix}")
+        n = 1
+        while target.exists():
+            target = path.with_name(f"{path.stem}.{day}.{n}{path.suffix}")
+            n += 1
+        try:
+            path.rename(target)
+            self._stats["rotations"] += 1
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"[CSV] ❌ Journal rotation error ({path}): {e}")
+
+    def _fsync_dirty(self) -> None:
+        for of in list(self._files.values()):
+            if not of.dirty:
+                continue
+            try:
+                of.handle.flush()
+                os.fsync(of.handle.fileno())
+                of.dirty = False
+            except Exception as e:
+                self._stats["errors"] += 1
+                print(f"[CSV] ❌ Journal fsync error: {e}")
+        self._last_fsync = time.monotonic()
+
+    def _close_file(self, path: Path) -> None:
+        of = self._files.pop(path, None)
+        if of is None:
+            return
+        try:
+            of.handle.flush()
+            os.fsync(of.handle.fileno())
+        except Exception:
+            pass
+        finally:
+            of.handle.close()
+
+    def _close_all(self) -> None:
+        for path in list(self._files.keys()):
+            self._close_file(path)
+
+
+csv_journal = CsvJournal()
+atexit.register(csv_journal.close)
@@ -0,0 +1,59 @@
+# backend/core/dashboard_cache.py
+"""
+Per-user cache for the /stats/dashboard payload (summary + chart).
+
+Stored in the shared cache layer (core.cache: Redis when REDIS_URL is set,
+in-memory otherwise) under `stats:dashboard:{user_id}`.
+
+Writers that change a user's numbers call `invalidate(user_ids)`:
+- evaluations: core.signal_evaluator, evaluated_logger
+- saved / owned signals: accept, track, toggle_save, delete, log_signal
+
+The TTL (DASHBOARD_CACHE_TTL, default 60s) bounds staleness for anything
+not invalidated explicitly, e.g. the rolling 24h / 7d windows or another
+process without a shared Redis.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Iterable, Optional
+
+from core.cache import cache
+
+DASHBOARD_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "60"))
+PREFIX = "stats:dashboard"
+
+# Stats del proceso (no compartidos entre workers)
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _key(user_id: int) -> str:
+    return f"{PREFIX}:{user_id}"
+
+
+def get(user_id: int) -> Optional[Dict[str, Any]]:
+    payload = cache.get(_key(user_id))
+    if payload is None:
+        _stats["misses"] += 1
+    else:
+        _stats["hits"] += 1
+    return payload
+
+
+def put(user_id: int, payload: Dict[str, Any]) -> None:
+    cache.set(_key(user_id), payload, ttl=DASHBOARD_TTL)
+
+
+def invalidate(user_ids: Iterable[Optional[int]]) -> None:
+    """Borra el dashboard cacheado de estos usuarios (ignora None / system)."""
+    for user_id in {u for u in user_ids if u is not None}:
+        cache.delete(_key(user_id))
+        _stats["invalidations"] += 1
+
+
+def stats() -> Dict[str, Any]:
+    s = dict(_stats)
+    total = s["hits"] + s["misses"]
+    s["hit_ratio"] = round(s["hits"] / total, 4) if total else 0.0
+    return s
@@ -1,4 +1,5 @@
-﻿from typing import List, Dict, TypedDict, Optional, Literal
+﻿from functools import lru_cache
+from typing import FrozenSet, List, Dict, Tuple, TypedDict, Optional, Literal
 from models_db import User
 from datetime import datetime
 from sqlalchemy.orm import Session # For quota
@@ -66,29 +67,34 @@ def get_plan_entitlements(plan: str) -> PlanEntitlements:
         norm_plan = "TRIAL"
     return PLANS[norm_plan]
 
-def get_user_entitlements(user: Optional[User]) -> Dict[str, List[StrategyOffering]]:
+def _effective_plan(user: Optional[User]) -> Tuple[str, bool]:
+    """(effective plan, is_trial_expired) for a user; the memo key for its entitlements."""
+    if not user:
+        return "TRIAL", False
+
+    effective_plan = (user.plan or "TRIAL").upper()
+    if effective_plan in ["FREE", "LITE", "SWINGLITE"]:
+        effective_plan = "TRADER"
+    if effective_plan in ["SWINGPRO", "PREMIUM"]:
+        effective_plan = "PRO"
+
+    is_trial_expired = False
+    if effective_plan == "TRIAL" or (user.plan or "").upper() == "FREE":
+         if user.plan_expires_at and user.plan_expires_at < datetime.utcnow():
+             is_trial_expired = True
+    return effective_plan, is_trial_expired
+
+
+@lru_cache(maxsize=64)
+def _plan_offerings(
+    effective_plan: str, is_trial_expired: bool
+) -> Tuple[Tuple[StrategyOffering, ...], Tuple[StrategyOffering, ...]]:
     """
-    Returns the offerings for a specific user, calculating locks and trial expiration.
-    Returns: { "offerings": [...], "locked_offerings": [...] }
+    Offerings for a plan, built once per (plan, expired) and memoized.
+    PLANS is static config: restart to pick up changes (or cache_clear()).
     """
     offerings: List[StrategyOffering] = []
     locked_offerings: List[StrategyOffering] = []
-    
-    # 1. Determine Effective Plan
-    if not user:
-        effective_plan = "TRIAL"
-        is_trial_expired = False
-    else:
-        effective_plan = (user.plan or "TRIAL").upper()
-        if effective_plan in ["FREE", "LITE", "SWINGLITE"]:
-            effective_plan = "TRADER"
-        if effective_plan in ["SWINGPRO", "PREMIUM"]:
-            effective_plan = "PRO"
-        
-        is_trial_expired = False
-        if effective_plan == "TRIAL" or (user.plan or "").upper() == "FREE":
-             if user.plan_expires_at and user.plan_expires_at < datetime.utcnow():
-                 is_trial_expired = True
 
     # 2. Get Entitlements for User's Plan
     my_entitlements = get_plan_entitlements(effective_plan)
@@ -141,7 +147,36 @@ def get_user_entitlements(user: Optional[User]) -> Dict[str, List[StrategyOfferi
                     "locked": True, "locked_reason": "UPGRADE_REQUIRED", "plan_required": "PRO", "badges": ["PRO"]
                 })
 
-    return { "offerings": offerings, "locked_offerings": locked_offerings }
+    return tuple(offerings), tuple(locked_offerings)
+
+
+@lru_cache(maxsize=64)
+def _plan_allowed_pairs(effective_plan: str, is_trial_expired: bool) -> FrozenSet[Tuple[str, str]]:
+    offerings, _ = _plan_offerings(effective_plan, is_trial_expired)
+    return frozenset((t, off["timeframe"]) for off in offerings for t in off["tokens"])
+
+
+def get_user_entitlements(user: Optional[User]) -> Dict[str, List[StrategyOffering]]:
+    """
+    Returns the offerings for a specific user, calculating locks and trial expiration.
+    Returns: { "offerings": [...], "locked_offerings": [...] }
+    Memoized per plan; callers get shallow copies they can enrich (e.g. "stats").
+    """
+    offerings, locked_offerings = _plan_offerings(*_effective_plan(user))
+    return {
+        "offerings": [dict(o) for o in offerings],
+        "locked_offerings": [dict(o) for o in locked_offerings],
+    }
+
+
+def allowed_pairs(user: Optional[User]) -> FrozenSet[Tuple[str, str]]:
+    """Frozen set of (token, timeframe) the user can currently use (active offerings only)."""
+    return _plan_allowed_pairs(*_effective_plan(user))
+
+
+def is_pair_allowed(user: Optional[User], token: str, timeframe: str) -> bool:
+    """O(1): does an active offering cover this token + timeframe?"""
+    return (token, timeframe) in allowed_pairs(user)
 
 
 # === COMPATIBILITY LAYER (Legacy Exports) ===
@@ -186,34 +221,17 @@ def can_use_advisor(user: User) -> bool:
 
 def check_and_increment_quota(db: Session, user: User, feature: str) -> int:
     """
-    Stub for legacy quota check. 
-    Ideally this logic should stay in core/limiter or similar but was here.
-    For now, return arbitrary usage number or just pass.
+    +1 al uso diario de `feature` y devuelve el total del día.
+    Un solo round trip atómico (Redis INCR o upsert ... RETURNING), ver core.quota_counters.
+    Advisor uses this.
     """
-    # Simply return 1 to allow logic to proceed without crashing,
-    # or implementing real DB check if tables exist.
-    # Advisor uses this.
     try:
-         from models_db import DailyUsage
-         now_date = datetime.utcnow().strftime("%Y-%m-%d")
-         usage = db.query(DailyUsage).filter(
-             DailyUsage.user_id == user.id, 
-             DailyUsage.feature == feature,
-             DailyUsage.date == now_date
-         ).first()
-         
-         if not usage:
-             usage = DailyUsage(user_id=user.id, feature=feature, date=now_date, count=0)
-             db.add(usage)
-         
-         usage.count += 1
-         db.commit()
-         return usage.count
-         
-    except ImportError:
-        return 1
-    except Exception:
+        from core import quota_counters
+        return quota_counters.increment(db, user.id, feature)
+    except Exception as e:
         # DB error fallback
+        print(f"[QUOTA] Counter failed for user {user.id} / {feature}: {e}")
+        db.rollback()
         return 1
 
 def assert_token_allowed(user: User, token: str) -> str:
@@ -222,7 +240,6 @@ def assert_token_allowed(user: User, token: str) -> str:
     Returns normalized token.
     """
     norm_token = token.upper().strip()
-    ent = get_user_entitlements(user)
     
     # Check if any active offering covers this token
     # or just check base allowed tokens directly?
@@ -231,10 +248,7 @@ def assert_token_allowed(user: User, token: str) -> str:
     # But wait, User entitlements might be locked.
     # The 'offerings' list contains what is ACTIVE.
     
-    active_tokens = set()
-    for off in ent["offerings"]:
-        for t in off["tokens"]:
-            active_tokens.add(t)
+    active_tokens = {t for t, _ in allowed_pairs(user)}
             
     if norm_token not in active_tokens:
         # Fallback: maybe it's allowed for the plan but 
@@ -0,0 +1,199 @@
+# backend/core/evaluation_memo.py
+"""
+Bar-keyed memo for strategy evaluations.
+
+The LITE engine (/analysis/lite) and the scheduler evaluate the same
+(strategy, params, token, timeframe) over and over while the bar has not
+changed. Every user asking for BTC 4h with the system default configs
+triggers identical work.
+
+This module memoizes those evaluations in the shared cache layer
+(core.cache: Redis when REDIS_URL is set, in-memory otherwise), keyed by:
+
+    evalmemo:{strategy_id}:{config_hash}:{TOKEN}:{tf}:{data_key}:{section}
+
+`data_key` identifies the candles actually evaluated: open timestamp and
+close of the LAST candle (`data_key()`). Strategies evaluate the forming
+bar, so every new price in it is a new key (a mid-bar breakout is not
+missed) while identical data is computed once. `config_hash` is taken from
+the parameters the strategy instance actually runs with
+(`strategy_config()`), so the scheduler and LITE share entries.
+
+Sections hold the pieces each caller needs ("signals", "state",
+"watchlist"). Old entries are never read again and expire by TTL (one
+bar). Without candles (failed fetch) there is no key and nothing is
+cached: an empty result there means "no data", not "no setup".
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from core.cache import cache
+
+MEMO_PREFIX = "evalmemo"
+
+# Stats del proceso (no compartidos entre workers)
+_stats = {"hits": 0, "misses": 0}
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    """'1h' / '4H' / '1d' / '15m' -> segundos. Fallback: 1h."""
+    match = re.match(r"(\d+)([mhd])", (timeframe or "").strip().lower())
+    if not match:
+        return 3600
+    val = int(match.group(1))
+    unit = match.group(2)
+    return val * {"m": 60, "h": 3600, "d": 86400}[unit]
+
+
+def _ts_ms(value: Any) -> Optional[int]:
+    """Normaliza timestamps de velas (ms int, datetime, pd.Timestamp) a ms."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if hasattr(value, "timestamp"):
+        try:
+            return int(value.timestamp() * 1000)
+        except Exception:
+            return None
+    return None
+
+
+def last_closed_bar_ts(
+    timeframe: str,
+    candles: Optional[List[Dict[str, Any]]] = None,
+    now: Optional[float] = None,
+) -> int:
+    """
+    Open timestamp (ms) of the last CLOSED bar.
+
+    If candles are given (dicts with 'timestamp'), the last candle whose close
+    time is <= now wins. Otherwise the bar is derived from the clock, aligned
+    to UTC epoch boundaries (same alignment exchanges use for 1h/4h/1d).
+    """
+    now_s = time.time() if now is None else now
+    tf_ms = timeframe_seconds(timeframe) * 1000
+    now_ms = int(now_s * 1000)
+
+    if candles:
+        for candle in reversed(candles):
+            ts = _ts_ms(candle.get("timestamp"))
+            if ts is not None and ts + tf_ms <= now_ms:
+                return ts
+
+    return (now_ms // tf_ms) * tf_ms - tf_ms
+
+
+def data_key(candles: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+    """'{last_ts}:{last_close}' of the candles a strategy evaluates; None without data."""
+    if not candles:
+        return None
+    last = candles[-1]
+    ts = _ts_ms(last.get("timestamp"))
+    if ts is None or last.get("close") is None:
+        return None
+    return f"{ts}:{float(last['close'])!r}"
+
+
+def strategy_config(strategy: Any) -> Dict[str, Any]:
+    """
+    Parameters a strategy instance actually runs with. Registry instances
+    ignore configs they don't accept, so the raw config_json is not a key.
+    """
+    cfg = getattr(strategy, "config", None)
+    if isinstance(cfg, dict):
+        return cfg
+    return {
+        k: v for k, v in vars(strategy).items()
+        if not k.startswith("_") and isinstance(v, (int, float, str, bool, type(None)))
+    }
+
+
+def config_hash(config: Optional[Dict[str, Any]]) -> str:
+    """Hash estable de los parámetros de la estrategia (orden de claves irrelevante)."""
+    raw = json.dumps(config or {}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def memo_key(
+    strategy_id: str,
+    config: Optional[Dict[str, Any]],
+    token: str,
+    timeframe: str,
+    bar_key: Any,
+) -> str:
+    return (
+        f"{MEMO_PREFIX}:{strategy_id}:{config_hash(config)}:"
+        f"{token.upper()}:{timeframe.lower()}:{bar_key}"
+    )
+
+
+def memoize(
+    strategy_id: str,
+    config: Optional[Dict[str, Any]],
+    token: str,
+    timeframe: str,
+    bar_key: Any,
+    section: str,
+    compute: Callable[[], Any],
+    variant: Optional[Dict[str, Any]] = None,
+) -> Any:
+    """
+    Returns the memoized value for this evaluation section, computing and
+    storing it on a miss. `bar_key` is `data_key(candles)`; None (no data)
+    computes without caching. `variant` distinguishes calls with different
+    scan parameters (e.g. relaxed watchlist thresholds).
+
+    Values must be JSON-serializable (they may live in Redis). Exceptions
+    raised by `compute` are not cached.
+    """
+    if bar_key is None:
+        _stats["misses"] += 1
+        return compute()
+
+    key = f"{memo_key(strategy_id, config, token, timeframe, bar_key)}:{section}"
+    if variant:
+        key += f":{config_hash(variant)}"
+
+    cached = cache.get(key)
+    if cached is not None and "v" in cached:
+        _stats["hits"] += 1
+        return copy.deepcopy(cached["v"])
+
+    _stats["misses"] += 1
+    value = compute()
+    # Wrapped so empty results ([], {}) are also cache hits.
+    cache.set(key, {"v": value}, ttl=timeframe_seconds(timeframe))
+    return copy.deepcopy(value)
+
+
+def signal_to_dict(sig: Any) -> Dict[str, Any]:
+    """Serializa un Signal (pydantic) a dict JSON-friendly para el memo."""
+    if hasattr(sig, "model_dump"):
+        return sig.model_dump(mode="json")
+    if isinstance(sig, dict):
+        return json.loads(json.dumps(sig, default=str))
+    raise TypeError(f"Unsupported signal type: {type(sig)}")
+
+
+def signal_from_dict(data: Dict[str, Any]):
+    """Reconstruye un core.schemas.Signal desde el memo."""
+    from core.schemas import Signal
+
+    return Signal.model_validate(data)
+
+
+def stats() -> Dict[str, Any]:
+    total = _stats["hits"] + _stats["misses"]
+    return {
+        "hits": _stats["hits"],
+        "misses": _stats["misses"],
+        "hit_ratio": round(_stats["hits"] / total, 4) if total else 0.0,
+    }
@@ -0,0 +1,230 @@
+# backend/core/idempotency_filter.py
+"""
+In-process idempotency filter in front of the `signals` table.
+
+The scheduler re-emits the same signal (same strategy|TOKEN|tf|ts|direction|
+user|mode key) every cycle until the bar changes. The DB unique index on
+`signals.idempotency_key` rejects those duplicates, but only after a round
+trip.
+
+This filter keeps recently persisted keys in memory:
+
+    key -> Bloom front --(no)--> NEW (go to DB insert, which stays the arbiter)
+                 |
+               (maybe)
+                 v
+           exact LRU set --(yes)--> SEEN (drop, no DB round trip)
+                 |
+                (no: evicted key or Bloom false positive)
+                 v
+           exact DB check (caller, batched)
+
+It is warmed at startup from the last N days of `signals.idempotency_key`.
+Per-process state: a filter miss never drops a signal, so several workers
+with different contents stay correct.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List
+
+SEEN = "seen"
+MAYBE = "maybe"
+NEW = "new"
+
+DEFAULT_CAPACITY = int(os.getenv("IDEMPOTENCY_FILTER_SIZE", "100000"))
+DEFAULT_WARM_DAYS = int(os.getenv("IDEMPOTENCY_WARM_DAYS", "3"))
+
+
+class BloomFilter:
+    """Bloom filter simple (bytearray + double hashing sobre blake2b)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class IdempotencyFilter:
+    """
+    Bounded exact LRU set of idempotency keys with a Bloom front.
+
+    The Bloom filter is rebuilt from the LRU set once it has absorbed
+    2x capacity inserts, so evicted keys don't saturate it forever.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = max(1, capacity)
+        self._lock = threading.Lock()
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+        self._bloom = BloomFilter(self.capacity * 2)
+        self._bloom_inserts = 0
+        self._stats = {
+            "lookups": 0,
+            "bloom_negative": 0,
+            "exact_hits": 0,
+            "db_checks": 0,
+            "db_confirmed": 0,
+        }
+
+    # --- Core ---
+    def check(self, key: str) -> str:
+        """NEW (definitely not seen here), SEEN (exact hit) or MAYBE (ask the DB)."""
+        with self._lock:
+            self._stats["lookups"] += 1
+            if key not in self._bloom:
+                self._stats["bloom_negative"] += 1
+                return NEW
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                self._stats["exact_hits"] += 1
+                return SEEN
+            self._stats["db_checks"] += 1
+            return MAYBE
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self._add_locked(key)
+
+    def add_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._add_locked(key)
+
+    def _add_locked(self, key: str) -> None:
+        if not key:
+            return
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return
+        self._keys[key] = None
+        if len(self._keys) > self.capacity:
+            self._keys.popitem(last=False)
+        self._bloom.add(key)
+        self._bloom_inserts += 1
+        if self._bloom_inserts > self.capacity * 2:
+            self._rebuild_bloom_locked()
+
+    def _rebuild_bloom_locked(self) -> None:
+        self._bloom = BloomFilter(self.capacity * 2)
+        for key in self._keys:
+            self._bloom.add(key)
+        self._bloom_inserts = len(self._keys)
+
+    def record_db_confirmed(self, count: int = 1) -> None:
+        """Filter said MAYBE and the DB confirmed the key exists."""
+        with self._lock:
+            self._stats["db_confirmed"] += count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+            self._bloom = BloomFilter(self.capacity * 2)
+            self._bloom_inserts = 0
+            for k in self._stats:
+                self._stats[k] = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    # --- Warm-up ---
+    def warm(self, db, days: int = DEFAULT_WARM_DAYS) -> int:
+        """Carga las keys de las señales de los últimos `days` días. Retorna cuántas."""
+        from models_db import Signal as SignalDB
+
+        since = datetime.utcnow() - timedelta(days=days)
+        rows = (
+            db.query(SignalDB.idempotency_key)
+            .filter(SignalDB.timestamp >= since, SignalDB.idempotency_key.isnot(None))
+            .order_by(SignalDB.timestamp.desc(), SignalDB.id.desc())
+            .limit(self.capacity)
+            .all()
+        )
+        # Newest keys (most likely to be re-emitted) win the capacity; inserted
+        # oldest first so the LRU evicts the oldest
+        self.add_many(r[0] for r in reversed(rows))
+        print(f"[IDEMPOTENCY] Warmed filter with {len(rows)} keys (last {days}d)")
+        return len(rows)
+
+    # --- Metrics ---
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            size = len(self._keys)
+        lookups = s["lookups"]
+        s["size"] = size
+        s["capacity"] = self.capacity
+        # Hit = duplicate dropped without touching the DB
+        s["hit_ratio"] = round(s["exact_hits"] / lookups, 4) if lookups else 0.0
+        s["false_positives"] = s["db_checks"] - s["db_confirmed"]
+        return s
+
+
+def split_known(keys: List[str], db=None) -> Dict[str, str]:
+    """
+    Clasifica keys contra el filtro global con fallback exacto a DB para MAYBE.
+
+    Returns:
+        {key: SEEN | NEW}. SEEN = ya persistida (drop). NEW = intentar INSERT.
+    """
+    result: Dict[str, str] = {}
+    maybe: List[str] = []
+    for key in keys:
+        verdict = idempotency_filter.check(key)
+        if verdict == MAYBE:
+            maybe.append(key)
+        else:
+            result[key] = verdict
+
+    if maybe:
+        from models_db import Signal as SignalDB
+
+        own_session = db is None
+        if own_session:
+            from database import SessionLocal
+
+            db = SessionLocal()
+        try:
+            existing = {
+                r[0]
+                for r in db.query(SignalDB.idempotency_key)
+                .filter(SignalDB.idempotency_key.in_(maybe))
+                .all()
+            }
+        except Exception as e:
+            print(f"[IDEMPOTENCY] DB fallback failed: {e}")
+            existing = set()
+        finally:
+            if own_session:
+                db.close()
+
+        idempotency_filter.record_db_confirmed(len(existing))
+        idempotency_filter.add_many(existing)
+        for key in maybe:
+            result[key] = SEEN if key in existing else NEW
+
+    return result
+
+
+idempotency_filter = IdempotencyFilter()
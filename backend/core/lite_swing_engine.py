@@ -21,6 +21,8 @@ import json
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 from core.market_data_api import get_ohlcv_data
+from market_data.resample import resampled_ohlcv
+from core import evaluation_memo
 
 from sqlalchemy.orm import Session
 
@@ -228,12 +230,18 @@ def build_lite_swing_signal(
         if raw_candles_prefetched:
              raw_candles = raw_candles_prefetched
         else:
-             raw_candles = get_ohlcv_data(token_u, timeframe, limit=350)
+             raw_candles = resampled_ohlcv(token_u, timeframe, 350) or get_ohlcv_data(token_u, timeframe, limit=350)
     except Exception as e:
         print(f"Error pre-fetching data: {e}")
         raw_candles = []
 
     context = {"data": {token_u: raw_candles}} if raw_candles else {}
+    tf_ccxt = _to_ccxt_tf(timeframe)
+
+    # Memo key: the candles evaluated (last candle ts + close). Same data + same
+    # params => same evaluation, shared across users, the scheduler (and workers
+    # when Redis is configured). No candles -> no key, nothing cached.
+    bar_key = evaluation_memo.data_key(raw_candles)
 
     # 2) Execute strategies
     per_strategy: List[Dict[str, Any]] = []
@@ -254,11 +262,20 @@ def build_lite_swing_signal(
             strat_state = {}
             if hasattr(strat, "analyze_state"):
                 try:
-                    strat_state = strat.analyze_state(token_u, _to_ccxt_tf(timeframe))
+                    strat_state = evaluation_memo.memoize(
+                        sid, evaluation_memo.strategy_config(strat), token_u, tf_ccxt, bar_key, "state",
+                        lambda: strat.analyze_state(token_u, tf_ccxt),
+                    )
                 except Exception as e:
                     print(f"Error extracting state from {sid}: {e}")
 
-            signals = strat.generate_signals([token_u], _to_ccxt_tf(timeframe), context=context)
+            signals = evaluation_memo.memoize(
+                sid, evaluation_memo.strategy_config(strat), token_u, tf_ccxt, bar_key, "signals",
+                lambda: [
+                    evaluation_memo.signal_to_dict(s)
+                    for s in strat.generate_signals([token_u], tf_ccxt, context=context)
+                ],
+            )
             if not signals:
                 per_strategy.append({
                     "strategy_id": sid,
@@ -269,8 +286,8 @@ def build_lite_swing_signal(
                 continue
 
             sig = signals[0]
-            direction = str(sig.direction).lower().strip()
-            confidence = float(sig.confidence or 0.0)
+            direction = str(sig.get("direction")).lower().strip()
+            confidence = float(sig.get("confidence") or 0.0)
 
             # Normalize
             if direction not in {"long", "short"}:
@@ -289,10 +306,10 @@ def build_lite_swing_signal(
                     "has_setup": True,
                     "direction": direction,
                     "confidence": confidence,
-                    "entry": float(sig.entry),
-                    "tp": float(sig.tp) if sig.tp else 0.0,
-                    "sl": float(sig.sl) if sig.sl else 0.0,
-                    "rationale": str(sig.rationale or "").strip(),
+                    "entry": float(sig["entry"]),
+                    "tp": float(sig["tp"]) if sig.get("tp") else 0.0,
+                    "sl": float(sig["sl"]) if sig.get("sl") else 0.0,
+                    "rationale": str(sig.get("rationale") or "").strip(),
                     "state": strat_state
                 }
             )
@@ -332,11 +349,18 @@ def build_lite_swing_signal(
                         try:
                             # Looser params for On-Demand "Weak Signal" checking
                             # We want to show SOMETHING if the user asks.
-                            w_items = strat.analyze_watchlist(
-                                token_u, timeframe, context=context, 
-                                near_atr=3.0,  # Relaxed from 1.5
-                                near_cross=0.08, # Relaxed from 0.03
-                                near_pct=0.03 # Relaxed from 0.015 (MeanReversion)
+                            relaxed = {
+                                "near_atr": 3.0,  # Relaxed from 1.5
+                                "near_cross": 0.08,  # Relaxed from 0.03
+                                "near_pct": 0.03,  # Relaxed from 0.015 (MeanReversion)
+                            }
+                            w_items = evaluation_memo.memoize(
+                                sid, evaluation_memo.strategy_config(strat), token_u, tf_ccxt, bar_key,
+                                "watchlist",
+                                lambda: strat.analyze_watchlist(
+                                    token_u, timeframe, context=context, **relaxed
+                                ),
+                                variant=relaxed,
                             )
                             if w_items:
                                 all_watch_items.extend(w_items)
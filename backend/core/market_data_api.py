@@ -7,7 +7,7 @@ Refactorizado para usar CCXT (Binance) para consistencia con Trading Lab.
 import ccxt
 import time
 import concurrent.futures
-from typing import List, Dict, Any, Optional, Tuple, Union
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 from datetime import datetime
 from core.cache import cache  # Importar Cache
 
@@ -124,6 +124,81 @@ def get_ohlcv_data(
     return []
 
 
+RANGE_EXCHANGES = ("binance", "bybit", "kucoin")
+
+
+def get_ohlcv_since(
+    symbol: str,
+    timeframe: str,
+    since_ms: int,
+    max_candles: int = 2000,
+    exchanges: Optional[Sequence[str]] = None,
+    return_source: bool = False,
+) -> Union[List[Dict[str, Any]], Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """
+    Rango OHLCV desde `since_ms` hasta ahora (paginado, una sola pasada por token).
+    Usado por el evaluador batch. Exchanges en orden de prioridad (sin race:
+    el rango debe venir entero de la misma fuente); `exchanges` restringe la
+    lista (p.ej. a la fuente de una serie ya guardada). return_source=True ->
+    (candles, exchange id o None).
+    """
+    timeframe = timeframe.lower()
+    base_symbol = symbol.upper().replace("USDT", "").replace("-", "")
+    ccxt_symbol = f"{base_symbol}/USDT"
+    exchanges = tuple(exchanges or RANGE_EXCHANGES)
+
+    # Cache corto por rango (mismo token/tf/since/fuentes en el mismo ciclo)
+    cache_key = f"ohlcv_since:{base_symbol}:{timeframe}:{since_ms}:{','.join(exchanges)}"
+    cached_data = cache.get(cache_key)
+    if isinstance(cached_data, dict) and cached_data.get("candles"):
+        if return_source:
+            return cached_data["candles"], cached_data["source"]
+        return cached_data["candles"]
+
+    for ex_id in exchanges:
+        try:
+            exchange = getattr(ccxt, ex_id)({"enableRateLimit": True, "timeout": 10000})
+            tf_ms = exchange.parse_timeframe(timeframe) * 1000
+            cursor = since_ms
+            raw: List[List[float]] = []
+            while len(raw) < max_candles:
+                page = exchange.fetch_ohlcv(ccxt_symbol, timeframe, since=cursor, limit=1000)
+                if not page:
+                    break
+                raw.extend(c for c in page if not raw or c[0] > raw[-1][0])
+                next_cursor = page[-1][0] + tf_ms
+                if next_cursor <= cursor or next_cursor > time.time() * 1000:
+                    break
+                cursor = next_cursor
+
+            if not raw:
+                continue
+
+            ohlcv = [
+                {
+                    "timestamp": c[0],
+                    "time": datetime.fromtimestamp(c[0] / 1000).strftime("%Y-%m-%d %H:%M"),
+                    "open": float(c[1]),
+                    "high": float(c[2]),
+                    "low": float(c[3]),
+                    "close": float(c[4]),
+                    "volume": float(c[5]),
+                }
+                for c in raw[:max_candles]
+            ]
+            cache.set(cache_key, {"candles": ohlcv, "source": ex_id}, ttl=60)
+            if return_source:
+                return ohlcv, ex_id
+            return ohlcv
+        except Exception as e:
+            print(f"[MARKET DATA] ⚠️ Range fetch failed on {ex_id}: {e}")
+            continue
+
+    if return_source:
+        return [], None
+    return []
+
+
 def generate_mock_ohlcv(symbol: str, limit: int = 100) -> List[Dict[str, Any]]:
     """Generates synthetic OHLCV data for testing/fallback."""
     import random
@@ -164,76 +239,57 @@ def generate_mock_ohlcv(symbol: str, limit: int = 100) -> List[Dict[str, Any]]:
     return data
 
 
+# Market board: symbols the price oracle keeps refreshed for /market/summary
+# (default watchlist; supported tokens are always tracked).
+MARKET_BOARD_SYMBOLS = ["BTC", "ETH", "SOL", "BNB", "XRP", "ADA", "DOGE", "AVAX"]
+
+
 def get_market_summary(symbols: List[str]) -> List[Dict[str, Any]]:
     """
     Obtiene precio y cambio 24h para múltiples símbolos.
-    """
-    # 1. Cache Check (Strict)
-    s_key = "-".join(sorted(symbols))
-    cache_key = f"market:summary:{hash(s_key)}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
-
-    # 2. Try Fetch with Fallbacks
-    exchanges_config = [
-        {"id": "binance", "class": ccxt.binance},
-        {"id": "kucoin", "class": ccxt.kucoin},
-        {"id": "bybit", "class": ccxt.bybit},
-        {"id": "kraken", "class": ccxt.kraken}, # Kraken often reliable in US/EU
-    ]
 
-    unique_syms = list(set([s.upper().replace("USDT", "").replace("-", "") for s in symbols]))
-    # Pairs format might differ slightly per exchange, but "BTC/USDT" is fairly standard. 
-    # Some exchanges need specific handling if strictly needed, but CCXT handles most "/"
-    pairs = [f"{s}/USDT" for s in unique_syms]
+    Assembled from the market board (core.price_oracle: one per-symbol
+    structure, refreshed by its background job, shared across workers under
+    a fixed cache key). With the refresher running there is no network I/O
+    here; without it the oracle refreshes on read. Symbols not yet on the
+    board are added and show up from the next refresh.
+    """
+    from core.price_oracle import normalize_symbol, price_oracle
 
-    for cfg in exchanges_config:
-        ex_id = cfg["id"]
-        try:
-            exchange = cfg["class"]({
-                "enableRateLimit": True,
-                "timeout": 4000
-            })
-            
-            # Special handling for Kraken pairs if needed (often XBT/USD or similar), 
-            # but let's stick to standard USDT pairs for crypto-to-crypto exchanges.
-            # If Kraken fails on USDT pairs, loop continues.
-            
-            tickers = exchange.fetch_tickers(pairs)
-            
-            summary = []
-            for p in pairs:
-                t = tickers.get(p)
-                # Some exchanges return different keys, but CCXT standardizes most.
-                if t:
-                    change = t.get("percentage")
-                    if change is None and t.get("open") and t["open"] > 0:
-                        change = ((t["last"] - t["open"]) / t["open"]) * 100
-                    
-                    summary.append({
-                        "symbol": p.replace("/USDT", ""),
-                        "price": t["last"],
-                        "change_24h": change or 0.0
-                    })
-            
-            if summary:
-                # 3. Set Cache: 15s TTL
-                cache.set(cache_key, summary, ttl=15)
-                # print(f"[MARKET] Got summary from {ex_id}")
-                return summary
+    wanted = list(dict.fromkeys(normalize_symbol(s) for s in symbols if s))
+    read = price_oracle.peek_many if price_oracle.running else price_oracle.get_many
+    quotes = read(wanted)
 
-        except Exception as e:
-            print(f"[MARKET] Failed to fetch summary from {ex_id}: {e}")
+    summary = []
+    for sym in wanted:
+        q = quotes.get(sym)
+        if q is None:
             continue
-
-    return []
+        summary.append({
+            "symbol": sym,
+            "price": q.price,
+            "change_24h": q.change_24h or 0.0,
+            "age_s": round(q.age_seconds(), 3),
+            "stale": q.stale,
+        })
+    return summary
 
 
 def get_current_price(symbol: str) -> Optional[float]:
     """
     Obtiene el precio actual de un símbolo.
+    Served by core.price_oracle (one batched fetch_tickers for all symbols);
+    the one-bar OHLCV race is only the fallback for symbols it can't quote
+    (or whose quote is stale).
     """
+    from core.price_oracle import price_oracle
+
+    try:
+        price = price_oracle.price(symbol)
+        if price:
+            return price
+    except Exception as e:
+        print(f"[MARKET DATA] Price oracle failed for {symbol}: {e}")
     try:
         data = get_ohlcv_data(symbol, limit=1)
         if data:
@@ -0,0 +1,267 @@
+# backend/core/notification_outbox.py
+"""
+Transactional notification outbox.
+
+Signal writers (core.signal_logger) add outbox rows in the SAME transaction
+as the signal INSERT, so a committed signal always has its notifications
+recorded, and signal creation never waits on push/Telegram delivery.
+
+A separate worker (outbox_worker.py) claims batches and delivers them:
+- Postgres: SELECT ... FOR UPDATE SKIP LOCKED (many workers, no double claim)
+- SQLite / others: conditional UPDATE ... WHERE status='pending' (claim token)
+
+Rows stuck in 'processing' (crashed worker) are reclaimed after
+OUTBOX_VISIBILITY_SECONDS. Sent rows are deleted after OUTBOX_RETENTION_DAYS
+(prune_sent); failed rows are kept for inspection.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+OUTBOX_ENABLED = os.getenv("NOTIFY_OUTBOX", "true").lower() in ("1", "true", "yes")
+VISIBILITY_SECONDS = int(os.getenv("OUTBOX_VISIBILITY_SECONDS", "300"))
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+
+PUSH = "push"
+TELEGRAM = "telegram"
+
+_stats_lock = threading.Lock()
+_stats = {
+    "claimed": 0,
+    "sent": 0,
+    "retried": 0,
+    "failed": 0,
+    "pruned": 0,
+    "last_batch_size": 0,
+    "last_batch_seconds": 0.0,
+    "last_lag_seconds": 0.0,
+    "max_lag_seconds": 0.0,
+    "lag_total_seconds": 0.0,
+}
+
+
+# === Payload builders (used inside the signal transaction) ===
+def push_message(signal) -> Dict[str, Any]:
+    return {
+        "title": f"New Signal: {signal.direction.upper()} {signal.token}",
+        "body": (
+            f"Entry: {signal.entry} | TP: {signal.tp} | SL: {signal.sl}\n"
+            f"Strategy: {signal.strategy_id or 'Unknown'}"
+        ),
+        "data": {"token": signal.token, "type": "signal"},
+    }
+
+
+def telegram_message(signal, plan: str) -> str:
+    return (
+        f"⚡ <b>{plan} ALERT</b>\n"
+        f"{'🟢' if signal.direction=='long' else '🔴'} <b>{signal.token} {signal.direction.upper()}</b>\n"
+        f"TF: {signal.timeframe}\n"
+        f"Entry: {signal.entry}\n"
+        f"Stop: {signal.sl}\n"
+        f"Target: {signal.tp}"
+    )
+
+
+def plan_chat_ids(db, plan: str) -> List[str]:
+    """Telegram chat ids de los usuarios del plan (incluye alias legacy)."""
+    from models_db import User
+
+    target_plans = [plan]
+    if plan == "TRADER":
+        target_plans.extend(["FREE", "LITE", "SWINGLITE"])  # Legacy compat
+    if plan == "PRO":
+        target_plans.extend(["SWINGPRO", "PREMIUM"])
+
+    return [
+        chat_id
+        for (chat_id,) in db.query(User.telegram_chat_id)
+        .filter(User.plan.in_(target_plans), User.telegram_chat_id.isnot(None))
+        .distinct()
+    ]
+
+
+def outbox_rows(signal, signal_id: int, telegram_plan: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Filas de outbox para una señal nueva (push siempre; telegram si hay plan)."""
+    now = datetime.utcnow()
+    base = {
+        "signal_id": signal_id,
+        "status": "pending",
+        "attempts": 0,
+        "created_at": now,
+        "available_at": now,
+    }
+    rows = [dict(base, channel=PUSH, payload=json.dumps(push_message(signal)))]
+    if telegram_plan:
+        rows.append(
+            dict(
+                base,
+                channel=TELEGRAM,
+                payload=json.dumps({"plan": telegram_plan, "text": telegram_message(signal, telegram_plan)}),
+            )
+        )
+    return rows
+
+
+def add_to_session(db, rows: List[Dict[str, Any]]) -> None:
+    """INSERT de las filas en la transacción abierta de `db` (sin commit)."""
+    if not rows:
+        return
+    from models_db import NotificationOutbox
+
+    db.execute(NotificationOutbox.__table__.insert(), rows)
+
+
+# === Worker side ===
+def claim_batch(db, worker_id: str, limit: int = 200) -> List[Any]:
+    """
+    Reclama hasta `limit` filas entregables y las marca 'processing'.
+    Commits the claim so other workers skip these rows.
+    """
+    from sqlalchemy import and_, or_
+
+    from models_db import NotificationOutbox as Outbox
+
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=VISIBILITY_SECONDS)
+    claimable = or_(
+        and_(Outbox.status == "pending", Outbox.available_at <= now),
+        and_(Outbox.status == "processing", Outbox.claimed_at < stale),
+    )
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        rows = (
+            db.query(Outbox)
+            .filter(claimable)
+            .order_by(Outbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for row in rows:
+            row.status = "processing"
+            row.claimed_by = worker_id
+            row.claimed_at = now
+        db.commit()
+        ids = [r.id for r in rows]
+    else:
+        # SQLite fallback: claim token via conditional UPDATE (writes are serialized)
+        candidate_ids = [
+            r[0] for r in db.query(Outbox.id).filter(claimable).order_by(Outbox.id).limit(limit).all()
+        ]
+        if not candidate_ids:
+            return []
+        claim_token = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+        db.query(Outbox).filter(Outbox.id.in_(candidate_ids), claimable).update(
+            {"status": "processing", "claimed_by": claim_token, "claimed_at": now},
+            synchronize_session=False,
+        )
+        db.commit()
+        ids = [
+            r[0]
+            for r in db.query(Outbox.id)
+            .filter(Outbox.id.in_(candidate_ids), Outbox.claimed_by == claim_token)
+            .all()
+        ]
+
+    if not ids:
+        return []
+    claimed = db.query(Outbox).filter(Outbox.id.in_(ids)).order_by(Outbox.id).all()
+    with _stats_lock:
+        _stats["claimed"] += len(claimed)
+    return claimed
+
+
+def mark_sent(db, rows: List[Any]) -> None:
+    if not rows:
+        return
+    now = datetime.utcnow()
+    lags = []
+    for row in rows:
+        row.status = "sent"
+        row.sent_at = now
+        if row.created_at:
+            lags.append((now - row.created_at).total_seconds())
+    db.commit()
+
+    with _stats_lock:
+        _stats["sent"] += len(rows)
+        if lags:
+            _stats["last_lag_seconds"] = round(max(lags), 3)
+            _stats["max_lag_seconds"] = round(max(_stats["max_lag_seconds"], max(lags)), 3)
+            _stats["lag_total_seconds"] += sum(lags)
+
+
+def mark_failed(db, rows: List[Any], error: str) -> None:
+    """Reintento con backoff exponencial; 'failed' tras MAX_ATTEMPTS."""
+    if not rows:
+        return
+    now = datetime.utcnow()
+    retried = failed = 0
+    for row in rows:
+        row.attempts = (row.attempts or 0) + 1
+        row.last_error = (error or "")[:1000]
+        row.claimed_by = None
+        if row.attempts >= MAX_ATTEMPTS:
+            row.status = "failed"
+            failed += 1
+        else:
+            row.status = "pending"
+            row.available_at = now + timedelta(seconds=min(2 ** row.attempts * 5, 600))
+            retried += 1
+    db.commit()
+    with _stats_lock:
+        _stats["retried"] += retried
+        _stats["failed"] += failed
+
+
+def prune_sent(db, older_than_days: int = RETENTION_DAYS) -> int:
+    """Borra filas 'sent' más antiguas que la retención. Retorna el número borrado."""
+    from models_db import NotificationOutbox as Outbox
+
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    n = (
+        db.query(Outbox)
+        .filter(Outbox.status == "sent", Outbox.sent_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    with _stats_lock:
+        _stats["pruned"] += n
+    return n
+
+
+def record_batch(size: int, seconds: float) -> None:
+    with _stats_lock:
+        _stats["last_batch_size"] = size
+        _stats["last_batch_seconds"] = round(seconds, 3)
+
+
+def stats(db=None) -> Dict[str, Any]:
+    """Throughput + lag (por proceso) y backlog actual (DB)."""
+    with _stats_lock:
+        s = dict(_stats)
+    s["avg_lag_seconds"] = round(s.pop("lag_total_seconds") / s["sent"], 3) if s["sent"] else 0.0
+    s["throughput_per_s"] = (
+        round(s["last_batch_size"] / s["last_batch_seconds"], 1) if s["last_batch_seconds"] else 0.0
+    )
+
+    if db is not None:
+        from sqlalchemy import func
+
+        from models_db import NotificationOutbox as Outbox
+
+        s["backlog"] = db.query(func.count(Outbox.id)).filter(Outbox.status == "pending").scalar() or 0
+        oldest = db.query(func.min(Outbox.created_at)).filter(Outbox.status == "pending").scalar()
+        s["oldest_pending_age_seconds"] = (
+            round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else 0.0
+        )
+    return s
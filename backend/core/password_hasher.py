@@ -0,0 +1,161 @@
+# backend/core/password_hasher.py
+"""
+Password hashing off the event loop and off the GIL.
+
+bcrypt costs tens to hundreds of ms of CPU per call. Hash / verify run in a
+dedicated, bounded process pool:
+
+- PASSWORD_HASH_WORKERS   processes (default min(2, cpu); 0 = inline, dev/tests)
+- PASSWORD_HASH_MAX_PENDING  jobs queued + running before callers wait
+- PASSWORD_HASH_WAIT_SECONDS how long a caller waits for a slot before 503
+- BCRYPT_ROUNDS            cost factor (default 12)
+
+`verify_and_update()` returns a new hash when the stored one was made with
+another cost (or a deprecated scheme): login rehashes transparently.
+
+Sync callers (threadpool routes) block their worker thread, not the loop;
+async callers use the `*_async` variants.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+WAIT_SECONDS = float(os.getenv("PASSWORD_HASH_WAIT_SECONDS", "10"))
+
+
+def build_context(rounds: int = BCRYPT_ROUNDS) -> CryptContext:
+    # Configure bcrypt with auto-truncation to handle 72-byte limit
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=rounds,
+        bcrypt__truncate_error=False,  # Auto-truncate passwords >72 bytes
+    )
+
+
+pwd_context = build_context()
+
+
+# === Worker functions (top-level: picklable for the process pool) ===
+def _hash(password: str, rounds: int) -> str:
+    return _context_for(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    try:
+        return _context_for(rounds).verify_and_update(password, hashed)
+    except Exception as e:
+        print(f"[SECURITY ERROR] verify_password failed: {e}")
+        return False, None
+
+
+_contexts: Dict[int, CryptContext] = {}
+
+
+def _context_for(rounds: int) -> CryptContext:
+    ctx = _contexts.get(rounds)
+    if ctx is None:
+        ctx = _contexts[rounds] = pwd_context if rounds == BCRYPT_ROUNDS else build_context(rounds)
+    return ctx
+
+
+# === Pool ===
+class PasswordHasher:
+    def __init__(self, workers: int = WORKERS, max_pending: int = MAX_PENDING,
+                 wait_seconds: float = WAIT_SECONDS, rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.wait_seconds = wait_seconds
+        self.rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "rejected": 0, "pending": 0, "max_pending_seen": 0}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: never fork a process that holds scheduler / uvicorn thread locks
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        if not self._slots.acquire(timeout=self.wait_seconds):
+            with self._lock:
+                self._stats["rejected"] += 1
+            print(f"[SECURITY] Password hasher saturated ({self.max_pending} pending)")
+            raise HTTPException(status_code=503, detail="Authentication busy, please retry")
+
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["pending"] += 1
+            self._stats["max_pending_seen"] = max(self._stats["max_pending_seen"], self._stats["pending"])
+
+        if self.workers <= 0:
+            fut: Future = Future()
+            try:
+                fut.set_result(fn(*args))
+            except Exception as e:
+                fut.set_exception(e)
+        else:
+            try:
+                fut = self._pool().submit(fn, *args)
+            except Exception:
+                self._done(None)
+                raise
+        fut.add_done_callback(self._done)
+        return fut
+
+    def _done(self, _fut) -> None:
+        with self._lock:
+            self._stats["pending"] -= 1
+            self._stats["completed"] += 1
+        self._slots.release()
+
+    # --- sync API (threadpool routes, scripts) ---
+    def hash(self, password: str) -> str:
+        return self._submit(_hash, password, self.rounds).result()
+
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return self._submit(_verify_and_update, password, hashed, self.rounds).result()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self.verify_and_update(password, hashed)[0]
+
+    # --- async API ---
+    async def hash_async(self, password: str) -> str:
+        fut = await asyncio.to_thread(self._submit, _hash, password, self.rounds)
+        return await asyncio.wrap_future(fut)
+
+    async def verify_and_update_async(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        fut = await asyncio.to_thread(self._submit, _verify_and_update, password, hashed, self.rounds)
+        return await asyncio.wrap_future(fut)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+        s.update({"workers": self.workers, "max_pending": self.max_pending, "rounds": self.rounds})
+        return s
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,318 @@
+# backend/core/price_oracle.py
+"""
+Shared last-price oracle.
+
+All supported symbols are refreshed with ONE batched `fetch_tickers(pairs)`
+per PRICE_ORACLE_REFRESH_SECONDS (exchanges in priority order until one
+answers). Reads are served from memory together with staleness metadata
+(`Quote.age_seconds()` / `Quote.stale`).
+
+The board is published in the shared cache (core.cache, Redis when
+REDIS_URL is set) under a fixed key: before fetching, a worker adopts every
+quote of the shared board that is fresher than one interval, per symbol,
+and fetches only the symbols still missing, so N workers still cost about
+one fetch_tickers per interval.
+
+Refresh: a background thread (`start()`, API startup) or, without it, on
+read when the board is older than the interval (single flight). Symbols
+outside the supported universe are added on first request and quoted from
+the next refresh (a read never triggers a fetch of its own). Once markets
+are loaded only symbols listed against USDT are tracked, and the set is
+capped at PRICE_ORACLE_MAX_SYMBOLS.
+
+Stale quotes (older than PRICE_ORACLE_STALE_SECONDS) are misses for price()
+and the callers that need a current price.
+
+Replaces: core.market_data_api.get_current_price (one-bar OHLCV race),
+the advisor's per-token price loop, rag_context's CoinGecko snapshot and
+market_data.get_price_snapshot (fetch_ticker per token).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from core.cache import cache
+from data.supported_tokens import VALID_TOKENS_FULL
+
+REFRESH_SECONDS = float(os.getenv("PRICE_ORACLE_REFRESH_SECONDS", "10"))
+STALE_SECONDS = float(os.getenv("PRICE_ORACLE_STALE_SECONDS", "60"))
+MAX_SYMBOLS = int(os.getenv("PRICE_ORACLE_MAX_SYMBOLS", "300"))
+EXCHANGES = [
+    e.strip() for e in os.getenv("PRICE_ORACLE_EXCHANGES", "binance,bybit,kucoin,kraken").split(",") if e.strip()
+]
+CACHE_KEY = "price_oracle:board"
+QUOTE = "USDT"
+
+
+def normalize_symbol(symbol: str) -> str:
+    """'btc' / 'BTCUSDT' / 'BTC-USDT' / 'BTC/USDT' -> 'BTC'."""
+    s = (symbol or "").upper().strip()
+    return s.split("/")[0].replace("-", "").removesuffix(QUOTE) or s
+
+
+@dataclass(frozen=True, slots=True)
+class Quote:
+    token: str
+    price: float
+    change_24h: Optional[float]  # %
+    volume_24h: Optional[float]  # base volume
+    exchange: str
+    ts: float  # exchange timestamp (epoch s)
+    fetched_at: float  # epoch s
+
+    def age_seconds(self, now: Optional[float] = None) -> float:
+        return max(0.0, (now if now is not None else time.time()) - self.fetched_at)
+
+    @property
+    def stale(self) -> bool:
+        return self.age_seconds() > STALE_SECONDS
+
+    def as_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d["age_s"] = round(self.age_seconds(), 3)
+        d["stale"] = self.stale
+        return d
+
+
+class PriceOracle:
+    def __init__(
+        self,
+        tokens: Optional[Iterable[str]] = None,
+        exchanges: Optional[List[str]] = None,
+        refresh_seconds: float = REFRESH_SECONDS,
+        exchange_factory=None,
+        max_symbols: int = MAX_SYMBOLS,
+    ):
+        self.tokens = list(dict.fromkeys(normalize_symbol(t) for t in (tokens or VALID_TOKENS_FULL)))
+        self._universe = set(self.tokens)  # configured: never pruned
+        self.max_symbols = max(max_symbols, len(self.tokens))
+        self.exchanges = list(exchanges or EXCHANGES)
+        self.refresh_seconds = refresh_seconds
+        self._exchange_factory = exchange_factory or self._ccxt_exchange
+        self._exchanges: Dict[str, Any] = {}
+        self._quotes: Dict[str, Quote] = {}
+        self._listed: Optional[Set[str]] = None  # bases listed vs QUOTE (last markets load)
+        self._board_at = 0.0
+        self._attempt_at = 0.0  # last refresh attempt (failed fetches back off one interval)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stats = {"reads": 0, "refreshes": 0, "fetches": 0, "fetch_errors": 0, "shared_hits": 0,
+                       "untracked": 0}
+
+    # === Reads ===
+    def get(self, symbol: str) -> Optional[Quote]:
+        return self.get_many([symbol]).get(normalize_symbol(symbol))
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Quote]:
+        """Quotes for `symbols` (normalized token -> Quote); missing ones are omitted."""
+        wanted = [normalize_symbol(s) for s in symbols]
+        self.track(wanted)
+        if not self.running and time.time() - self._attempt_at >= self.refresh_seconds:
+            self.refresh()
+        return self.peek_many(wanted)
+
+    def peek_many(self, symbols: Iterable[str]) -> Dict[str, Quote]:
+        """
+        Memory only, never fetches (request paths with the background refresher
+        running). Unknown symbols are tracked and quoted from the next refresh on.
+        """
+        wanted = [normalize_symbol(s) for s in symbols]
+        self.track(wanted)
+        with self._lock:
+            self._stats["reads"] += 1
+            return {t: self._quotes[t] for t in wanted if t in self._quotes}
+
+    def track(self, symbols: Iterable[str]) -> List[str]:
+        """
+        Adds symbols to the refresh set. Returns the ones that were new.
+        Refused: symbols not listed against QUOTE (once markets are loaded) and
+        anything past max_symbols.
+        """
+        new = []
+        with self._lock:
+            for t in dict.fromkeys(normalize_symbol(s) for s in symbols):
+                if not t or t in self.tokens:
+                    continue
+                if (self._listed is not None and t not in self._listed) or len(self.tokens) >= self.max_symbols:
+                    self._stats["untracked"] += 1
+                    continue
+                self.tokens.append(t)
+                new.append(t)
+        return new
+
+    def price(self, symbol: str) -> Optional[float]:
+        """Último precio, o None si no hay cotización o está stale."""
+        quote = self.get(symbol)
+        return quote.price if quote and not quote.stale else None
+
+    # === Refresh ===
+    def refresh(self, force: bool = False) -> int:
+        """
+        One fetch_tickers for every tracked symbol (single flight: concurrent
+        callers wait and reuse the result). Returns the number of quotes.
+        """
+        started = time.time()
+        with self._refresh_lock:
+            if not force and self._attempt_at >= started:
+                return len(self._quotes)  # refreshed while we waited
+            self._attempt_at = time.time()
+            self._count("refreshes")
+
+            missing = list(self.tokens)
+            if not force:
+                covered = self._adopt_shared()
+                missing = [t for t in missing if t not in covered]
+                if not missing:
+                    return len(self._quotes)
+
+            quotes = self._fetch(missing)
+            if not quotes:
+                return 0
+            with self._lock:
+                self._quotes.update(quotes)
+                if self._listed is not None:
+                    # Symbols tracked before markets were known and not listed: drop them
+                    drop = {t for t in self.tokens if t not in self._listed and t not in self._universe}
+                    self.tokens = [t for t in self.tokens if t not in drop]
+                    for t in drop:
+                        self._quotes.pop(t, None)
+                self._board_at = time.time()
+                board = {t: asdict(q) for t, q in self._quotes.items()}
+            try:
+                cache.set(CACHE_KEY, {"at": self._board_at, "quotes": board}, ttl=int(STALE_SECONDS))
+            except Exception as e:
+                print(f"[PRICE ORACLE] Cache publish failed: {e}")
+            return len(quotes)
+
+    def _adopt_shared(self) -> Set[str]:
+        """
+        Adopts, symbol by symbol, the shared board quotes fetched less than one
+        interval ago. Returns the tracked symbols they cover.
+        """
+        try:
+            shared = cache.get(CACHE_KEY)
+        except Exception:
+            return set()
+        if not shared:
+            return set()
+        now = time.time()
+        fresh = {
+            t: quote
+            for t, quote in ((t, Quote(**q)) for t, q in shared.get("quotes", {}).items())
+            if now - quote.fetched_at < self.refresh_seconds
+        }
+        with self._lock:
+            covered = {t for t in self.tokens if t in fresh}
+            if not covered:
+                return covered
+            for t in covered:
+                ours = self._quotes.get(t)
+                if ours is None or ours.fetched_at < fresh[t].fetched_at:
+                    self._quotes[t] = fresh[t]
+            self._board_at = max(self._board_at, shared.get("at", 0))
+            self._stats["shared_hits"] += 1
+        return covered
+
+    def _fetch(self, tokens: List[str]) -> Dict[str, Quote]:
+        for ex_id in self.exchanges:
+            try:
+                ex = self._exchange(ex_id)
+                # Unlisted pairs would fail the whole batch (BadSymbol); markets are cached by ccxt
+                markets = ex.load_markets()
+                listed = {m.split("/")[0] for m in markets if m.endswith(f"/{QUOTE}")}
+                with self._lock:
+                    self._listed = listed
+                pairs = [f"{t}/{QUOTE}" for t in tokens if t in listed]
+                tickers = ex.fetch_tickers(pairs) if pairs else {}
+            except Exception as e:
+                self._count("fetch_errors")
+                print(f"[PRICE ORACLE] fetch_tickers failed on {ex_id}: {e}")
+                continue
+            self._count("fetches")
+            now = time.time()
+            quotes = {}
+            for sym, t in (tickers or {}).items():
+                quote = _quote(sym, t, ex_id, now)
+                if quote is not None:
+                    quotes[quote.token] = quote
+            if quotes:
+                return quotes
+        return {}
+
+    def _exchange(self, ex_id: str):
+        ex = self._exchanges.get(ex_id)
+        if ex is None:
+            ex = self._exchanges[ex_id] = self._exchange_factory(ex_id)
+        return ex
+
+    @staticmethod
+    def _ccxt_exchange(ex_id: str):
+        import ccxt
+
+        return getattr(ccxt, ex_id)({"enableRateLimit": True, "timeout": 5000})
+
+    # === Background refresher ===
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="price-oracle", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[PRICE ORACLE] Refresh failed: {e}")
+            self._stop.wait(self.refresh_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            s["symbols"] = len(self.tokens)
+            s["quotes"] = len(self._quotes)
+            s["board_age_s"] = round(time.time() - self._board_at, 3) if self._board_at else None
+        s["background"] = self.running
+        return s
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+
+def _quote(symbol: str, ticker: Dict[str, Any], exchange: str, now: float) -> Optional[Quote]:
+    last = ticker.get("last")
+    if not last or last <= 0:
+        return None
+    change = ticker.get("percentage")
+    if change is None and ticker.get("open"):
+        change = (last - ticker["open"]) / ticker["open"] * 100
+    volume = ticker.get("baseVolume")
+    ts_ms = ticker.get("timestamp")
+    return Quote(
+        token=normalize_symbol(symbol),
+        price=float(last),
+        change_24h=float(change) if change is not None else None,
+        volume_24h=float(volume) if volume is not None else None,
+        exchange=exchange,
+        ts=ts_ms / 1000 if ts_ms else now,
+        fetched_at=now,
+    )
+
+
+price_oracle = PriceOracle()
@@ -0,0 +1,129 @@
+# backend/core/principal_cache.py
+"""
+Short-TTL cache of authenticated principals for get_current_user_async.
+
+A JWT is looked up by its signature (HMAC over header + claims, so it
+identifies the token); the entry holds the user id and a slim, immutable
+snapshot of the user row (`Principal`). On a hit neither the JWT decode nor
+the `SELECT ... WHERE email = ...` runs.
+
+Entries live PRINCIPAL_CACHE_TTL seconds (default 30) and never outlive the
+token's own `exp`. Writers that change snapshot fields call
+`invalidate(user_id)`:
+- plan: routers.billing, routers.webhooks, admin + self-service plan updates
+- telegram / timezone: routers.auth_new
+
+In-process (per worker) on purpose: it's on every request's path, a shared
+Redis round trip would cost about as much as the DB lookup it replaces. The
+TTL bounds staleness in the other workers.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+
+PRINCIPAL_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX", "10000"))
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Read-only view of the user for read-only routes (no password hash, no session)."""
+
+    id: int
+    email: str
+    name: Optional[str] = None
+    role: Optional[str] = None
+    plan: Optional[str] = None
+    plan_status: Optional[str] = None
+    plan_expires_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    telegram_chat_id: Optional[str] = None
+    telegram_username: Optional[str] = None
+    timezone: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: Any) -> "Principal":
+        return cls(**{f: getattr(user, f, None) for f in cls.__dataclass_fields__})
+
+
+def _signature(token: str) -> str:
+    return token.rsplit(".", 1)[-1]
+
+
+class PrincipalCache:
+    def __init__(self, ttl: float = PRINCIPAL_TTL, max_entries: int = MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, Principal]] = {}
+        self._by_user: Dict[int, Set[str]] = {}
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def get(self, token: str) -> Optional[Principal]:
+        sig = _signature(token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(sig)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._drop(sig, entry[1].id)
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, token: str, principal: Principal, token_exp: Optional[float] = None) -> None:
+        """token_exp: the JWT `exp` (epoch seconds); the entry never outlives it."""
+        ttl = self.ttl
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+
+        sig = _signature(token)
+        with self._lock:
+            if len(self._entries) >= self.max_entries and sig not in self._entries:
+                # Oldest insertion first (dicts keep insertion order)
+                old_sig, (_, old) = next(iter(self._entries.items()))
+                self._drop(old_sig, old.id)
+                self._stats["evictions"] += 1
+            self._entries[sig] = (time.monotonic() + ttl, principal)
+            self._by_user.setdefault(principal.id, set()).add(sig)
+
+    def invalidate(self, user_id: Optional[int]) -> None:
+        if user_id is None:
+            return
+        with self._lock:
+            for sig in self._by_user.pop(user_id, set()):
+                self._entries.pop(sig, None)
+            self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            s["entries"] = len(self._entries)
+        total = s["hits"] + s["misses"]
+        s["hit_ratio"] = round(s["hits"] / total, 4) if total else 0.0
+        return s
+
+    def _drop(self, sig: str, user_id: int) -> None:
+        self._entries.pop(sig, None)
+        sigs = self._by_user.get(user_id)
+        if sigs is not None:
+            sigs.discard(sig)
+            if not sigs:
+                del self._by_user[user_id]
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,280 @@
+# backend/core/push_dispatcher.py
+"""
+Bulk Web Push dispatcher.
+
+notify.send_push_notification used to load every PushSubscription and call
+webpush() serially for every new signal, blocking the scheduler. This
+dispatcher:
+
+- caches the subscription list in memory. It reloads when a cheap
+  (count, max id) probe changes or when invalidate() is called on subscribe.
+- coalesces signals enqueued within PUSH_COALESCE_SECONDS into ONE
+  notification per subscriber and delivery window.
+- delivers with a bounded thread pool (PUSH_MAX_WORKERS) sharing one
+  pooled requests.Session.
+- removes 404/410 (gone) subscriptions with one DELETE per window.
+- keeps delivery metrics (sent/failed/removed, deliveries/s).
+
+Endpoints are plain HTTPS URLs, so tests can point subscriptions at a local
+fake push service.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+MAX_WORKERS = int(os.getenv("PUSH_MAX_WORKERS", "16"))
+COALESCE_SECONDS = float(os.getenv("PUSH_COALESCE_SECONDS", "5"))
+SUBS_PROBE_SECONDS = float(os.getenv("PUSH_SUBS_PROBE_SECONDS", "60"))
+PUSH_TIMEOUT = float(os.getenv("PUSH_TIMEOUT_SECONDS", "10"))
+NOT_CONFIGURED = "Missing VAPID_PRIVATE_KEY"
+MAX_BODY_LINES = 4
+
+# (id, endpoint, p256dh, auth)
+Subscription = Tuple[int, str, str, str]
+
+
+class PushDispatcher:
+    def __init__(
+        self,
+        max_workers: int = MAX_WORKERS,
+        window_seconds: float = COALESCE_SECONDS,
+        probe_seconds: float = SUBS_PROBE_SECONDS,
+        session_factory=None,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.window_seconds = window_seconds
+        self.probe_seconds = probe_seconds
+        self._session_factory = session_factory
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self._http.mount("https://", adapter)
+        self._http.mount("http://", adapter)
+
+        # Subscription cache
+        self._subs: Optional[List[Subscription]] = None
+        self._subs_fingerprint: Optional[Tuple[int, int]] = None
+        self._subs_checked_at = 0.0
+        self._subs_lock = threading.Lock()
+
+        # Coalescing window
+        self._pending: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._deliver_lock = threading.Lock()
+
+        self._stats = {
+            "windows": 0,
+            "notifications": 0,
+            "coalesced_signals": 0,
+            "sent": 0,
+            "failed": 0,
+            "removed": 0,
+            "last_batch_seconds": 0.0,
+            "last_rate_per_s": 0.0,
+        }
+
+    # --- DB helpers ---
+    def _db(self):
+        if self._session_factory is not None:
+            return self._session_factory()
+        from database import SessionLocal
+
+        return SessionLocal()
+
+    def invalidate(self) -> None:
+        """Fuerza recarga de la lista de subscripciones (subscribe/unsubscribe)."""
+        with self._subs_lock:
+            self._subs = None
+
+    def subscriptions(self) -> List[Subscription]:
+        from sqlalchemy import func
+
+        from models_db import PushSubscription
+
+        with self._subs_lock:
+            now = time.monotonic()
+            if self._subs is not None and now - self._subs_checked_at < self.probe_seconds:
+                return self._subs
+
+            db = self._db()
+            try:
+                count, max_id = db.query(
+                    func.count(PushSubscription.id), func.max(PushSubscription.id)
+                ).one()
+                fingerprint = (count or 0, max_id or 0)
+                if self._subs is None or fingerprint != self._subs_fingerprint:
+                    self._subs = [
+                        (r.id, r.endpoint, r.p256dh, r.auth)
+                        for r in db.query(
+                            PushSubscription.id,
+                            PushSubscription.endpoint,
+                            PushSubscription.p256dh,
+                            PushSubscription.auth,
+                        ).all()
+                        if r.endpoint
+                    ]
+                    self._subs_fingerprint = fingerprint
+                self._subs_checked_at = now
+            finally:
+                db.close()
+            return self._subs
+
+    def _remove_gone(self, ids: List[int]) -> None:
+        if not ids:
+            return
+        from models_db import PushSubscription
+
+        db = self._db()
+        try:
+            db.query(PushSubscription).filter(PushSubscription.id.in_(ids)).delete(
+                synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"[PUSH] ❌ Error removing gone subscriptions: {e}")
+        finally:
+            db.close()
+        self.invalidate()
+
+    # --- Coalescing queue ---
+    def enqueue(self, title: str, body: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """No bloquea: la notificación sale en la próxima ventana de entrega."""
+        with self._cond:
+            self._pending.append({"title": title, "body": body, "data": data or {}})
+            self._ensure_started()
+            self._cond.notify()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="push-dispatcher", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Ventana de coalescing: acumula lo que llegue mientras tanto
+            time.sleep(self.window_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[PUSH] ❌ Dispatcher error: {e}")
+
+    def flush(self) -> Dict[str, int]:
+        """Entrega ya todo lo pendiente como una única notificación."""
+        with self._cond:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return {"success": 0, "failed": 0, "removed": 0}
+
+        title, body, data = self.coalesce(pending)
+        self._stats["coalesced_signals"] += len(pending)
+        return self.send_now(title, body, data)
+
+    @staticmethod
+    def coalesce(pending: List[Dict[str, Any]]) -> Tuple[str, str, Dict[str, Any]]:
+        if len(pending) == 1:
+            n = pending[0]
+            return n["title"], n["body"], n["data"]
+
+        lines = [n["title"] for n in pending[:MAX_BODY_LINES]]
+        if len(pending) > MAX_BODY_LINES:
+            lines.append(f"+{len(pending) - MAX_BODY_LINES} more")
+        tokens = sorted({n["data"].get("token") for n in pending if n["data"].get("token")})
+        return (
+            f"{len(pending)} New Signals",
+            "\n".join(lines),
+            {"type": "signals", "tokens": tokens, "count": len(pending)},
+        )
+
+    # --- Delivery ---
+    def send_now(self, title: str, body: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """Entrega síncrona a todas las subscripciones (pool acotado)."""
+        private_key = os.getenv("VAPID_PRIVATE_KEY")
+        if not private_key:
+            return {"ok": False, "error": NOT_CONFIGURED}
+
+        subs = self.subscriptions()
+        results = {"success": 0, "failed": 0, "removed": 0}
+        if not subs:
+            return results
+
+        payload = json.dumps({"title": title, "body": body, "icon": "/icon-192.png", "data": data or {}})
+        mail = os.getenv("VAPID_MAIL", "mailto:admin@tradercopilot.com")
+
+        with self._deliver_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="push")
+
+            started = time.monotonic()
+            outcomes = list(
+                self._executor.map(lambda s: self._deliver_one(s, payload, private_key, mail), subs)
+            )
+            elapsed = time.monotonic() - started
+
+        gone = [sub[0] for sub, outcome in zip(subs, outcomes) if outcome == "gone"]
+        results["success"] = outcomes.count("ok")
+        results["failed"] = outcomes.count("error")
+        results["removed"] = len(gone)
+        self._remove_gone(gone)
+
+        self._stats["windows"] += 1
+        self._stats["notifications"] += 1
+        self._stats["sent"] += results["success"]
+        self._stats["failed"] += results["failed"]
+        self._stats["removed"] += results["removed"]
+        self._stats["last_batch_seconds"] = round(elapsed, 3)
+        self._stats["last_rate_per_s"] = round(len(subs) / elapsed, 1) if elapsed > 0 else 0.0
+
+        if results["success"]:
+            print(f"[PUSH] 🔔 Sent ({results['success']} devices, {elapsed:.2f}s).")
+        return results
+
+    def _deliver_one(self, sub: Subscription, payload: str, private_key: str, mail: str) -> str:
+        from pywebpush import WebPushException, webpush
+
+        _, endpoint, p256dh, auth = sub
+        try:
+            webpush(
+                subscription_info={"endpoint": endpoint, "keys": {"p256dh": p256dh, "auth": auth}},
+                data=payload,
+                vapid_private_key=private_key,
+                # webpush() muta los claims (aud/exp por origin): copia por envío
+                vapid_claims={"sub": mail},
+                timeout=PUSH_TIMEOUT,
+                requests_session=self._http,
+            )
+            return "ok"
+        except WebPushException as ex:
+            if ex.response is not None and ex.response.status_code in (404, 410):
+                return "gone"
+            print(f"WebPush Error: {ex}")
+            return "error"
+        except Exception as e:
+            print(f"General Push Error: {e}")
+            return "error"
+
+    def stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        s["pending"] = len(self._pending)
+        s["cached_subscriptions"] = len(self._subs) if self._subs is not None else None
+        attempted = s["sent"] + s["failed"] + s["removed"]
+        s["delivery_rate"] = round(s["sent"] / attempted, 4) if attempted else 0.0
+        return s
+
+
+push_dispatcher = PushDispatcher()
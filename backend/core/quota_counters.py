@@ -0,0 +1,189 @@
+# backend/core/quota_counters.py
+"""
+Atomic daily quota counters (advisor chat, AI analysis...).
+
+One round trip per quota check:
+
+- Redis (REDIS_URL): one Lua script `INCR quota:{date}:{feature}:{user_id}` +
+  `EXPIRE` + `SADD quota:dirty`, only if the key exists. The scheduler writes
+  dirty counters back to `daily_usage` every QUOTA_FLUSH_SECONDS (`flush()`),
+  for reporting.
+- No Redis: `INSERT ... ON CONFLICT DO UPDATE SET count = count + 1
+  RETURNING count` straight into `daily_usage` (Postgres / SQLite).
+
+A missing key (new day, Redis restart) is seeded from `daily_usage` with
+`SET key base NX` + `INCR` in one MULTI, so a flushed Redis doesn't hand out
+a fresh quota and concurrent first calls never see an unseeded counter.
+Redis errors fall back to the DB path.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from core.cache import cache
+
+FLUSH_SECONDS = int(os.getenv("QUOTA_FLUSH_SECONDS", "60"))
+KEY_TTL = 2 * 24 * 3600  # today + margin for the last flush
+PREFIX = "quota"
+DIRTY_KEY = "quota:dirty"
+
+# KEYS[1] = counter, KEYS[2] = dirty set, ARGV[1] = TTL. nil si la clave no existe.
+_INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+local n = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('SADD', KEYS[2], KEYS[1])
+return n
+"""
+_scripts: Dict[int, object] = {}
+
+
+def _today() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d")
+
+
+def _key(date: str, feature: str, user_id: int) -> str:
+    return f"{PREFIX}:{date}:{feature}:{user_id}"
+
+
+def _parse_key(key: str) -> Tuple[str, str, int]:
+    _, date, feature, user_id = key.split(":", 3)
+    return date, feature, int(user_id)
+
+
+def _redis():
+    return getattr(cache, "redis_client", None)
+
+
+# === Public API ===
+def increment(db, user_id: int, feature: str, date: Optional[str] = None) -> int:
+    """+1 al contador del día y devuelve el valor nuevo (atómico)."""
+    date = date or _today()
+    client = _redis()
+    if client is not None:
+        try:
+            return _increment_redis(db, client, user_id, feature, date)
+        except Exception as e:
+            print(f"[QUOTA] Redis INCR failed ({e}); using DB counter")
+    return _increment_db(db, user_id, feature, date)
+
+
+def flush(db) -> int:
+    """
+    Vuelca los contadores Redis modificados a `daily_usage` (valor absoluto,
+    idempotente). Commits. Returns the number of rows written.
+    """
+    client = _redis()
+    if client is None:
+        return 0
+
+    keys: List[str] = list(client.spop(DIRTY_KEY, 1000) or [])
+    if not keys:
+        return 0
+    values = client.mget(keys)
+
+    rows = []
+    for key, value in zip(keys, values):
+        if value is None:
+            continue  # expired: its last value was already flushed
+        date, feature, user_id = _parse_key(key)
+        rows.append({"user_id": user_id, "feature": feature, "date": date, "count": int(value)})
+
+    try:
+        _upsert(db, rows, absolute=True)
+        db.commit()
+    except Exception:
+        db.rollback()
+        client.sadd(DIRTY_KEY, *keys)  # retry on the next flush
+        raise
+    return len(rows)
+
+
+# === Backends ===
+def _increment_redis(db, client, user_id: int, feature: str, date: str) -> int:
+    key = _key(date, feature, user_id)
+    script = _scripts.get(id(client))
+    if script is None:
+        script = _scripts[id(client)] = client.register_script(_INCR_IF_EXISTS)
+    count = script(keys=[key, DIRTY_KEY], args=[KEY_TTL])
+    if count is not None:
+        return int(count)
+
+    # New key: continue from what daily_usage already has (e.g. Redis restarted).
+    # SET NX: only the first concurrent caller seeds; everyone INCRs on top.
+    base = _stored_count(db, user_id, feature, date)
+    pipe = client.pipeline(transaction=True)
+    pipe.set(key, base, nx=True, ex=KEY_TTL)
+    pipe.incr(key)
+    pipe.expire(key, KEY_TTL)
+    pipe.sadd(DIRTY_KEY, key)
+    return int(pipe.execute()[1])
+
+
+def _increment_db(db, user_id: int, feature: str, date: str) -> int:
+    count = _upsert(db, [{"user_id": user_id, "feature": feature, "date": date, "count": 1}])
+    db.commit()
+    return count
+
+
+def _stored_count(db, user_id: int, feature: str, date: str) -> int:
+    from models_db import DailyUsage
+
+    value = (
+        db.query(DailyUsage.count)
+        .filter(DailyUsage.user_id == user_id, DailyUsage.feature == feature, DailyUsage.date == date)
+        .scalar()
+    )
+    return int(value or 0)
+
+
+def _upsert(db, rows: List[Dict], absolute: bool = False) -> int:
+    """
+    count = count + excluded.count (o = excluded.count si absolute).
+    Returns the resulting count of the last row.
+    """
+    from models_db import DailyUsage
+
+    if not rows:
+        return 0
+
+    table = DailyUsage.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(table)
+        new_count = stmt.excluded.count if absolute else table.c.count + stmt.excluded.count
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "feature", "date"],
+            set_={"count": new_count},
+        )
+        if len(rows) == 1:
+            return int(db.execute(stmt.returning(table.c.count), rows[0]).scalar_one())
+        db.execute(stmt, rows)
+        return int(rows[-1]["count"])
+
+    count = 0
+    for r in rows:
+        usage = (
+            db.query(DailyUsage)
+            .filter_by(user_id=r["user_id"], feature=r["feature"], date=r["date"])
+            .with_for_update()
+            .first()
+        )
+        if usage is None:
+            usage = DailyUsage(**r)
+            db.add(usage)
+        else:
+            usage.count = r["count"] if absolute else (usage.count or 0) + r["count"]
+        count = usage.count
+    db.flush()
+    return count
@@ -1,9 +1,11 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import jwt
-from passlib.context import CryptContext
 import os
 
+from core import password_hasher as password_hasher_module
+from core.password_hasher import password_hasher
+
 # --- Configurations ---
 # En producción, SECRET_KEY debe venir de .env y ser muy segura
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -22,26 +24,23 @@ else:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 1 semana para MVP
 
-# Configure bcrypt with auto-truncation to handle 72-byte limit
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__truncate_error=False  # Auto-truncate passwords >72 bytes
-)
+# bcrypt context + process pool live in core.password_hasher (BCRYPT_ROUNDS)
+pwd_context = password_hasher_module.pwd_context
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifica si la contraseña plana coincide con el hash."""
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception as e:
-        print(f"[SECURITY ERROR] verify_password failed: {e}")
-        return False
+    """Verifica si la contraseña plana coincide con el hash (process pool)."""
+    return password_hasher.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(ok, new_hash): new_hash is set when the stored hash uses another cost factor."""
+    return password_hasher.verify_and_update(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """Genera el hash de una contraseña."""
-    return pwd_context.hash(password)
+    """Genera el hash de una contraseña (process pool)."""
+    return password_hasher.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -1,174 +1,374 @@
 
 from datetime import datetime, timedelta
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Tuple
 
+import numpy as np
 
-
-from models_db import Signal, SignalEvaluation, StrategyConfig
-from core.market_data_api import get_current_price
+from models_db import SIGNAL_CLOSED, Signal, SignalEvaluation
+from core import dashboard_cache, strategy_rollups
+from core.market_data_api import get_ohlcv_since
 
 # Minimum age to evaluate (avoid instant evaluation on creation)
 MIN_SIGNAL_AGE_MINUTES = 5
 # Timeout for signals (e.g., 24h)
 SIGNAL_TIMEOUT_HOURS = 24
+# Candle path resolution used to find the first touch of TP/SL
+EVAL_TIMEFRAME = "1h"
+EVAL_TF_MS = 3600 * 1000
+
+
+def _to_ms(dt: datetime) -> int:
+    # Naive datetimes in DB are UTC
+    return int((dt - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def _from_ms(ms: int) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(milliseconds=int(ms))
+
+
+def resolve_first_touch(
+    candles: List[Dict[str, Any]],
+    start_ms: np.ndarray,
+    is_long: np.ndarray,
+    tp: np.ndarray,
+    sl: np.ndarray,
+    end_ms: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized first-touch over the candle path for N signals of ONE token.
+
+    Args (arrays of length N): start_ms = first bar (open ts) to scan per
+    signal, is_long, tp, sl (0/NaN = not set), end_ms = bars opening at or
+    after it are outside the window (None = no limit).
+
+    Returns arrays of length N:
+      outcome: 1 = TP first, -1 = SL first, 0 = untouched
+      bar_idx: index of the touching bar (-1 if untouched)
+    Si TP y SL se tocan en la misma vela, gana SL (conservador).
+    """
+    ts = np.array([c["timestamp"] for c in candles], dtype=np.int64)
+    high = np.array([c["high"] for c in candles], dtype=float)
+    low = np.array([c["low"] for c in candles], dtype=float)
+
+    tp = np.where(tp > 0, tp, np.nan)
+    sl = np.where(sl > 0, sl, np.nan)
+
+    # (N, B) matrices: bar in scan window for this signal?
+    in_window = ts[None, :] >= start_ms[:, None]
+    if end_ms is not None:
+        in_window &= ts[None, :] < end_ms[:, None]
+    long_col = is_long[:, None]
+
+    with np.errstate(invalid="ignore"):
+        tp_hit = np.where(long_col, high[None, :] >= tp[:, None], low[None, :] <= tp[:, None])
+        sl_hit = np.where(long_col, low[None, :] <= sl[:, None], high[None, :] >= sl[:, None])
+    tp_hit &= in_window
+    sl_hit &= in_window
+
+    n_bars = len(ts)
+    tp_first = np.where(tp_hit.any(axis=1), tp_hit.argmax(axis=1), n_bars)
+    sl_first = np.where(sl_hit.any(axis=1), sl_hit.argmax(axis=1), n_bars)
+
+    outcome = np.zeros(len(start_ms), dtype=int)
+    outcome[sl_first < n_bars] = -1
+    outcome[(tp_first < sl_first)] = 1
+    bar_idx = np.where(outcome == 1, tp_first, np.where(outcome == -1, sl_first, -1))
+    return {"outcome": outcome, "bar_idx": bar_idx}
+
+
+def _evaluation_row(sig: Signal, result: str, exit_price: float, now: datetime) -> Dict[str, Any]:
+    # Calculate R-Multiple (PnL / Risk)
+    # Risk = |Entry - SL|
+    risk = abs(sig.entry - (sig.sl if sig.sl else sig.entry * 0.99))
+    if risk == 0:
+        risk = sig.entry * 0.01  # Prevent div/0
+
+    if sig.direction.lower() == "long":
+        raw_pnl = exit_price - sig.entry
+    else:
+        raw_pnl = sig.entry - exit_price
+
+    return {
+        "signal_id": sig.id,
+        "evaluated_at": now,
+        "result": result,
+        "pnl_r": round(raw_pnl / risk, 2),
+        "exit_price": exit_price,
+    }
+
+
+def _evaluation_row_neutral(sig: Signal, now: datetime) -> Dict[str, Any]:
+    return {
+        "signal_id": sig.id,
+        "evaluated_at": now,
+        "result": "neutral",  # Invalid entry
+        "pnl_r": 0.0,
+        "exit_price": sig.entry,
+    }
+
+
+def _timeout_result(sig: Signal, price: float) -> str:
+    if sig.direction.lower() == "long":
+        pnl_pct = (price - sig.entry) / sig.entry
+    else:
+        pnl_pct = (sig.entry - price) / sig.entry
+
+    if pnl_pct > 0.005:
+        return "WIN"  # > 0.5% profit
+    if pnl_pct < -0.005:
+        return "LOSS"  # < -0.5% loss
+    return "BE"  # Break Even / Stagnant
+
+
+def _window_ms(sig: Signal) -> Tuple[int, int]:
+    """
+    [first, end) bar opens this signal is judged on: the first 1h bar opening
+    at / after the real emission (`timestamp` is snapped back to the 4h / 1d
+    bar open, earlier candles predate the signal) up to the timeout horizon.
+    Rows from before `emitted_at` existed fall back to `timestamp`.
+    """
+    emitted_ms = _to_ms(sig.emitted_at or sig.timestamp)
+    first = -(-emitted_ms // EVAL_TF_MS) * EVAL_TF_MS
+    return first, first + SIGNAL_TIMEOUT_HOURS * EVAL_TF_MS
+
+
+def _scan_start_ms(sig: Signal) -> int:
+    """First bar to scan: after the last evaluated bar, or the window start."""
+    first, _ = _window_ms(sig)
+    if sig.last_evaluated_bar_ts:
+        return max(first, _to_ms(sig.last_evaluated_bar_ts) + EVAL_TF_MS)
+    return first
+
+
+def evaluate_token_signals(
+    signals: List[Signal], candles: List[Dict[str, Any]], now: Optional[datetime] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Resuelve todas las señales pendientes de UN token contra su camino de velas.
+
+    Returns {"evaluations": [SignalEvaluation rows], "progress": [Signal id +
+    last_evaluated_bar_ts]} listos para bulk insert/update.
+    """
+    now = now or datetime.utcnow()
+    evaluations: List[Dict[str, Any]] = []
+    progress: List[Dict[str, Any]] = []
+    if not signals:
+        return {"evaluations": evaluations, "progress": progress}
+
+    # Invalid entry -> neutral (same as before)
+    valid = []
+    for sig in signals:
+        if not sig.entry or sig.entry <= 0:
+            evaluations.append(_evaluation_row_neutral(sig, now))
+        else:
+            valid.append(sig)
+    if not valid or not candles:
+        return {"evaluations": evaluations, "progress": progress}
+
+    end_ms = np.array([_window_ms(s)[1] for s in valid], dtype=np.int64)
+    outcome = resolve_first_touch(
+        candles,
+        start_ms=np.array([_scan_start_ms(s) for s in valid], dtype=np.int64),
+        is_long=np.array([s.direction.lower() == "long" for s in valid]),
+        tp=np.array([s.tp or 0.0 for s in valid], dtype=float),
+        sl=np.array([s.sl or 0.0 for s in valid], dtype=float),
+        end_ms=end_ms,
+    )
+
+    # Last CLOSED bar: the forming bar is scanned again next pass
+    now_ms = _to_ms(now)
+    ts = np.array([c["timestamp"] for c in candles], dtype=np.int64)
+    closed = [c for c in candles if c["timestamp"] + EVAL_TF_MS <= now_ms]
+    last_closed_ts = _from_ms(closed[-1]["timestamp"]) if closed else None
+
+    for i, sig in enumerate(valid):
+        hit = outcome["outcome"][i]
+        horizon_idx = int(np.searchsorted(ts, end_ms[i])) - 1  # last bar opening before the horizon
+        if hit == 1:
+            evaluations.append(_evaluation_row(sig, "WIN", sig.tp, now))
+        elif hit == -1:
+            evaluations.append(_evaluation_row(sig, "LOSS", sig.sl, now))
+        elif end_ms[i] <= now_ms and horizon_idx >= 0 and ts[-1] >= end_ms[i] - EVAL_TF_MS:
+            # Timeout: result at the close of the horizon bar (not the latest
+            # candle; the range may also have been cut by max_candles)
+            exit_price = candles[horizon_idx]["close"]
+            evaluations.append(_evaluation_row(sig, _timeout_result(sig, exit_price), exit_price, now))
+        elif last_closed_ts and (not sig.last_evaluated_bar_ts or last_closed_ts > sig.last_evaluated_bar_ts):
+            progress.append({"id": sig.id, "last_evaluated_bar_ts": last_closed_ts})
+
+    return {"evaluations": evaluations, "progress": progress}
 
 
 def evaluate_pending_signals(db: Session) -> int:
     """
-    Evaluates pending signals against current market data.
-    Returns the number of newly evaluated signals.
+    Evaluates pending signals against the candle path since they were issued.
+    One OHLCV range fetch per token, first-touch TP/SL resolved in one
+    vectorized pass, bulk writes. Returns the number of newly evaluated signals.
     """
     # 1. Find Pending Signals
-    # Signals active (no evaluation) and older than MIN_SIGNAL_AGE
-    cutoff_time = datetime.utcnow() - timedelta(minutes=MIN_SIGNAL_AGE_MINUTES)
+    # Signals not CLOSED (OPEN / WATCH) and older than MIN_SIGNAL_AGE
+    now = datetime.utcnow()
+    cutoff_time = now - timedelta(minutes=MIN_SIGNAL_AGE_MINUTES)
 
-    # We want Signals where NO SignalEvaluation exists
-    # Using specific query pattern for efficiency
+    # Served by the partial index ix_signals_open_timestamp (no join)
     pending_signals = (
         db.query(Signal)
-        .outerjoin(SignalEvaluation, Signal.id == SignalEvaluation.signal_id)
-        .filter(SignalEvaluation.id.is_(None), Signal.timestamp < cutoff_time)
+        .filter(Signal.status != SIGNAL_CLOSED, Signal.timestamp < cutoff_time)
         .all()
     )
 
     if not pending_signals:
         return 0
 
-    # 2. Group by Token to optimize API calls
+    # 2. Group by Token (one range fetch per token)
     signals_by_token: Dict[str, List[Signal]] = {}
     for sig in pending_signals:
-        if sig.token not in signals_by_token:
-            signals_by_token[sig.token] = []
-        signals_by_token[sig.token].append(sig)
+        signals_by_token.setdefault(sig.token, []).append(sig)
 
-    new_evaluations_count = 0
+    evaluations: List[Dict[str, Any]] = []
+    progress: List[Dict[str, Any]] = []
 
     # 3. Evaluate by Token
     for token, signals in signals_by_token.items():
-        current_price = get_current_price(token)
-        if not current_price or current_price <= 0:
+        since_ms = min(_scan_start_ms(s) for s in signals)
+        since_ms -= since_ms % EVAL_TF_MS  # align to bar open
+        candles = get_ohlcv_since(token, EVAL_TIMEFRAME, since_ms)
+        if not candles:
             continue
 
-        for sig in signals:
-            result = None
-            exit_price = current_price
-
-            # Basic Validation
-            if not sig.entry or sig.entry <= 0:
-                result = "neutral"  # Invalid entry
-
-            # --- Check TP/SL ---
-            elif sig.direction.lower() == "long":
-                if sig.tp and current_price >= sig.tp:
-                    result = "WIN"
-                    exit_price = sig.tp
-                elif sig.sl and current_price <= sig.sl:
-                    result = "LOSS"
-                    exit_price = sig.sl
-
-            elif sig.direction.lower() == "short":
-                if sig.tp and current_price <= sig.tp:
-                    result = "WIN"
-                    exit_price = sig.tp
-                elif sig.sl and current_price >= sig.sl:
-                    result = "LOSS"
-                    exit_price = sig.sl
-
-            # --- Check Timeout ---
-            if not result:
-                age = datetime.utcnow() - sig.timestamp
-                if age > timedelta(hours=SIGNAL_TIMEOUT_HOURS):
-                    # Timeout - Calculate result at current price
-                    pnl_pct = 0.0
-                    if sig.direction.lower() == "long":
-                        pnl_pct = (current_price - sig.entry) / sig.entry
-                    else:
-                        pnl_pct = (sig.entry - current_price) / sig.entry
-
-                    if pnl_pct > 0.005:
-                        result = "WIN"  # > 0.5% profit
-                    elif pnl_pct < -0.005:
-                        result = "LOSS"  # < -0.5% loss
-                    else:
-                        result = "BE"  # Break Even / Stagnant
-
-            # --- Save Evaluation if Result Found ---
-            if result:
-                # Calculate R-Multiple (PnL / Risk)
-                # Risk = |Entry - SL|
-                risk = abs(sig.entry - (sig.sl if sig.sl else sig.entry * 0.99))
-                if risk == 0:
-                    risk = sig.entry * 0.01  # Prevent div/0
-
-                raw_pnl = 0.0
-                if sig.direction.lower() == "long":
-                    raw_pnl = exit_price - sig.entry
-                else:
-                    raw_pnl = sig.entry - exit_price
-
-                pnl_r = raw_pnl / risk
-
-                eval_obj = SignalEvaluation(
-                    signal_id=sig.id,
-                    evaluated_at=datetime.utcnow(),
-                    result=result,
-                    pnl_r=round(pnl_r, 2),
-                    exit_price=exit_price,
-                )
+        res = evaluate_token_signals(signals, candles, now=now)
+        evaluations.extend(res["evaluations"])
+        progress.extend(res["progress"])
 
-                db.add(eval_obj)
-                new_evaluations_count += 1
+    # 4. Bulk write (evaluation + CLOSED status in the same transaction)
+    return _write_results(db, {sig.id: sig for sig in pending_signals}, evaluations, progress)
 
-                # Update Strategy Stats
-                # TODO: Re-enable when _update_strategy_stats is implemented
-                # if sig.strategy_id:
-                #     _update_strategy_stats(db, sig.strategy_id)
 
-    db.commit()
-    return new_evaluations_count
+def _claim(db: Session, ids: List[int]) -> set:
     """
-    Recalculates Win Rate for the Persona (StrategyConfig).
+    Flips still-open signals to CLOSED and returns the ids this pass won.
+    The bar pass (scheduler loop) and the tick pass (price feed thread) can
+    resolve the same signal concurrently: only the claim winner writes its
+    evaluation.
     """
-    try:
-        total = (
-            db.query(Signal)
-            .join(SignalEvaluation)
-            .count()
-        )
-        wins = (
-            db.query(Signal)
-            .join(SignalEvaluation)
-            .count()
-        )
+    if not ids:
+        return set()
+    stmt = update(Signal).where(Signal.id.in_(ids), Signal.status != SIGNAL_CLOSED).values(status=SIGNAL_CLOSED)
+    opts = {"synchronize_session": False}
+    if getattr(db.get_bind().dialect, "update_returning", False):
+        return set(db.execute(stmt.returning(Signal.id), execution_options=opts).scalars())
+    # Sin RETURNING: una fila por UPDATE, rowcount dice quién ganó
+    claimed = set()
+    for sig_id in ids:
+        res = db.execute(stmt.where(Signal.id == sig_id), execution_options=opts)
+        if res.rowcount:
+            claimed.add(sig_id)
+    return claimed
 
-        # Calculate Total PnL (Sum of R-Multiples)
-        pnl_r_sum = 0.0
-        evals = (
-            db.query(SignalEvaluation)
-            .join(Signal)
-            .all()
-        )
-        for e in evals:
-            if e.pnl_r:
-                pnl_r_sum += e.pnl_r
 
-        if total > 0:
-            win_rate = (wins / total) * 100  # Store as 0-100
+def _write_results(
+    db: Session, by_id: Dict[int, Signal], evaluations: List[Dict[str, Any]], progress: List[Dict[str, Any]]
+) -> int:
+    """Claims + inserts evaluations, saves progress, updates rollups. Returns evaluations written."""
+    claimed = _claim(db, [e["signal_id"] for e in evaluations])
+    evaluations = [e for e in evaluations if e["signal_id"] in claimed]
+    if evaluations:
+        db.bulk_insert_mappings(SignalEvaluation, evaluations)
+    if progress:
+        db.bulk_update_mappings(Signal, progress)
 
-            # Upsert config
-            config = (
-                db.query(StrategyConfig)
-                .first()
+    # Strategy rollups: incremental, same transaction as the evaluations
+    if evaluations:
+        entries = []
+        for e in evaluations:
+            sig = by_id[e["signal_id"]]
+            entries.append(
+                strategy_rollups.rollup_entry(
+                    sig.strategy_id, sig.token, sig.timeframe, e["evaluated_at"], e["result"], e["pnl_r"]
+                )
             )
-            if config:
-                config.win_rate = win_rate
-                config.total_signals = total
-                # Do NOT overwrite expected_roi with realized PnL.
-                # Expected ROI is a static backtest metric.
-                # Realized PnL should be calculated on the fly or stored in a new column.
+        strategy_rollups.apply_evaluations(db, entries)
+
+    db.commit()
+
+    # Dashboards of the owners of these signals are stale now
+    if evaluations:
+        dashboard_cache.invalidate(by_id[e["signal_id"]].user_id for e in evaluations)
+    return len(evaluations)
+
+
+# -----------------------------------------------------------------------------
+# Tick-driven evaluation (services.price_feed)
+# -----------------------------------------------------------------------------
+# Open signal levels per token, refreshed from the DB every
+# OPEN_LEVELS_REFRESH_SECONDS: a quiet tick costs no query.
+OPEN_LEVELS_REFRESH_SECONDS = 30
+_open_levels: Dict[str, List[Tuple[int, bool, float, float]]] = {}  # token -> [(id, is_long, tp, sl)]
+_open_levels_at: Optional[datetime] = None
+
+
+def _refresh_open_levels(db: Session, now: datetime) -> None:
+    global _open_levels, _open_levels_at
+    cutoff_time = now - timedelta(minutes=MIN_SIGNAL_AGE_MINUTES)
+    # timestamp is snapped back at most one 1d bar from the emission
+    oldest = now - timedelta(hours=SIGNAL_TIMEOUT_HOURS + 24)
+    rows = (
+        db.query(
+            Signal.id, Signal.token, Signal.direction, Signal.entry, Signal.tp, Signal.sl,
+            Signal.timestamp, Signal.emitted_at,
+        )
+        .filter(Signal.status != SIGNAL_CLOSED, Signal.timestamp < cutoff_time, Signal.timestamp >= oldest)
+        .all()
+    )
+    now_ms = _to_ms(now)
+    levels: Dict[str, List[Tuple[int, bool, float, float]]] = {}
+    for r in rows:
+        if not r.entry or r.entry <= 0 or not (r.tp or r.sl):
+            continue  # neutral: the bar pass handles them
+        if _window_ms(r)[1] <= now_ms:
+            continue  # past its horizon: timeout priced by the bar pass, not at today's price
+        levels.setdefault((r.token or "").upper(), []).append(
+            (r.id, (r.direction or "").lower() == "long", r.tp or 0.0, r.sl or 0.0)
+        )
+    _open_levels, _open_levels_at = levels, now
+
+
+def evaluate_on_ticks(db: Session, ticks: List[Any], now: Optional[datetime] = None) -> int:
+    """
+    Closes open signals whose TP / SL lies inside a price feed tick's
+    [low, high]. Same rules as the bar pass (SL wins when both are inside).
+    Timeouts, gaps and history before the feed started stay with
+    evaluate_pending_signals. Returns the number of newly evaluated signals.
+    """
+    now = now or datetime.utcnow()
+    if _open_levels_at is None or (now - _open_levels_at).total_seconds() >= OPEN_LEVELS_REFRESH_SECONDS:
+        _refresh_open_levels(db, now)
 
-    except Exception as e:
-        pass
+    hits: Dict[int, str] = {}
+    for tick in ticks:
+        for sig_id, is_long, tp, sl in _open_levels.get(tick.token.upper(), ()):
+            if is_long:
+                tp_hit, sl_hit = tp > 0 and tick.high >= tp, sl > 0 and tick.low <= sl
+            else:
+                tp_hit, sl_hit = tp > 0 and tick.low <= tp, sl > 0 and tick.high >= sl
+            if sl_hit:
+                hits[sig_id] = "LOSS"
+            elif tp_hit:
+                hits[sig_id] = "WIN"
+    if not hits:
+        return 0
 
+    for levels in _open_levels.values():
+        levels[:] = [lv for lv in levels if lv[0] not in hits]
 
+    # Re-read: closed by the bar pass (or another worker) since the refresh
+    signals = (
+        db.query(Signal).filter(Signal.id.in_(list(hits)), Signal.status != SIGNAL_CLOSED).all()
+    )
+    evaluations = [
+        _evaluation_row(sig, hits[sig.id], sig.tp if hits[sig.id] == "WIN" else sig.sl, now)
+        for sig in signals
+    ]
+    return _write_results(db, {sig.id: sig for sig in signals}, evaluations, [])
@@ -10,12 +10,16 @@ en el formato adecuado para logs CSV y base de datos.
 """
 
 from __future__ import annotations
-import csv
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
+from . import admin_counters, dashboard_cache
+from . import notification_outbox as outbox
+from .csv_journal import csv_journal
+from .idempotency_filter import SEEN, idempotency_filter, split_known
+from .notification_outbox import OUTBOX_ENABLED
 from .schemas import Signal
 
 
@@ -51,13 +55,20 @@ def log_signal(signal: Signal) -> Optional[int]:
     """
 
     mode = signal.mode.upper()
-    
+
+    # === 0. Filtro de idempotencia en memoria (evita el round trip en repeticiones) ===
+    idem_key = _idempotency_key(signal, _snap_to_grid(signal.timestamp, signal.timeframe))
+    if split_known([idem_key])[idem_key] == SEEN:
+        return False
+
     # === 1. Persistir en DB (CANONICAL SOURCE OF TRUTH) ===
     # Si falla dedupe aquí, abortamos todo lo demás.
     saved_id, is_new = _write_to_db(signal, mode)
     
     if not saved_id:
         return False
+
+    idempotency_filter.add(idem_key)
     
     # Si ya existía, retornamos False y no hacemos CSV/Push (idempotency)
     if not is_new:
@@ -68,11 +79,14 @@ def log_signal(signal: Signal) -> Optional[int]:
     _write_to_csv(signal, mode, token_lower)
     
     # === 3. Push Notification (Mobile) ===
-    _send_push_notification(signal)
-    
-    # === 3. Push Notification (Mobile) ===
-    _send_push_notification(signal)
-    
+    # Con outbox, la fila push ya se escribió en la transacción del INSERT.
+    if not OUTBOX_ENABLED:
+        _send_push_notification(signal)
+
+    # Open-signal count of the owner's dashboard changed
+    if signal.user_id:
+        dashboard_cache.invalidate([signal.user_id])
+
     return saved_id
 
 
@@ -118,42 +132,20 @@ def _write_to_db(signal: Signal, mode: str) -> tuple[Optional[int], bool]:
         from models_db import Signal as SignalDB
         from sqlalchemy.exc import IntegrityError
 
-        # 1) Normalize timestamp al inicio de vela (canonical)
-        ts_normalized = _snap_to_grid(signal.timestamp, signal.timeframe)
-        ts_iso = ts_normalized.isoformat()
-
-        # 2) Idempotency key (estable)
-        idem_key = (
-            f"{signal.strategy_id}|{signal.token.upper()}|{signal.timeframe}|"
-            f"{ts_iso}|{signal.direction.lower()}|{signal.user_id}|{signal.mode}"
-        )
-
-        # 3) Construir fila DB
-        db_signal = SignalDB(
-            timestamp=ts_normalized,
-            token=signal.token.upper(),
-            timeframe=signal.timeframe,
-            direction=signal.direction.lower(),
-            entry=signal.entry,
-            tp=signal.tp if signal.tp else 0.0,
-            sl=signal.sl if signal.sl else 0.0,
-            confidence=signal.confidence if signal.confidence is not None else 0.0,
-            rationale=signal.rationale if signal.rationale else "",
-            source=signal.source,
-            mode=mode,
-            raw_response=str(signal.extra) if signal.extra else None,
-            strategy_id=signal.strategy_id,
-            idempotency_key=idem_key,
-            user_id=signal.user_id,
-        )
-
-        # Campo opcional (si existe en schema)
-        if hasattr(signal, "is_saved") and hasattr(db_signal, "is_saved"):
-            db_signal.is_saved = getattr(signal, "is_saved")
+        # 1-3) Timestamp canónico + idempotency key + fila DB
+        row = _build_db_row(signal, mode)
+        ts_normalized = row["timestamp"]
+        idem_key = row["idempotency_key"]
+        db_signal = SignalDB(**row)
 
         db = SessionLocal()
         try:
             db.add(db_signal)
+            if OUTBOX_ENABLED:
+                # Outbox en la MISMA transacción que la señal
+                db.flush()
+                outbox.add_to_session(db, outbox.outbox_rows(signal, db_signal.id))
+            admin_counters.signals_created(db, [ts_normalized])
             db.commit()
             db.refresh(db_signal)
             print(f"[DB] ✅ INSERT: {signal.token} {signal.direction} @ {ts_normalized} ID={db_signal.id}")
@@ -187,12 +179,190 @@ def _write_to_db(signal: Signal, mode: str) -> tuple[Optional[int], bool]:
         traceback.print_exc()
         return None, False
 
+
+def _naive_utc(dt: datetime) -> datetime:
+    # Columnas DateTime sin zona: UTC naive
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _idempotency_key(signal: Signal, ts_normalized: datetime) -> str:
+    """strategy|TOKEN|tf|ts|direction|user|mode (ts ya normalizado a la vela)."""
+    return (
+        f"{signal.strategy_id}|{signal.token.upper()}|{signal.timeframe}|"
+        f"{ts_normalized.isoformat()}|{signal.direction.lower()}|{signal.user_id}|{signal.mode}"
+    )
+
+
+def _build_db_row(signal: Signal, mode: str) -> Dict[str, Any]:
+    """Columnas de la fila `signals` para una señal (timestamp snapped + idempotency key)."""
+    from models_db import SIGNAL_OPEN, SIGNAL_WATCH
+
+    ts_normalized = _snap_to_grid(signal.timestamp, signal.timeframe)
+    row = {
+        "timestamp": ts_normalized,
+        "emitted_at": _naive_utc(signal.timestamp),
+        "token": signal.token.upper(),
+        "timeframe": signal.timeframe,
+        "direction": signal.direction.lower(),
+        "entry": signal.entry,
+        "tp": signal.tp if signal.tp else 0.0,
+        "sl": signal.sl if signal.sl else 0.0,
+        "confidence": signal.confidence if signal.confidence is not None else 0.0,
+        "rationale": signal.rationale if signal.rationale else "",
+        "source": signal.source,
+        "mode": mode,
+        "raw_response": str(signal.extra) if signal.extra else None,
+        "strategy_id": signal.strategy_id,
+        "idempotency_key": _idempotency_key(signal, ts_normalized),
+        "user_id": signal.user_id,
+        "is_saved": 0,
+        "status": SIGNAL_WATCH if "watchlist" in str(signal.source or "").lower() else SIGNAL_OPEN,
+    }
+    # Campo opcional (si existe en schema)
+    if getattr(signal, "is_saved", None) is not None:
+        row["is_saved"] = signal.is_saved
+    return row
+
+
+def log_signals_bulk(
+    signals: List[Signal], db=None, telegram_plan: Optional[str] = None
+) -> List[Optional[int]]:
+    """
+    Persiste un lote de señales con UN solo INSERT multi-fila idempotente.
+
+    - Postgres / SQLite moderno: INSERT ... ON CONFLICT DO NOTHING RETURNING id
+    - SQLite sin RETURNING: INSERT OR IGNORE + SELECT por idempotency_key
+    - Otros dialectos: fallback fila a fila (_write_to_db)
+
+    Solo las filas NUEVAS se escriben en CSV y generan notificaciones: filas de
+    outbox (push + telegram si `telegram_plan`) en la misma transacción.
+
+    Returns:
+        Lista alineada con `signals`: el ID de DB si la fila es nueva, None si era
+        duplicada (o falló).
+    """
+    if not signals:
+        return []
+
+    from database import SessionLocal
+    from models_db import Signal as SignalDB
+    from sqlalchemy import select
+
+    rows = [_build_db_row(sig, sig.mode.upper()) for sig in signals]
+
+    # Dedupe dentro del propio lote (el scheduler puede repetir señales)
+    unique_rows: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        unique_rows.setdefault(row["idempotency_key"], row)
+
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
+
+    # Repeticiones ya conocidas se descartan sin INSERT (fallback exacto a DB en MAYBE)
+    known = split_known(list(unique_rows.keys()), db=db)
+    for key, verdict in known.items():
+        if verdict == SEEN:
+            unique_rows.pop(key)
+    if not unique_rows:
+        if own_session:
+            db.close()
+        return [None] * len(signals)
+
+    new_by_key: Dict[str, int] = {}
+    try:
+        dialect = db.get_bind().dialect
+        table = SignalDB.__table__
+        values = list(unique_rows.values())
+
+        if dialect.name in ("postgresql", "sqlite") and getattr(dialect, "insert_returning", False):
+            if dialect.name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+            stmt = (
+                dialect_insert(table)
+                .values(values)
+                .on_conflict_do_nothing()
+                .returning(table.c.id, table.c.idempotency_key)
+            )
+            new_by_key = {key: new_id for new_id, key in db.execute(stmt).all()}
+
+        elif dialect.name == "sqlite":
+            keys = list(unique_rows.keys())
+            existing = set(
+                db.execute(
+                    select(table.c.idempotency_key).where(table.c.idempotency_key.in_(keys))
+                ).scalars()
+            )
+            db.execute(table.insert().prefix_with("OR IGNORE"), values)
+            fresh = [k for k in keys if k not in existing]
+            if fresh:
+                new_by_key = {
+                    key: new_id
+                    for new_id, key in db.execute(
+                        select(table.c.id, table.c.idempotency_key).where(
+                            table.c.idempotency_key.in_(fresh)
+                        )
+                    ).all()
+                }
+        else:
+            if own_session:
+                db.close()
+                own_session = False
+            return [log_signal(sig) or None for sig in signals]
+
+        if new_by_key:
+            admin_counters.signals_created(db, (unique_rows[key]["timestamp"] for key in new_by_key))
+
+        if OUTBOX_ENABLED and new_by_key:
+            sig_by_key: Dict[str, Signal] = {}
+            for sig, row in zip(signals, rows):
+                sig_by_key.setdefault(row["idempotency_key"], sig)
+            outbox.add_to_session(
+                db,
+                [
+                    ob_row
+                    for key, new_id in new_by_key.items()
+                    for ob_row in outbox.outbox_rows(sig_by_key[key], new_id, telegram_plan)
+                ],
+            )
+
+        db.commit()
+        # Nuevas o duplicadas por conflicto: todas existen ya en DB
+        idempotency_filter.add_many(unique_rows.keys())
+    except Exception as e:
+        print(f"[DB] ❌ Bulk insert error: {e}")
+        db.rollback()
+        return [None] * len(signals)
+    finally:
+        if own_session:
+            db.close()
+
+    if new_by_key:
+        print(f"[DB] ✅ BULK INSERT: {len(new_by_key)} new / {len(signals)} signals")
+
+    # Alinear con la entrada: solo la PRIMERA aparición de cada key cuenta como nueva
+    result: List[Optional[int]] = []
+    for sig, row in zip(signals, rows):
+        new_id = new_by_key.pop(row["idempotency_key"], None)
+        result.append(new_id)
+        if new_id:
+            _write_to_csv(sig, sig.mode.upper(), sig.token.lower())
+            if not OUTBOX_ENABLED:
+                _send_push_notification(sig)
+    dashboard_cache.invalidate(sig.user_id for sig, new_id in zip(signals, result) if new_id)
+    return result
+
+
 def _write_to_csv(signal: Signal, mode: str, token_lower: str) -> None:
     """
     Escritura CSV (Solo si DB tuvo éxito).
     """
     mode_dir = LOGS_DIR / mode
-    mode_dir.mkdir(parents=True, exist_ok=True)
 
     if mode == "EVALUATED":
         filename = f"{token_lower}.evaluated.csv"
@@ -200,7 +370,6 @@ def _write_to_csv(signal: Signal, mode: str, token_lower: str) -> None:
         filename = f"{token_lower}.csv"
 
     filepath = mode_dir / filename
-    file_exists = filepath.exists()
 
     # Convertir Signal a dict para CSV
     # NOTE: Use original timestamp for display, or normalized?
@@ -221,32 +390,22 @@ def _write_to_csv(signal: Signal, mode: str, token_lower: str) -> None:
     }
 
     try:
-        with open(filepath, mode="a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(row_data)
-        # print(f"[CSV] ✅ Saved: {filepath}")
+        # Write-behind: el journal escribe en background (header solo si el fichero es nuevo)
+        csv_journal.append(filepath, CSV_HEADERS, row_data)
     except Exception as e:
         print(f"[CSV] ❌ Error: {e}")
 
 
 def _send_push_notification(signal: Signal):
-    """Encapsulated Push Logic."""
+    """
+    Push inline (solo con NOTIFY_OUTBOX=false): no bloquea, el dispatcher
+    coalesce y entrega en background.
+    """
     try:
-        from notify import send_push_notification
-
-        title = f"New Signal: {signal.direction.upper()} {signal.token}"
-        body = (
-            f"Entry: {signal.entry} | TP: {signal.tp} | SL: {signal.sl}\n"
-            f"Strategy: {signal.strategy_id or 'Unknown'}"
-        )
-        res = send_push_notification(
-            title, body, data={"token": signal.token, "type": "signal"}
-        )
-        if res.get("success", 0) > 0:
-            print(f"[PUSH] 🔔 Sent ({res['success']} devices).")
-        # Fail silently if 0
+        from core.push_dispatcher import push_dispatcher
+
+        msg = outbox.push_message(signal)
+        push_dispatcher.enqueue(msg["title"], msg["body"], data=msg["data"])
     except Exception as push_err:
         print(f"[PUSH] ❌ Error: {push_err}")
 
@@ -0,0 +1,223 @@
+# backend/core/strategy_rollups.py
+"""
+Incremental strategy performance rollups.
+
+One `strategy_performance_daily` row per (strategy_id, token, timeframe, day)
+holds wins / losses / breakeven / count / sum_r. Every writer of
+SignalEvaluation calls `apply_evaluations` in the SAME transaction, so the
+rollup never drifts from the evaluations table:
+
+- core.signal_evaluator.evaluate_pending_signals
+- evaluated_logger._append_evaluations
+
+StrategyConfig.win_rate / total_signals and the marketplace stats read the
+rollup (a handful of rows per strategy) instead of re-aggregating every
+evaluation joined to signals.
+
+`rebuild()` recomputes everything from the evaluations (backfills, manual
+fixes): `python tools/rebuild_strategy_rollups.py [--strategy ID]`.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Both result vocabularies: signal_evaluator (WIN/LOSS/BE/neutral) and
+# evaluated_logger (hit-tp/hit-sl/neutral)
+RESULT_BUCKETS = {
+    "win": "wins",
+    "hit-tp": "wins",
+    "loss": "losses",
+    "hit-sl": "losses",
+    "be": "breakeven",
+}
+# Not an outcome yet: never counted
+SKIP_RESULTS = {"open"}
+
+COUNTERS = ("wins", "losses", "breakeven", "count", "sum_r")
+
+RollupKey = Tuple[str, str, str, str]
+
+
+def rollup_entry(
+    strategy_id: Optional[str],
+    token: Optional[str],
+    timeframe: Optional[str],
+    evaluated_at: Optional[datetime],
+    result: Optional[str],
+    pnl_r: Optional[float],
+) -> Optional[Dict[str, Any]]:
+    """Una evaluación -> contribución al rollup (None si no cuenta)."""
+    result_norm = (result or "").strip().lower()
+    if not strategy_id or result_norm in SKIP_RESULTS:
+        return None
+
+    entry = {
+        "strategy_id": strategy_id,
+        "token": (token or "").upper(),
+        "timeframe": timeframe or "",
+        "day": (evaluated_at or datetime.utcnow()).strftime("%Y-%m-%d"),
+        "wins": 0,
+        "losses": 0,
+        "breakeven": 0,
+        "count": 1,
+        "sum_r": float(pnl_r or 0.0),
+    }
+    bucket = RESULT_BUCKETS.get(result_norm)
+    if bucket:
+        entry[bucket] = 1
+    return entry
+
+
+def aggregate(entries: Iterable[Optional[Dict[str, Any]]]) -> Dict[RollupKey, Dict[str, Any]]:
+    """Suma contribuciones por clave (strategy_id, token, timeframe, day)."""
+    out: Dict[RollupKey, Dict[str, Any]] = {}
+    for e in entries:
+        if not e:
+            continue
+        key = (e["strategy_id"], e["token"], e["timeframe"], e["day"])
+        acc = out.get(key)
+        if acc is None:
+            out[key] = dict(e)
+        else:
+            for c in COUNTERS:
+                acc[c] += e[c]
+    return out
+
+
+def apply_evaluations(db, entries: Iterable[Optional[Dict[str, Any]]]) -> int:
+    """
+    Suma las contribuciones al rollup y refresca StrategyConfig de las
+    estrategias afectadas. Runs inside the caller's transaction (no commit).
+    Returns the number of rollup rows touched.
+    """
+    deltas = aggregate(entries)
+    if not deltas:
+        return 0
+
+    _upsert(db, list(deltas.values()))
+    refresh_strategy_configs(db, {k[0] for k in deltas})
+    return len(deltas)
+
+
+def _upsert(db, rows: List[Dict[str, Any]]) -> None:
+    from models_db import StrategyPerformanceDaily as Perf
+
+    now = datetime.utcnow()
+    for r in rows:
+        r["updated_at"] = now
+
+    table = Perf.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(table)
+        set_ = {c: table.c[c] + stmt.excluded[c] for c in COUNTERS}
+        set_["updated_at"] = stmt.excluded.updated_at
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["strategy_id", "token", "timeframe", "day"], set_=set_
+        )
+        db.execute(stmt, rows)
+        return
+
+    # Other dialects: read-modify-write per key
+    for r in rows:
+        existing = (
+            db.query(Perf)
+            .filter(
+                Perf.strategy_id == r["strategy_id"],
+                Perf.token == r["token"],
+                Perf.timeframe == r["timeframe"],
+                Perf.day == r["day"],
+            )
+            .with_for_update()
+            .first()
+        )
+        if existing is None:
+            db.add(Perf(**r))
+        else:
+            for c in COUNTERS:
+                setattr(existing, c, (getattr(existing, c) or 0) + r[c])
+            existing.updated_at = now
+    db.flush()
+
+
+def strategy_totals(
+    db, strategy_ids: Optional[Iterable[str]] = None, by_timeframe: bool = False
+) -> Dict[Any, Dict[str, Any]]:
+    """
+    Totales desde el rollup: {strategy_id: {...}} (o {(strategy_id, timeframe): {...}}).
+    Each value: wins, losses, breakeven, count, sum_r, win_rate (0-100).
+    """
+    from sqlalchemy import func
+
+    from models_db import StrategyPerformanceDaily as Perf
+
+    group_cols = [Perf.strategy_id] + ([Perf.timeframe] if by_timeframe else [])
+    q = db.query(*group_cols, *(func.sum(getattr(Perf, c)) for c in COUNTERS))
+    if strategy_ids is not None:
+        q = q.filter(Perf.strategy_id.in_(list(strategy_ids)))
+
+    out: Dict[Any, Dict[str, Any]] = {}
+    for row in q.group_by(*group_cols).all():
+        n_keys = len(group_cols)
+        key = row[0] if n_keys == 1 else tuple(row[:n_keys])
+        totals = {c: (row[n_keys + i] or 0) for i, c in enumerate(COUNTERS)}
+        totals["sum_r"] = round(float(totals["sum_r"]), 2)
+        totals["win_rate"] = round(totals["wins"] / totals["count"] * 100, 2) if totals["count"] else 0.0
+        out[key] = totals
+    return out
+
+
+def refresh_strategy_configs(db, strategy_ids: Optional[Iterable[str]] = None) -> None:
+    """StrategyConfig.win_rate (0-100) / total_signals desde el rollup."""
+    from models_db import StrategyConfig
+
+    totals = strategy_totals(db, strategy_ids)
+    for strategy_id, t in totals.items():
+        db.query(StrategyConfig).filter(StrategyConfig.strategy_id == strategy_id).update(
+            {"win_rate": t["win_rate"], "total_signals": t["count"]},
+            synchronize_session=False,
+        )
+
+
+def rebuild(db, strategy_id: Optional[str] = None, batch_size: int = 5000) -> int:
+    """
+    Recalcula el rollup desde SignalEvaluation JOIN Signal (backfills).
+    Streams the evaluations; commits once at the end. Returns rollup rows written.
+    """
+    from models_db import Signal, SignalEvaluation
+    from models_db import StrategyPerformanceDaily as Perf
+
+    purge = db.query(Perf)
+    if strategy_id:
+        purge = purge.filter(Perf.strategy_id == strategy_id)
+    purge.delete(synchronize_session=False)
+
+    q = (
+        db.query(
+            Signal.strategy_id,
+            Signal.token,
+            Signal.timeframe,
+            SignalEvaluation.evaluated_at,
+            SignalEvaluation.result,
+            SignalEvaluation.pnl_r,
+        )
+        .join(SignalEvaluation, SignalEvaluation.signal_id == Signal.id)
+        .filter(Signal.strategy_id.isnot(None))
+    )
+    if strategy_id:
+        q = q.filter(Signal.strategy_id == strategy_id)
+
+    deltas = aggregate(rollup_entry(*row) for row in q.yield_per(batch_size))
+    if deltas:
+        _upsert(db, list(deltas.values()))
+    refresh_strategy_configs(db, [strategy_id] if strategy_id else None)
+    db.commit()
+    print(f"[ROLLUP] Rebuilt {len(deltas)} rows" + (f" for {strategy_id}" if strategy_id else ""))
+    return len(deltas)
@@ -119,6 +119,63 @@ if SYNC_DATABASE_URL.startswith("sqlite://") and ":memory:" not in SYNC_DATABASE
         cursor.close()
 
 
+# === Async engine (asyncpg / aiosqlite) for async endpoints ===
+def _normalize_async_db_url(url: str) -> str:
+    url = _normalize_sync_db_url(url)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+def async_db_enabled() -> bool:
+    """
+    In-memory SQLite can't be shared between two engines (each one would get
+    its own empty DB); in that case async callers fall back to the sync
+    session in the threadpool (see core.async_queries).
+    """
+    url = _normalize_sync_db_url(os.getenv("DATABASE_URL", "sqlite:///./dev_local.db"))
+    return ":memory:" not in url and os.getenv("ASYNC_DB_DISABLED", "").lower() not in ("1", "true")
+
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_engine():
+    """Lazy singleton (the driver is only imported when an async route needs it)."""
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        url = _normalize_async_db_url(os.getenv("DATABASE_URL", "sqlite:///./dev_local.db"))
+        engine_kwargs = {"pool_pre_ping": True}
+        if not url.startswith("sqlite"):
+            # Postgres: same sizing as the sync pool
+            engine_kwargs["pool_size"] = 20
+            engine_kwargs["max_overflow"] = 10
+        _async_engine = create_async_engine(url, **engine_kwargs)
+    return _async_engine
+
+
+def get_async_sessionmaker():
+    global _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        # expire_on_commit=False: objects stay readable after the session closes
+        _AsyncSessionLocal = async_sessionmaker(
+            bind=get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _AsyncSessionLocal
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
 Base = declarative_base()
 # ---------------------------
 # DEV: SQLite schema patcher
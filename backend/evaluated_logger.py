@@ -1,11 +1,14 @@
 # backend/evaluated_logger.py
 from __future__ import annotations
 
+import bisect
 import csv
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+from core.csv_journal import csv_journal, segments
 from indicators.market import get_market_data, EXCHANGE_ID
 
 
@@ -52,23 +55,207 @@ def _parse_iso_ts(ts_str: str) -> datetime:
     return dt
 
 
+class _EvaluatedIndex:
+    """
+    Índice en memoria de signal_ts ya evaluados, por token.
+
+    The first lookup parses {token}.evaluated.csv (and its rotated segments,
+    see core.csv_journal.segments) once. Later lookups only read the bytes
+    appended to the live file since the last read (byte offset). A rotated or
+    truncated file (size below the offset, or a new inode) is parsed again
+    from scratch, segments included.
+    """
+
+    def __init__(self):
+        # token -> (inode, offset, fieldnames, ts_set)
+        self._entries: Dict[str, Tuple[int, int, List[str], Set[str]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Set[str]:
+        path = EVAL_DIR / f"{token}.evaluated.csv"
+        csv_journal.flush()
+        with self._lock:
+            if not path.exists():
+                self._entries.pop(token, None)
+                return set()
+
+            st = path.stat()
+            entry = self._entries.get(token)
+            if entry is None or entry[0] != st.st_ino or st.st_size < entry[1]:
+                ts_set: Set[str] = set()
+                for seg in segments(path)[:-1]:
+                    self._read_from(seg, 0, [], ts_set)
+                entry = (st.st_ino, 0, [], ts_set)
+
+            inode, offset, fieldnames, ts_set = entry
+            if st.st_size > offset:
+                offset, fieldnames = self._read_from(path, offset, fieldnames, ts_set)
+            self._entries[token] = (inode, offset, fieldnames, ts_set)
+            return ts_set
+
+    @staticmethod
+    def _read_from(path: Path, offset: int, fieldnames: List[str], ts_set: Set[str]):
+        with path.open("rb") as raw:
+            raw.seek(offset)
+            data = raw.read()
+
+        # Solo líneas completas (el journal puede estar a mitad de escritura)
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return offset, fieldnames
+
+        lines = data[:end].decode("utf-8").splitlines()
+        reader = csv.reader(lines)
+        if not fieldnames:
+            fieldnames = next(reader, [])
+        try:
+            ts_col = fieldnames.index("signal_ts")
+        except ValueError:
+            return offset + end, fieldnames
+
+        for values in reader:
+            if len(values) > ts_col and values[ts_col]:
+                ts_set.add(values[ts_col])
+        return offset + end, fieldnames
+
+    def add(self, token: str, ts_values: List[str]) -> None:
+        """Registra evaluaciones recién encoladas (aún no en disco)."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                entry[3].update(ts for ts in ts_values if ts)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+evaluated_index = _EvaluatedIndex()
+
+
 def _load_evaluated_signal_ts(token: str) -> Set[str]:
     """
     Devuelve el conjunto de timestamps (signal_ts) ya evaluados para un token.
     """
-    EVAL_DIR.mkdir(parents=True, exist_ok=True)
-    path = EVAL_DIR / f"{token}.evaluated.csv"
-    if not path.exists():
-        return set()
+    return evaluated_index.get(token)
 
-    ts_set: Set[str] = set()
-    with path.open("r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            ts = row.get("signal_ts")
-            if ts:
-                ts_set.add(ts)
-    return ts_set
+
+def _match_signals(
+    rows: List[Dict[str, str]], candidates: List[Tuple[datetime, Any]]
+) -> List[Tuple[Dict[str, str], Any]]:
+    """
+    Empareja filas CSV con señales DB en memoria: timestamp exacto, si no la
+    más cercana dentro de ±1s. Each signal is matched at most once.
+    `candidates` = [(timestamp, signal_row)] sorted by timestamp.
+    """
+    exact: Dict[datetime, List[Any]] = {}
+    for ts, sig in candidates:
+        exact.setdefault(ts, []).append(sig)
+    sorted_ts = [ts for ts, _ in candidates]
+    tolerance = timedelta(seconds=1)
+
+    used: Set[int] = set()
+    matches: List[Tuple[Dict[str, str], Any]] = []
+    for row in rows:
+        ts_dt = row["_ts"]
+        sig = next((s for s in exact.get(ts_dt, []) if s.id not in used), None)
+
+        if sig is None:
+            # Fallback: rango de 1 segundo (más cercano primero)
+            lo = bisect.bisect_left(sorted_ts, ts_dt - tolerance)
+            hi = bisect.bisect_right(sorted_ts, ts_dt + tolerance)
+            window = sorted(
+                (candidates[k] for k in range(lo, hi) if candidates[k][1].id not in used),
+                key=lambda c: abs(c[0] - ts_dt),
+            )
+            sig = window[0][1] if window else None
+
+        if sig is not None:
+            used.add(sig.id)
+            matches.append((row, sig))
+    return matches
+
+
+def _reconcile_evaluations(
+    db, token: str, rows: List[Dict[str, str]], touched_users: Optional[Set[int]] = None
+) -> int:
+    """
+    Guarda en DB las evaluaciones de un token en batch:
+    one range query for all rows, in-memory matching, bulk insert,
+    CLOSED status + strategy rollups in the same transaction (no commit).
+    Owners of the evaluated signals are added to `touched_users`.
+    Returns the number of SignalEvaluation rows inserted.
+    """
+    from sqlalchemy import select
+
+    from core import strategy_rollups
+    from models_db import SIGNAL_CLOSED, Signal, SignalEvaluation
+
+    parsed = []
+    for row in rows:
+        ts_str = row.get("signal_ts")
+        if not ts_str:
+            continue
+        try:
+            parsed.append(dict(row, _ts=_parse_iso_ts(ts_str)))
+        except Exception:
+            continue
+    if not parsed:
+        return 0
+
+    tolerance = timedelta(seconds=1)
+    stmt = (
+        select(
+            Signal.id,
+            Signal.timestamp,
+            Signal.strategy_id,
+            Signal.token,
+            Signal.timeframe,
+            Signal.user_id,
+            SignalEvaluation.id.label("evaluation_id"),
+        )
+        .outerjoin(SignalEvaluation, SignalEvaluation.signal_id == Signal.id)
+        .where(
+            Signal.token == token.upper(),
+            Signal.timestamp >= min(r["_ts"] for r in parsed) - tolerance,
+            Signal.timestamp <= max(r["_ts"] for r in parsed) + tolerance,
+        )
+        .order_by(Signal.timestamp, Signal.id)
+    )
+    candidates = [(r.timestamp, r) for r in db.execute(stmt).all()]
+
+    now = datetime.utcnow()
+    evaluations = []
+    rollup_entries = []
+    for row, sig in _match_signals(parsed, candidates):
+        # Ya tiene evaluación
+        if sig.evaluation_id is not None:
+            continue
+        evaluations.append(
+            {
+                "signal_id": sig.id,
+                "evaluated_at": now,
+                "result": row.get("result"),
+                "pnl_r": 0.0,
+                "exit_price": float(row.get("price_at_eval", 0) or 0),
+            }
+        )
+        rollup_entries.append(
+            strategy_rollups.rollup_entry(
+                sig.strategy_id, sig.token, sig.timeframe, now, row.get("result"), 0.0
+            )
+        )
+        if touched_users is not None and sig.user_id is not None:
+            touched_users.add(sig.user_id)
+
+    if evaluations:
+        db.bulk_insert_mappings(SignalEvaluation, evaluations)
+        db.bulk_update_mappings(
+            Signal, [{"id": e["signal_id"], "status": SIGNAL_CLOSED} for e in evaluations]
+        )
+        # Strategy rollups (+ StrategyConfig) in the same transaction
+        strategy_rollups.apply_evaluations(db, rollup_entries)
+    return len(evaluations)
 
 
 def _append_evaluations(token: str, rows: List[Dict[str, str]]) -> int:
@@ -77,86 +264,26 @@ def _append_evaluations(token: str, rows: List[Dict[str, str]]) -> int:
     Y TAMBIÉN guarda en la base de datos (SignalEvaluation).
     Devuelve el número de filas nuevas escritas.
     """
-    # 1. CSV
-    EVAL_DIR.mkdir(parents=True, exist_ok=True)
+    # 1. CSV (write-behind, un solo batch por token)
     path = EVAL_DIR / f"{token}.evaluated.csv"
-    file_exists = path.exists()
 
     if not rows:
         return 0
 
-    with path.open("a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=EVAL_HEADERS)
-        if not file_exists:
-            writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
+    csv_journal.append(path, EVAL_HEADERS, rows)
+    evaluated_index.add(token, [r.get("signal_ts") for r in rows])
 
-    # 2. DB
+    # 2. DB (batched reconciliation)
     try:
-        from backend.database import SessionLocal
-        from backend.models_db import (
-            Signal,
-            SignalEvaluation,
-        )
-        from sqlalchemy import select
+        from database import SessionLocal
+        from core import dashboard_cache
 
         db = SessionLocal()
-        strategies_to_update = set()
-
         try:
-            for row in rows:
-                # Buscar la señal original
-                ts_str = row.get("signal_ts")
-                if not ts_str:
-                    continue
-
-                # Parse timestamp to match DB format
-                try:
-                    ts_dt = _parse_iso_ts(ts_str)
-                except Exception:
-                    continue
-
-                # Buscar Signal por token y timestamp
-                stmt = select(Signal).where(
-                    Signal.token == token.upper(), Signal.timestamp == ts_dt
-                )
-                signal_obj = db.execute(stmt).scalars().first()
-
-                if not signal_obj:
-                    # Fallback: buscar por rango de 1 segundo
-                    stmt = select(Signal).where(
-                        Signal.token == token.upper(),
-                        Signal.timestamp >= ts_dt - timedelta(seconds=1),
-                        Signal.timestamp <= ts_dt + timedelta(seconds=1),
-                    )
-                    signal_obj = db.execute(stmt).scalars().first()
-
-                if signal_obj:
-                    # Verificar si ya tiene evaluación
-                    if signal_obj.evaluation:
-                        continue
-
-                    # Crear evaluación
-                    eval_obj = SignalEvaluation(
-                        signal_id=signal_obj.id,
-                        evaluated_at=datetime.utcnow(),
-                        result=row.get("result"),
-                        pnl_r=0.0,
-                        exit_price=float(row.get("price_at_eval", 0)),
-                    )
-                    db.add(eval_obj)
-
-                    # Mark strategy for stats update if present
-                    if signal_obj.strategy_id:
-                        strategies_to_update.add(signal_obj.strategy_id)
-
+            touched_users: Set[int] = set()
+            _reconcile_evaluations(db, token, rows, touched_users)
             db.commit()
-
-            # 3. Update Strategy Stats
-            for strat_id in strategies_to_update:
-                _update_strategy_stats(strat_id, db)
-
+            dashboard_cache.invalidate(touched_users)
         except Exception as e:
             print(f"[DB ERROR] Error guardando evaluaciones en DB: {e}")
             db.rollback()
@@ -171,47 +298,6 @@ def _append_evaluations(token: str, rows: List[Dict[str, str]]) -> int:
     return len(rows)
 
 
-def _update_strategy_stats(strategy_id: str, db) -> None:
-    """Recalculate and update stats for a given strategy."""
-    from models_db import Signal, SignalEvaluation, StrategyConfig
-    from sqlalchemy import func
-
-    # Count total evaluated for this strategy
-    total_eval = (
-        db.query(func.count(SignalEvaluation.id))
-        .join(Signal, Signal.id == SignalEvaluation.signal_id)
-        .filter(Signal.strategy_id == strategy_id)
-        .scalar()
-        or 0
-    )
-
-    # Count wins (hit-tp)
-    total_wins = (
-        db.query(func.count(SignalEvaluation.id))
-        .join(Signal, Signal.id == SignalEvaluation.signal_id)
-        .filter(Signal.strategy_id == strategy_id)
-        .filter(SignalEvaluation.result == "hit-tp")
-        .scalar()
-        or 0
-    )
-
-    # Calculate Rate
-    win_rate = (total_wins / total_eval) if total_eval > 0 else 0.0
-
-    # Update Config
-    strat_config = (
-        db.query(StrategyConfig)
-        .filter(StrategyConfig.strategy_id == strategy_id)
-        .first()
-    )
-    if strat_config:
-        strat_config.win_rate = win_rate
-        db.commit()
-        print(
-            f"[STATS] Updated {strategy_id}: WinRate={win_rate:.2%} ({total_wins}/{total_eval})"
-        )
-
-
 def _evaluate_signal_row(row: Dict[str, str]) -> Dict[str, str]:
     """
     Dada una fila de logs LITE, calcula la evaluación:
@@ -350,11 +436,13 @@ def evaluate_all_tokens() -> Tuple[int, int]:
 
     Devuelve (num_tokens_procesados, num_evaluaciones_nuevas).
     """
+    csv_journal.flush()  # filas encoladas por el journal -> disco
     if not LITE_DIR.exists():
         print("[EVAL] No existe logs/LITE, nada que evaluar.")
         return 0, 0
 
-    tokens = sorted(p.stem for p in LITE_DIR.glob("*.csv"))
+    # Segmentos rotados ({token}.{YYYYMMDD}.csv) no son tokens
+    tokens = sorted(p.stem for p in LITE_DIR.glob("*.csv") if "." not in p.stem)
     total_tokens = 0
     total_evals = 0
 
@@ -3,6 +3,7 @@ import ta
 
 # Importar desde el módulo core
 from core.market_data_api import get_ohlcv_data
+from market_data.resample import resampled_ohlcv, resampled_source
 
 # Exchange ID for data source (used by evaluator)
 EXCHANGE_ID = "binance"
@@ -22,9 +23,14 @@ def get_market_data(symbol: str, timeframe: str = "1h", limit: int = 1000):
             f"[DEBUG MARKET] Signature: {inspect.signature(market_data_api.get_ohlcv_data)}"
         )
 
-        ohlcv_data, source_id = get_ohlcv_data(
-            symbol, timeframe, limit, return_source=True
-        )
+        # 1h / 4h / 1d: from the local 1h series (one network series per symbol)
+        ohlcv_data = resampled_ohlcv(symbol, timeframe, limit)
+        if ohlcv_data:
+            source_id = resampled_source(symbol)
+        else:
+            ohlcv_data, source_id = get_ohlcv_data(
+                symbol, timeframe, limit, return_source=True
+            )
 
         if not ohlcv_data:
             return None, None
@@ -19,7 +19,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from database import SessionLocal, engine, Base, get_db
-from models_db import User, Signal, SignalEvaluation
+from models_db import SIGNAL_CLOSED, User, Signal, SignalEvaluation
 from telegram_listener import start_telegram_polling
 
 from routers.auth_new import router as auth_router
@@ -36,6 +36,7 @@ from routers.system import router as system_router
 from routers.admin import router as admin_router
 from routers.alerts import router as alerts_router
 from routers.advisor import router as advisor_router
+from routers.market import router as market_router
 
 from core.entitlements import get_user_entitlements
 from core.trial_policy import get_access_tier
@@ -132,6 +133,7 @@ app.include_router(admin_router, prefix="/admin", tags=["Admin"])
 app.include_router(logs_router, prefix="/logs", tags=["Logs"])
 app.include_router(alerts_router, prefix="/alerts", tags=["Alerts"])
 app.include_router(advisor_router, prefix="/advisor", tags=["Advisor"])
+app.include_router(market_router, prefix="/market", tags=["Market"])
 
 from fastapi.responses import FileResponse
 
@@ -283,7 +285,78 @@ async def on_startup():
                 conn.rollback()
                 # LOG.info(f"Signals Schema Patch skipped (likely exists): {e}")
                 pass
-                
+
+            # === PATCH: Signals evaluator progress column ===
+            try:
+                conn.execute(text("ALTER TABLE signals ADD COLUMN last_evaluated_bar_ts TIMESTAMP"))
+                conn.commit()
+                LOG.info("Signals Schema Patch APPLIED (last_evaluated_bar_ts added).")
+            except Exception:
+                conn.rollback()
+
+            # === PATCH: Signals real emission time ===
+            try:
+                conn.execute(text("ALTER TABLE signals ADD COLUMN emitted_at TIMESTAMP"))
+                conn.commit()
+                LOG.info("Signals Schema Patch APPLIED (emitted_at added).")
+            except Exception:
+                conn.rollback()
+
+            # === PATCH: Signals lifecycle status (+ backfill from evaluations) ===
+            try:
+                conn.execute(text("ALTER TABLE signals ADD COLUMN status VARCHAR NOT NULL DEFAULT 'OPEN'"))
+                conn.execute(text(
+                    "UPDATE signals SET status = 'CLOSED' "
+                    "WHERE id IN (SELECT signal_id FROM signal_evaluations WHERE signal_id IS NOT NULL)"
+                ))
+                conn.execute(text(
+                    "UPDATE signals SET status = 'WATCH' "
+                    "WHERE status = 'OPEN' AND LOWER(source) LIKE '%watchlist%'"
+                ))
+                conn.commit()
+                LOG.info("Signals Schema Patch APPLIED (status added + backfilled).")
+            except Exception:
+                conn.rollback()
+
+            try:
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_signals_open_timestamp "
+                    "ON signals (timestamp) WHERE status <> 'CLOSED'"
+                ))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_signals_token_timestamp ON signals (token, timestamp)"
+                ))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_signals_feed "
+                    "ON signals (timestamp, id) WHERE is_saved = 1"
+                ))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+
+            # === PATCH: Watch alerts price-level columns ===
+            for col_def in [
+                "strategy_id VARCHAR",
+                "side VARCHAR",
+                "trigger_price FLOAT",
+                "distance_atr FLOAT",
+                "expires_at TIMESTAMP",
+                "status VARCHAR DEFAULT 'PENDING'",
+                "fired_at TIMESTAMP",
+                "last_check_at TIMESTAMP",
+                "payload TEXT",
+            ]:
+                try:
+                    conn.execute(text(f"ALTER TABLE watch_alerts ADD COLUMN {col_def}"))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+            try:
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_watch_alerts_status ON watch_alerts (status)"))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+
     except Exception:
         LOG.exception("Emergency Schema Patch failed")
 
@@ -297,6 +370,37 @@ async def on_startup():
 
     Base.metadata.create_all(bind=engine)
 
+    # Warm the in-memory idempotency filter (repeat signal emissions skip the DB)
+    try:
+        from core.idempotency_filter import idempotency_filter
+        db = SessionLocal()
+        try:
+            idempotency_filter.warm(db)
+        finally:
+            db.close()
+    except Exception:
+        LOG.exception("Idempotency filter warm-up failed")
+
+    # Notification outbox delivery (opt-out: RUN_OUTBOX_WORKER=false)
+    try:
+        from core.notification_outbox import OUTBOX_ENABLED
+        if OUTBOX_ENABLED:
+            from outbox_worker import start_outbox_worker_thread
+            start_outbox_worker_thread()
+    except Exception:
+        LOG.exception("Failed to start outbox worker")
+
+    # Shared last-price oracle + market board: one batched fetch_tickers per interval
+    # (opt-out: RUN_PRICE_ORACLE=false)
+    if os.getenv("RUN_PRICE_ORACLE", "true").lower() in ("1", "true", "yes"):
+        try:
+            from core.market_data_api import MARKET_BOARD_SYMBOLS
+            from core.price_oracle import price_oracle
+            price_oracle.track(MARKET_BOARD_SYMBOLS)  # /market/summary board
+            price_oracle.start()
+        except Exception:
+            LOG.exception("Failed to start price oracle")
+
     # Ensure registry is loaded for any endpoints relying on it
     try:
         load_default_strategies()
@@ -338,6 +442,28 @@ async def on_startup():
         )
 
 
+@app.on_event("shutdown")
+def on_shutdown():
+    # Flush pending write-behind CSV rows before the process exits
+    try:
+        from core.csv_journal import csv_journal
+        csv_journal.close()
+    except Exception:
+        LOG.exception("CSV journal flush failed")
+
+    try:
+        from core.password_hasher import password_hasher
+        password_hasher.shutdown()
+    except Exception:
+        LOG.exception("Password hasher shutdown failed")
+
+    try:
+        from core.price_oracle import price_oracle
+        price_oracle.stop()
+    except Exception:
+        LOG.exception("Price oracle stop failed")
+
+
 # ====== Health ======
 @app.get("/health")
 def health():
@@ -403,11 +529,9 @@ def compute_stats_summary(db: Session, user: User):
     wins_24h = q_wins.scalar() or 0
     win_rate_24h = (wins_24h / eval_24h_count * 100) if eval_24h_count > 0 else 0
 
-    # 4) Open signals (saved signals without evaluation row)
-    open_q = db.query(func.count(Signal.id)).outerjoin(
-        SignalEvaluation, SignalEvaluation.signal_id == Signal.id
-    )
-    open_q = apply_filters(open_q).filter(SignalEvaluation.id.is_(None))
+    # 4) Open signals (saved signals not CLOSED yet)
+    open_q = db.query(func.count(Signal.id))
+    open_q = apply_filters(open_q).filter(Signal.status != SIGNAL_CLOSED)
     open_signals_count = int(open_q.scalar() or 0)
 
     # 5) PnL 7d
@@ -458,6 +582,7 @@ app.include_router(system_router, prefix="/system", tags=["System"])
 app.include_router(admin_router, prefix="/admin", tags=["Admin"])
 app.include_router(alerts_router, prefix="/alerts", tags=["Alerts"])
 app.include_router(advisor_router, prefix="/advisor", tags=["Advisor"])
+app.include_router(market_router, prefix="/market", tags=["Market"])
 
 
 if __name__ == "__main__":
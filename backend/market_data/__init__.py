@@ -5,6 +5,7 @@ from typing import Dict, Tuple
 
 from .models import PriceSnapshot, OHLCVSlice, Timeframe
 from .providers.ccxt_provider import fetch_price_snapshot, fetch_ohlcv_slice
+from .resample import resampled_ohlcv
 import pandas as pd
 
 # Cachés simples en memoria
@@ -18,8 +19,25 @@ OHLCV_TTL = timedelta(seconds=60)
 
 def get_price_snapshot(token: str) -> PriceSnapshot:
     """
-    Devuelve un snapshot de precio actual para el token dado, con caché ligera.
+    Devuelve un snapshot de precio actual para el token dado.
+    Servido desde core.price_oracle (en memoria, un fetch_tickers por intervalo
+    para todos los símbolos); fetch_ticker propio si el oráculo no lo cotiza o
+    su cotización está stale.
     """
+    from core.price_oracle import QUOTE, price_oracle
+
+    quote = price_oracle.get(token)
+    if quote is not None and not quote.stale:
+        return PriceSnapshot(
+            token=token.lower(),
+            symbol=f"{quote.token}/{QUOTE}",
+            exchange=quote.exchange,
+            price=quote.price,
+            change_24h=quote.change_24h,
+            volume_24h=quote.volume_24h,
+            ts=datetime.fromtimestamp(quote.ts, tz=timezone.utc),
+        )
+
     now = datetime.now(timezone.utc)
     key = token.lower()
 
@@ -37,7 +55,24 @@ def get_ohlcv(token: str, timeframe: Timeframe, limit: int = 200) -> pd.DataFram
     """
     Devuelve un DataFrame de OHLCV para el token y timeframe dados.
     Columns: [time, open, high, low, close, volume]
+
+    1h / 4h / 1d salen de la serie 1h local (market_data.resample): una sola
+    serie de red por símbolo para los tres. Otros timeframes, nativos.
     """
+    records = resampled_ohlcv(token, timeframe, limit)
+    if records:
+        df = pd.DataFrame([{
+            "iso_time": datetime.fromtimestamp(r["timestamp"] / 1000, tz=timezone.utc),
+            "open": r["open"],
+            "high": r["high"],
+            "low": r["low"],
+            "close": r["close"],
+            "volume": r["volume"],
+        } for r in records])
+        cols = ["open", "high", "low", "close", "volume"]
+        df[cols] = df[cols].astype(float)
+        return df
+
     now = datetime.now(timezone.utc)
     key = (token.lower(), "default", timeframe)
 
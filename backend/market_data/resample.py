@@ -0,0 +1,320 @@
+"""
+Local timeframe resampling from one stored 1h series per symbol.
+
+Multi-timeframe consumers (scheduler strategies 1h/4h/1d, LITE engine, PRO
+context pack) used to fetch every timeframe from the exchange. Here:
+
+- `SeriesStore` keeps ONE 1h series per symbol: backfilled once (paged
+  `get_ohlcv_since`), then only the tail is refetched (one small request per
+  RESAMPLE_TAIL_TTL seconds). The exchange the series came from is recorded
+  and the tail is fetched from that same exchange; if it stops answering the
+  series is backfilled again from the priority list (never mixed).
+- 4h / 1d are built locally (`resample_candles`), buckets aligned to the
+  exchange session boundaries (UTC epoch + MARKET_SESSION_OFFSET_HOURS, the
+  same alignment Binance / Bybit / Kraken use).
+- Partial bars: a leading bucket the series starts in the middle of is
+  dropped (wrong open / volume); the bucket still forming (or missing base
+  bars) is kept and flagged `partial`, like the exchanges' forming candle.
+- Verification: every RESAMPLE_VERIFY_SECONDS per (symbol, timeframe) the
+  closed bars are compared with native candles of the series' own exchange
+  (`verify_against_native`). On mismatch that pair is served natively until
+  a later check passes.
+
+MARKET_RESAMPLE=false disables it (callers get None and fetch natively).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+RESAMPLE_ENABLED = os.getenv("MARKET_RESAMPLE", "true").lower() in ("1", "true", "yes")
+BASE_TIMEFRAME = "1h"
+BASE_MS = 3600 * 1000
+TARGETS = {"1h": 1, "4h": 4, "1d": 24}  # timeframe -> base bars per bucket
+SESSION_OFFSET_MS = int(float(os.getenv("MARKET_SESSION_OFFSET_HOURS", "0")) * 3600 * 1000)
+TAIL_TTL = float(os.getenv("RESAMPLE_TAIL_TTL", "60"))
+MAX_BASE_BARS = int(os.getenv("RESAMPLE_MAX_BASE_BARS", str(24 * 400)))
+VERIFY_SECONDS = float(os.getenv("RESAMPLE_VERIFY_SECONDS", "3600"))
+VERIFY_BARS = 10
+
+
+def normalize_timeframe(timeframe: str) -> str:
+    return str(timeframe or "").strip().lower()
+
+
+def can_resample(timeframe: str) -> bool:
+    return normalize_timeframe(timeframe) in TARGETS
+
+
+def _record(ts: int, o: float, h: float, low: float, c: float, v: float) -> Dict[str, Any]:
+    # Same shape as core.market_data_api.get_ohlcv_data
+    return {
+        "timestamp": ts,
+        "time": datetime.fromtimestamp(ts / 1000).strftime("%Y-%m-%d %H:%M"),
+        "open": o,
+        "high": h,
+        "low": low,
+        "close": c,
+        "volume": v,
+    }
+
+
+def resample_candles(
+    candles: List[Dict[str, Any]],
+    timeframe: str,
+    now_ms: Optional[int] = None,
+    offset_ms: int = SESSION_OFFSET_MS,
+) -> List[Dict[str, Any]]:
+    """
+    1h candles (dicts with timestamp ms / open / high / low / close / volume,
+    ascending) -> `timeframe` candles. Each output has `partial` (bucket not
+    closed yet or missing base bars).
+    """
+    factor = TARGETS[normalize_timeframe(timeframe)]
+    tf_ms = factor * BASE_MS
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+
+    buckets: List[Tuple[int, List[Dict[str, Any]]]] = []
+    for c in candles:
+        start = (c["timestamp"] - offset_ms) // tf_ms * tf_ms + offset_ms
+        if buckets and buckets[-1][0] == start:
+            buckets[-1][1].append(c)
+        else:
+            buckets.append((start, [c]))
+
+    # Series starts mid-bucket: its open / volume would be wrong
+    if buckets and buckets[0][1][0]["timestamp"] != buckets[0][0]:
+        buckets.pop(0)
+
+    out = []
+    for start, bars in buckets:
+        row = _record(
+            start,
+            bars[0]["open"],
+            max(b["high"] for b in bars),
+            min(b["low"] for b in bars),
+            bars[-1]["close"],
+            sum(b["volume"] for b in bars),
+        )
+        row["partial"] = len(bars) < factor or start + tf_ms > now_ms
+        out.append(row)
+    return out
+
+
+def verify_against_native(
+    resampled: List[Dict[str, Any]],
+    native: List[Dict[str, Any]],
+    price_tol: float = 1e-9,
+    volume_tol: float = 1e-3,
+) -> Dict[str, Any]:
+    """
+    Compares closed resampled bars with native candles of the same timestamp
+    (the native forming bar is skipped). Tolerances are relative.
+    """
+    native_closed = {c["timestamp"]: c for c in native[:-1]}
+    mismatches = []
+    compared = 0
+    for bar in resampled:
+        ref = native_closed.get(bar["timestamp"])
+        if ref is None or bar.get("partial"):
+            continue
+        compared += 1
+        for field, tol in (("open", price_tol), ("high", price_tol), ("low", price_tol),
+                           ("close", price_tol), ("volume", volume_tol)):
+            ours, theirs = float(bar[field]), float(ref[field])
+            if abs(ours - theirs) > tol * max(abs(theirs), 1e-12):
+                mismatches.append({"timestamp": bar["timestamp"], "field": field, "resampled": ours, "native": theirs})
+    return {"compared": compared, "mismatches": mismatches, "ok": compared > 0 and not mismatches}
+
+
+class SeriesStore:
+    """Per-symbol 1h series (in-process), with tail refresh and sampled native verification."""
+
+    def __init__(self, fetch_since=None, fetch_native=None, tail_ttl: float = TAIL_TTL,
+                 max_base_bars: int = MAX_BASE_BARS, verify_seconds: float = VERIFY_SECONDS):
+        self._fetch_since = fetch_since or _fetch_since
+        self._fetch_native = fetch_native or _fetch_native
+        self.tail_ttl = tail_ttl
+        self.max_base_bars = max_base_bars
+        self.verify_seconds = verify_seconds
+        self._series: Dict[str, List[Dict[str, Any]]] = {}
+        self._sources: Dict[str, str] = {}  # symbol -> exchange the series came from
+        self._refreshed: Dict[str, float] = {}
+        self._backfilled: Dict[str, int] = {}  # deepest backfill asked (short listings stop retrying)
+        self._verified: Dict[Tuple[str, str], Tuple[float, bool]] = {}  # -> (at, ok)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {"backfills": 0, "tail_fetches": 0, "served": 0, "verifications": 0, "mismatches": 0}
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def base_series(self, symbol: str, bars: int) -> List[Dict[str, Any]]:
+        """At least `bars` 1h candles (when the exchange has them), tail fresh within tail_ttl."""
+        symbol = symbol.upper()
+        bars = min(bars, self.max_base_bars)
+        with self._symbol_lock(symbol):
+            series = self._series.get(symbol, [])
+            now = time.time()
+            if len(series) < bars and self._backfilled.get(symbol, 0) < bars:
+                series = self._backfill(symbol, series, bars, now)
+            elif series and now - self._refreshed.get(symbol, 0) >= self.tail_ttl:
+                # Only from the last stored bar (it may still have been forming), same exchange
+                fresh, _ = self._fetch_since(symbol, BASE_TIMEFRAME, series[-1]["timestamp"], 1000,
+                                             self._sources.get(symbol))
+                self._count("tail_fetches")
+                if fresh:
+                    series = self._merge(series, fresh)
+                    self._refreshed[symbol] = now
+                else:
+                    # Source down: rebuild the whole series elsewhere rather than mix exchanges
+                    series = self._backfill(symbol, series, len(series), now)
+                    self._refreshed[symbol] = now
+            self._series[symbol] = series
+            return series
+
+    def _backfill(self, symbol: str, series: List[Dict[str, Any]], bars: int, now: float) -> List[Dict[str, Any]]:
+        since = (int(now * 1000) // BASE_MS - bars + 1) * BASE_MS
+        fresh, source = self._fetch_since(symbol, BASE_TIMEFRAME, since, bars + 1, None)
+        self._count("backfills")
+        if not fresh:
+            return series
+        self._backfilled[symbol] = bars
+        self._refreshed[symbol] = now
+        with self._lock:
+            previous = self._sources.get(symbol)
+            self._sources[symbol] = source
+            if previous != source:
+                # Another exchange's bars: verify again against the new source
+                for key in [k for k in self._verified if k[0] == symbol]:
+                    del self._verified[key]
+        if previous is not None and previous != source:
+            print(f"[RESAMPLE] {symbol} series source {previous} -> {source}")
+            series = []
+        return self._merge(series, fresh)
+
+    def _merge(self, series: List[Dict[str, Any]], fresh: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        first = fresh[0]["timestamp"]
+        older = [c for c in series if c["timestamp"] < first]
+        newer = [c for c in series if c["timestamp"] > fresh[-1]["timestamp"]]
+        return (older + list(fresh) + newer)[-self.max_base_bars:]
+
+    def candles(self, symbol: str, timeframe: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        `limit` candles of `timeframe` built from the 1h series, or None when
+        this timeframe can't / shouldn't be resampled (caller fetches natively).
+        """
+        tf = normalize_timeframe(timeframe)
+        if not RESAMPLE_ENABLED or tf not in TARGETS:
+            return None
+        symbol = symbol.upper()
+        factor = TARGETS[tf]
+        # +1 bucket: the leading one may be partial and dropped. Loaded first:
+        # verification compares against this series and its source.
+        base = self.base_series(symbol, (limit + 1) * factor)
+        if not base or not self._verified_ok(symbol, tf):
+            return None
+        out = [dict(c) for c in base] if factor == 1 else resample_candles(base, tf)
+        self._count("served")
+        return out[-limit:]
+
+    # --- verification ---
+    def _verified_ok(self, symbol: str, tf: str) -> bool:
+        if tf == BASE_TIMEFRAME:
+            return True
+        key = (symbol, tf)
+        with self._lock:
+            last = self._verified.get(key)
+        if last is not None and time.time() - last[0] < self.verify_seconds:
+            return last[1]
+        return self.verify(symbol, tf)
+
+    def verify(self, symbol: str, tf: str) -> bool:
+        """
+        Resampled vs native for the last VERIFY_BARS bars, native candles from
+        the exchange the series came from. No native data -> trust resampling.
+        """
+        symbol, tf = symbol.upper(), normalize_timeframe(tf)
+        ok = True
+        try:
+            base = self.base_series(symbol, (VERIFY_BARS + 1) * TARGETS[tf])
+            source = self._sources.get(symbol)
+            native = self._fetch_native(symbol, tf, VERIFY_BARS, source) if base and source else []
+            if native:
+                res = verify_against_native(resample_candles(base, tf), native)
+                self._count("verifications")
+                if res["mismatches"]:
+                    ok = False
+                    self._count("mismatches")
+                    print(f"[RESAMPLE] {symbol} {tf} differs from native {source} "
+                          f"({len(res['mismatches'])} fields): serving native candles")
+        except Exception as e:
+            print(f"[RESAMPLE] Verification failed for {symbol} {tf}: {e}")
+        with self._lock:
+            self._verified[(symbol, tf)] = (time.time(), ok)
+        return ok
+
+    def source(self, symbol: str) -> Optional[str]:
+        """Exchange the symbol's 1h series came from (None before the first fetch)."""
+        with self._lock:
+            return self._sources.get(symbol.upper())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._sources.clear()
+            self._refreshed.clear()
+            self._backfilled.clear()
+            self._verified.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            s["symbols"] = len(self._series)
+            s["sources"] = dict(self._sources)
+            s["native_only"] = sorted(f"{sym}:{tf}" for (sym, tf), (_, ok) in self._verified.items() if not ok)
+        return s
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+
+def _fetch_since(
+    symbol: str, timeframe: str, since_ms: int, max_candles: int, source: Optional[str]
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    from core.market_data_api import get_ohlcv_since
+
+    return get_ohlcv_since(symbol, timeframe, since_ms, max_candles=max_candles,
+                           exchanges=[source] if source else None, return_source=True)
+
+
+def _fetch_native(symbol: str, timeframe: str, limit: int, source: str) -> List[Dict[str, Any]]:
+    # Same exchange as the base series (get_ohlcv_data races four exchanges)
+    from core.market_data_api import get_ohlcv_since
+
+    tf_ms = TARGETS[timeframe] * BASE_MS
+    since = (int(time.time() * 1000) // tf_ms - limit) * tf_ms
+    return get_ohlcv_since(symbol, timeframe, since, max_candles=limit + 1, exchanges=[source])
+
+
+series_store = SeriesStore()
+
+
+def resampled_source(symbol: str) -> str:
+    """source_exchange for resampled candles, e.g. 'binance (resampled)'."""
+    return f"{series_store.source(symbol) or 'unknown'} (resampled)"
+
+
+def resampled_ohlcv(symbol: str, timeframe: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+    """Records like core.market_data_api.get_ohlcv_data, or None -> fetch natively."""
+    try:
+        return series_store.candles(symbol, timeframe, limit)
+    except Exception as e:
+        print(f"[RESAMPLE] {symbol} {timeframe} failed, using native: {e}")
+        return None
@@ -7,6 +7,8 @@
     Text,
     ForeignKey,
     UniqueConstraint,
+    Index,
+    text,
 )
 
 from sqlalchemy.orm import relationship
@@ -14,6 +16,12 @@ from datetime import datetime
 from database import Base
 
 
+# Signal lifecycle (signals.status)
+SIGNAL_OPEN = "OPEN"  # pending evaluation
+SIGNAL_WATCH = "WATCH"  # watchlist setup, evaluated like OPEN
+SIGNAL_CLOSED = "CLOSED"  # has a SignalEvaluation
+
+
 class Signal(Base):
     __tablename__ = "signals"
 
@@ -49,12 +57,35 @@ class Signal(Base):
     )  # 0=Visible, 1=Hidden (Boolean as Integer for SQLite/Postgres compatibility)
     is_saved = Column(Integer, default=0)  # 0=Transient, 1=Saved/Tracked by user
     extra = Column(Text, nullable=True)  # JSON Metadata encoded as string
+    # Real emission time (UTC); `timestamp` is snapped to the bar open for dedup
+    emitted_at = Column(DateTime, nullable=True)
+    # Evaluator progress: open ts of the last CLOSED bar already scanned (UTC)
+    last_evaluated_bar_ts = Column(DateTime, nullable=True)
+    # Lifecycle: OPEN / WATCH -> CLOSED (set in the same transaction as the evaluation)
+    status = Column(String, default=SIGNAL_OPEN, server_default=SIGNAL_OPEN, nullable=False)
 
     # [HARDENING] Persistent Deduplication
     __table_args__ = (
         UniqueConstraint(
             "strategy_id", "token", "timestamp", "direction", name="uq_signal_dedup"
         ),
+        # Evaluator hot query: non-closed signals older than cutoff
+        Index(
+            "ix_signals_open_timestamp",
+            "timestamp",
+            postgresql_where=text("status <> 'CLOSED'"),
+            sqlite_where=text("status <> 'CLOSED'"),
+        ),
+        # strategy_id lookups already lead uq_signal_dedup
+        Index("ix_signals_token_timestamp", "token", "timestamp"),
+        # Signals feed keyset cursor: saved rows ordered by (timestamp, id)
+        Index(
+            "ix_signals_feed",
+            "timestamp",
+            "id",
+            postgresql_where=text("is_saved = 1"),
+            sqlite_where=text("is_saved = 1"),
+        ),
     )
 
 
@@ -261,8 +292,82 @@ class WatchAlert(Base):
     enabled = Column(Integer, default=1)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Price-level alert (routers/alerts, services/alerts_checker)
+    strategy_id = Column(String, nullable=True)
+    side = Column(String, nullable=True)  # LONG / SHORT
+    trigger_price = Column(Float, nullable=True)
+    distance_atr = Column(Float, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    status = Column(String, default="PENDING", index=True)  # PENDING, TRIGGERED, EXPIRED, CANCELED
+    fired_at = Column(DateTime, nullable=True)
+    last_check_at = Column(DateTime, nullable=True)
+    payload = Column(Text, nullable=True)  # JSON as string
+
+
+class NotificationOutbox(Base):
+    """
+    Transactional outbox: one row per notification to deliver, written in the
+    SAME transaction as the signal insert. Delivered by outbox_worker.py.
+    """
+
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True)
+    # SET NULL: deleting a signal must not be blocked by its (sent / failed) notifications
+    signal_id = Column(Integer, ForeignKey("signals.id", ondelete="SET NULL"), nullable=True)
+    channel = Column(String, nullable=False)  # push | telegram
+    payload = Column(Text, nullable=False)  # JSON
+    status = Column(String, default="pending", nullable=False)  # pending | processing | sent | failed
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    claimed_by = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    available_at = Column(DateTime, default=datetime.utcnow)
+    claimed_at = Column(DateTime, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_status_available", "status", "available_at"),
+    )
+
+
+class StrategyPerformanceDaily(Base):
+    """
+    Rollup de performance por (strategy_id, token, timeframe, day).
+    Updated incrementally with every new SignalEvaluation (same transaction);
+    rebuilt from scratch by tools/rebuild_strategy_rollups.py.
+    """
+
+    __tablename__ = "strategy_performance_daily"
+
+    id = Column(Integer, primary_key=True)
+    strategy_id = Column(String, nullable=False)
+    token = Column(String, nullable=False)
+    timeframe = Column(String, nullable=False)
+    day = Column(String, nullable=False)  # YYYY-MM-DD (evaluated_at, UTC)
+
+    wins = Column(Integer, default=0, nullable=False)
+    losses = Column(Integer, default=0, nullable=False)
+    breakeven = Column(Integer, default=0, nullable=False)
+    count = Column(Integer, default=0, nullable=False)  # all evaluations (incl. neutral)
+    sum_r = Column(Float, default=0.0, nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        UniqueConstraint("strategy_id", "token", "timeframe", "day", name="uq_strategy_perf_day"),
+    )
 
 
+class AdminCounter(Base):
+    """
+    Contadores materializados del admin dashboard (core.admin_counters).
+    name: users_total, users_plan:PRO, signals_created:YYYYMMDDHH, ...
+    """
 
+    __tablename__ = "admin_counters"
 
+    name = Column(String, primary_key=True)
+    value = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -1,10 +1,6 @@
 from __future__ import annotations
 import os
-import json
 import requests
-from pywebpush import webpush, WebPushException
-from database import SessionLocal
-from models_db import PushSubscription
 
 
 def send_telegram(text: str, chat_id: str = None) -> dict:
@@ -35,48 +31,9 @@ def send_telegram(text: str, chat_id: str = None) -> dict:
 
 def send_push_notification(title: str, body: str, data: dict = None) -> dict:
     """
-    Send Web Push notification to all subscribers.
+    Send Web Push notification to all subscribers (synchronous, bounded pool).
+    Signal pushes go through core.push_dispatcher.enqueue() instead (coalesced).
     """
-    private_key = os.getenv("VAPID_PRIVATE_KEY")
-    if not private_key:
-        return {"ok": False, "error": "Missing VAPID_PRIVATE_KEY"}
+    from core.push_dispatcher import push_dispatcher
 
-    # Claims for VAPID
-    claims = {"sub": os.getenv("VAPID_MAIL", "mailto:admin@tradercopilot.com")}
-
-    db = SessionLocal()
-    subs = db.query(PushSubscription).all()
-
-    results = {"success": 0, "failed": 0, "removed": 0}
-
-    payload = json.dumps(
-        {"title": title, "body": body, "icon": "/icon-192.png", "data": data or {}}
-    )
-
-    for sub in subs:
-        try:
-            webpush(
-                subscription_info={
-                    "endpoint": sub.endpoint,
-                    "keys": {"p256dh": sub.p256dh, "auth": sub.auth},
-                },
-                data=payload,
-                vapid_private_key=private_key,
-                vapid_claims=claims,
-            )
-            results["success"] += 1
-        except WebPushException as ex:
-            # If 410 Gone, remove subscription
-            if ex.response and ex.response.status_code == 410:
-                db.delete(sub)
-                results["removed"] += 1
-            else:
-                results["failed"] += 1
-                print(f"WebPush Error: {ex}")
-        except Exception as e:
-            results["failed"] += 1
-            print(f"General Push Error: {e}")
-
-    db.commit()
-    db.close()
-    return results
+    return push_dispatcher.send_now(title, body, data)
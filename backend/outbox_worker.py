@@ -0,0 +1,181 @@
+# backend/outbox_worker.py
+"""
+Notification outbox delivery worker.
+
+Claims batches from `notification_outbox` (see core.notification_outbox) and
+delivers them independently of signal creation:
+- push: all push rows of a batch -> ONE coalesced Web Push (core.push_dispatcher)
+- telegram: grouped by plan -> chat ids -> services.telegram_queue (rate-limited).
+  Only rows delivered to every chat are marked sent; a row whose delivery
+  failed for some chats keeps just those chats in its payload and is retried
+  with backoff. The wait stays well below the claim visibility timeout so a
+  slow batch is never reclaimed (and re-sent) by another worker.
+
+Sent rows are pruned every OUTBOX_PRUNE_SECONDS (see OUTBOX_RETENTION_DAYS).
+
+Run standalone (`python outbox_worker.py`) or as a thread inside the API /
+scheduler process (start_outbox_worker_thread). Several workers can run at
+once: claims never overlap.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from database import SessionLocal
+from core import notification_outbox as outbox
+
+LOG = logging.getLogger("outbox_worker")
+
+POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+TELEGRAM_WAIT_SECONDS = min(float(os.getenv("OUTBOX_TELEGRAM_WAIT_SECONDS", "60")), outbox.VISIBILITY_SECONDS / 3)
+PRUNE_SECONDS = float(os.getenv("OUTBOX_PRUNE_SECONDS", "3600"))
+
+_thread_lock = threading.Lock()
+_thread: threading.Thread = None
+
+
+class OutboxWorker:
+    def __init__(self, poll_seconds: float = POLL_SECONDS, batch_size: int = BATCH_SIZE, session_factory=None):
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.worker_id = f"outbox-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._session_factory = session_factory or SessionLocal
+
+    def run_once(self) -> int:
+        """Reclama y entrega un batch. Retorna el número de filas procesadas."""
+        db = self._session_factory()
+        try:
+            rows = outbox.claim_batch(db, self.worker_id, limit=self.batch_size)
+            if not rows:
+                return 0
+
+            started = time.monotonic()
+            by_channel: Dict[str, List[Any]] = defaultdict(list)
+            for row in rows:
+                by_channel[row.channel].append(row)
+
+            for channel, channel_rows in by_channel.items():
+                handler = self._handlers().get(channel)
+                if handler is None:
+                    outbox.mark_failed(db, channel_rows, f"Unknown channel: {channel}")
+                    continue
+                try:
+                    retry = handler(db, channel_rows) or []
+                    retry_ids = {r.id for r in retry}
+                    outbox.mark_sent(db, [r for r in channel_rows if r.id not in retry_ids])
+                    outbox.mark_failed(db, retry, f"{channel}: delivery incomplete")
+                except Exception as e:
+                    LOG.exception("Outbox delivery failed (%s)", channel)
+                    db.rollback()
+                    outbox.mark_failed(db, channel_rows, str(e))
+
+            outbox.record_batch(len(rows), time.monotonic() - started)
+            return len(rows)
+        finally:
+            db.close()
+
+    def _handlers(self):
+        return {outbox.PUSH: self._deliver_push, outbox.TELEGRAM: self._deliver_telegram}
+
+    def _deliver_push(self, db, rows: List[Any]) -> List[Any]:
+        """Retorna las filas a reintentar (error de envío o ningún dispositivo alcanzado)."""
+        from core.push_dispatcher import NOT_CONFIGURED, push_dispatcher
+
+        messages = [json.loads(r.payload) for r in rows]
+        title, body, data = push_dispatcher.coalesce(messages)
+        res = push_dispatcher.send_now(title, body, data)
+        if res.get("error") == NOT_CONFIGURED:
+            # Push no configurado (sin VAPID): nada que entregar, no reintentar
+            LOG.info("Push skipped: %s", res["error"])
+            return []
+        if res.get("error") or (res.get("failed") and not res.get("success")):
+            # Broadcast: a partial failure is not retried (it would re-send to delivered devices)
+            LOG.warning("Push delivery failed: %s", res)
+            return rows
+        return []
+
+    def _deliver_telegram(self, db, rows: List[Any]) -> List[Any]:
+        """Retorna las filas a reintentar; su payload queda con los chats que faltan."""
+        from services.telegram_queue import telegram_queue
+
+        chats_by_plan: Dict[str, List[str]] = {}
+        targets = []
+        items = []
+        for r in rows:
+            payload = json.loads(r.payload)
+            chat_ids = payload.get("chat_ids")
+            if chat_ids is None:
+                plan = payload["plan"]
+                if plan not in chats_by_plan:
+                    chats_by_plan[plan] = [str(c) for c in outbox.plan_chat_ids(db, plan)]
+                chat_ids = chats_by_plan[plan]
+            targets.append((r, payload, chat_ids))
+            items.extend((chat_id, payload["text"], r.id) for chat_id in chat_ids)
+
+        # One coalesced message per chat for this batch
+        outcome = telegram_queue.send_tracked(items, timeout=TELEGRAM_WAIT_SECONDS)
+
+        retry = []
+        for r, payload, chat_ids in targets:
+            # 'rejected' (chat bloqueado, id inválido) no se reintenta
+            owed = [c for c in chat_ids if outcome.get((r.id, c)) == "failed"]
+            if owed:
+                payload["chat_ids"] = owed
+                r.payload = json.dumps(payload)
+                retry.append(r)
+        return retry
+
+    def prune(self) -> int:
+        db = self._session_factory()
+        try:
+            pruned = outbox.prune_sent(db)
+            if pruned:
+                LOG.info("Pruned %d sent outbox rows", pruned)
+            return pruned
+        except Exception:
+            LOG.exception("Outbox prune failed")
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+
+    def run(self) -> None:
+        LOG.info("Outbox worker %s starting...", self.worker_id)
+        last_prune = 0.0
+        while True:
+            if time.monotonic() - last_prune >= PRUNE_SECONDS:
+                last_prune = time.monotonic()
+                self.prune()
+            try:
+                processed = self.run_once()
+            except Exception:
+                LOG.exception("Outbox worker iteration failed")
+                processed = 0
+            if processed < self.batch_size:
+                time.sleep(self.poll_seconds)
+
+
+def start_outbox_worker_thread() -> None:
+    """Arranca (una vez por proceso) el worker en un thread daemon."""
+    global _thread
+    if os.getenv("RUN_OUTBOX_WORKER", "true").lower() not in ("1", "true", "yes"):
+        return
+    with _thread_lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _thread = threading.Thread(target=OutboxWorker().run, name="outbox-worker", daemon=True)
+        _thread.start()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    OutboxWorker().run()
@@ -4,17 +4,9 @@ import random
 from pathlib import Path
 from typing import Dict, Optional, Any
 
-import requests
-
 BASE_DIR = Path(__file__).resolve().parent
 BRAIN_DIR = BASE_DIR / "brain"
 
-COINGECKO_IDS: Dict[str, str] = {
-    "ETH": "ethereum",
-    "BTC": "bitcoin",
-    "SOL": "solana",
-}
-
 
 def _load_snippet(token: str, name: str) -> str:
     """
@@ -47,39 +39,21 @@ def _load_snippet(token: str, name: str) -> str:
 
 def _get_realtime_snapshot(token: str) -> Optional[str]:
     """
-    Obtiene un snapshot simple de precio y cambio 24h desde CoinGecko.
+    Snapshot simple de precio y cambio 24h (core.price_oracle, en memoria).
     No debe romper el flujo si falla: devuelve None en caso de error.
     """
     token_upper = token.upper()
-    cg_id = COINGECKO_IDS.get(token_upper)
-    if not cg_id:
-        return None
 
     try:
-        resp = requests.get(
-            "https://api.coingecko.com/api/v3/simple/price",
-            params={
-                "ids": cg_id,
-                "vs_currencies": "usd",
-                "include_24hr_change": "true",
-            },
-            timeout=5,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        info = data.get(cg_id)
-        if not info:
-            return None
-
-        price = info.get("usd")
-        change = info.get("usd_24h_change")
+        from core.price_oracle import price_oracle
 
-        if price is None or change is None:
+        quote = price_oracle.get(token_upper)
+        if quote is None or quote.stale or quote.change_24h is None:
             return None
 
-        return f"{token_upper} = {price:.2f} USD · 24h: {change:+.2f}%"
+        return f"{token_upper} = {quote.price:.2f} USD · 24h: {quote.change_24h:+.2f}%"
     except Exception:
-        # No queremos tirar la señal porque CoinGecko falle un día
+        # No queremos tirar la señal porque el oráculo falle un día
         return None
 
 
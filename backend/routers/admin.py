@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import desc
 from typing import List, Optional, Any
 
+from core import admin_counters, async_queries
+from core.principal_cache import principal_cache
 from database import SessionLocal
 from models_db import User, Signal, AdminAuditLog
 from dependencies import require_owner
@@ -50,48 +52,13 @@ class PaginatedResponse(BaseModel):
 
 
 @router.get("/stats")
-async def get_admin_stats(db: Session = Depends(get_db)):
-    """KPIs for Admin Dashboard."""
-    from datetime import datetime, timedelta
-    
-    now = datetime.utcnow()
-    last_24h = now - timedelta(hours=24)
-
-    total_users = db.query(func.count(User.id)).scalar()
-    users_24h = db.query(func.count(User.id)).filter(User.created_at >= last_24h).scalar()
-
-    active_pro = (
-        db.query(func.count(User.id)).filter(User.plan.like("%PRO%")).scalar()
-    )  # PRO or OWNER likely
-
-    hidden_signals = (
-        db.query(func.count(Signal.id)).filter(Signal.is_hidden == 1).scalar()
-    )
-    total_signals = db.query(func.count(Signal.id)).scalar()
-    signals_24h = db.query(func.count(Signal.id)).filter(Signal.timestamp >= last_24h).scalar()
-
-    # --- MRR Calculation (Estimated) ---
-    # Prices updated per user request (Jan 2026)
-    PRICE_TRADER = 49
-    PRICE_PRO = 149
-
-    count_trader = db.query(func.count(User.id)).filter(User.plan == "TRADER").scalar() or 0
-    count_pro = db.query(func.count(User.id)).filter(User.plan == "PRO").scalar() or 0
-    
-    # MRR = (Trader * 50) + (Pro * 150)
-    mrr_est = (count_trader * PRICE_TRADER) + (count_pro * PRICE_PRO)
-
-    return {
-        "total_users": total_users,
-        "users_24h": users_24h,
-        "active_plans": active_pro,
-        "hidden_signals": hidden_signals,
-        "total_signals": total_signals,
-        "signals_24h": signals_24h,
-        "system_status": "ONLINE (Scheduler Active)", # Placeholder until health check integration
-        "mrr": mrr_est,
-        "last_updated": now.isoformat()
-    }
+def get_admin_stats(db: Session = Depends(get_db)):
+    """
+    KPIs for Admin Dashboard.
+    Served from the materialized admin_counters (short cache); sync def so
+    the DB read runs in the threadpool, not on the event loop.
+    """
+    return admin_counters.snapshot(db)
 
 
 @router.get("/users")
@@ -99,16 +66,18 @@ async def list_users(
     page: int = 1,
     size: int = 20,
     q: Optional[str] = None,
-    db: Session = Depends(get_db),
 ):
     offset = (page - 1) * size
-    query = db.query(User)
 
-    if q:
-        query = query.filter(User.email.contains(q))
+    def _page(db: Session):
+        query = db.query(User)
+        if q:
+            query = query.filter(User.email.contains(q))
+        total = query.count()
+        users = query.order_by(desc(User.created_at)).offset(offset).limit(size).all()
+        return total, users
 
-    total = query.count()
-    users = query.order_by(desc(User.created_at)).offset(offset).limit(size).all()
+    total, users = await async_queries.run(_page)
 
     return {
         "items": [
@@ -128,7 +97,7 @@ async def list_users(
 
 
 @router.patch("/users/{user_id}/plan")
-async def update_user_plan(
+def update_user_plan(
     user_id: int,
     update: UserPlanUpdate,
     db: Session = Depends(get_db),
@@ -140,7 +109,9 @@ async def update_user_plan(
 
     old_plan = user.plan
     user.plan = update.plan.upper()
+    admin_counters.plan_changed(db, old_plan, user.plan)
     db.commit()
+    principal_cache.invalidate(user.id)
 
     log_admin_action(
         db,
@@ -160,27 +131,30 @@ async def list_signals(
     token: Optional[str] = None,
     mode: Optional[str] = None,
     show_hidden: bool = True,
-    db: Session = Depends(get_db),
 ):
     offset = (page - 1) * size
-    query = db.query(Signal)
-
-    if token:
-        query = query.filter(Signal.token == token.upper())
-    if mode:
-        query = query.filter(Signal.mode == mode.upper())
-    if not show_hidden:
-        query = query.filter(Signal.is_hidden == 0)
 
-    total = query.count()
-    signals = query.order_by(desc(Signal.timestamp)).offset(offset).limit(size).all()
+    def _page(db: Session):
+        query = db.query(Signal)
+        if token:
+            query = query.filter(Signal.token == token.upper())
+        if mode:
+            query = query.filter(Signal.mode == mode.upper())
+        if not show_hidden:
+            query = query.filter(Signal.is_hidden == 0)
+        total = query.count()
+        signals = query.order_by(desc(Signal.timestamp)).offset(offset).limit(size).all()
+        db.expunge_all()
+        return total, signals
+
+    total, signals = await async_queries.run(_page)
 
     # Simple serialization
     return {"items": signals, "total": total, "page": page, "size": size}
 
 
 @router.patch("/signals/{signal_id}")
-async def toggle_signal_visibility(
+def toggle_signal_visibility(
     signal_id: int,
     update: SignalUpdate,
     db: Session = Depends(get_db),
@@ -190,7 +164,9 @@ async def toggle_signal_visibility(
     if not sig:
         raise HTTPException(status_code=404, detail="Signal not found")
 
+    was_hidden = sig.is_hidden
     sig.is_hidden = 1 if update.is_hidden else 0
+    admin_counters.signal_hidden_changed(db, was_hidden, sig.is_hidden)
     db.commit()
 
     action = "HIDE_SIGNAL" if update.is_hidden else "UNHIDE_SIGNAL"
@@ -202,12 +178,18 @@ async def toggle_signal_visibility(
 
 
 @router.get("/audit")
-async def get_audit_logs(page: int = 1, size: int = 50, db: Session = Depends(get_db)):
+async def get_audit_logs(page: int = 1, size: int = 50):
     offset = (page - 1) * size
-    query = db.query(AdminAuditLog)
-    total = query.count()
-    logs = (
-        query.order_by(desc(AdminAuditLog.timestamp)).offset(offset).limit(size).all()
-    )
+
+    def _page(db: Session):
+        query = db.query(AdminAuditLog)
+        total = query.count()
+        logs = (
+            query.order_by(desc(AdminAuditLog.timestamp)).offset(offset).limit(size).all()
+        )
+        db.expunge_all()
+        return total, logs
+
+    total, logs = await async_queries.run(_page)
 
     return {"items": logs, "total": total, "page": page, "size": size}
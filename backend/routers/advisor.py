@@ -4,7 +4,7 @@ from typing import List, Optional, Dict, Any
 from models import CopilotProfileResp, CopilotProfileUpdate, AdvisorReq
 from core.ai_service import get_ai_service
 from rag_context import build_token_context
-from core.market_data_api import get_ohlcv_data
+from core.price_oracle import normalize_symbol, price_oracle
 
 # Auth & Entitlements
 from sqlalchemy.orm import Session
@@ -167,22 +167,26 @@ def advisor_chat(
         tf = (req.context.timeframe if req.context else "1h") or "1h"
         
         market_data_lines = []
-        
+
+        # All detected tokens in one in-memory read (core.price_oracle)
+        try:
+            quotes = price_oracle.get_many(detected_tokens)
+        except Exception as e:
+            print(f"[ADVISOR] Price Error {detected_tokens}: {e}")
+            quotes = None
+
         for t_sym in detected_tokens:
-            try:
-                # Fetch only 1 candle for price to be fast
-                ohlcv = get_ohlcv_data(t_sym, tf, limit=1)
-                curr_price = ohlcv[-1]["close"] if ohlcv else "Unavailable"
-                
-                market_data_lines.append(f"- {t_sym}: ${curr_price}")
-                
-                # If this is the 'primary' token, update the main variable
-                if t_sym == token:
-                    price = curr_price
-                    
-            except Exception as e:
-                print(f"[ADVISOR] Price Error {t_sym}: {e}")
+            if quotes is None:
                 market_data_lines.append(f"- {t_sym}: Price Error")
+                continue
+            quote = quotes.get(normalize_symbol(t_sym))
+            curr_price = quote.price if quote else "Unavailable"
+
+            market_data_lines.append(f"- {t_sym}: ${curr_price}")
+
+            # If this is the 'primary' token, update the main variable
+            if t_sym == token:
+                price = curr_price
 
         # C. Build Context Block
         token_context = build_token_context(token) # RAG for primary only to save Tokens
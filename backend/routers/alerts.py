@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, Path as FPath
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
+from core.alert_index import alert_index
 from database import get_db
 from models_db import WatchAlert, User
 from routers.auth_new import get_current_user
@@ -114,6 +115,7 @@ def create_alert(
     db.add(a)
     db.commit()
     db.refresh(a)
+    alert_index.add(a)
     return {"item": _serialize(a)}
 
 
@@ -133,6 +135,7 @@ def cancel_alert(
     a.status = "CANCELED"
     db.add(a)
     db.commit()
+    alert_index.discard(a.id)
     return CancelAlertResponse(ok=True, id=a.id, status=a.status)
 
 
@@ -148,4 +151,5 @@ def delete_alert(
 
     db.delete(a)
     db.commit()
+    alert_index.discard(alert_id)
     return {"ok": True, "id": alert_id}
@@ -3,6 +3,7 @@ from typing import Annotated
 
 import fastapi
 from fastapi import APIRouter, HTTPException, status, Request, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from sqlalchemy.future import select
@@ -14,13 +15,16 @@ from database import get_db, SessionLocal
 from core.schemas import UserCreate, UserResponse
 from core.security import (
     verify_password,
+    verify_and_update_password,
     create_access_token,
     get_password_hash,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     SECRET_KEY,
     ALGORITHM,
 )
+from core import admin_counters, async_queries
 from core.limiter import limiter
+from core.principal_cache import Principal, principal_cache
 
 # Entitlements Endpoint
 # ... (imports)
@@ -48,11 +52,8 @@ def _safe_name(obj) -> str:
     return em or "user"
 
 
-async def get_current_user(
-    token: Annotated[str, fastapi.Depends(oauth2_scheme)],
-    db: Session = fastapi.Depends(get_db),
-):
-    """Verifica el token JWT y retorna el usuario actual."""
+def _decode_token(token: str) -> dict:
+    """Decodes the JWT and returns its claims ('sub' = email); 401 if invalid."""
     from jose import JWTError, jwt
 
     credentials_exception = HTTPException(
@@ -70,19 +71,64 @@ async def get_current_user(
     except JWTError as e:
         print(f"[AUTH] JWT Decode Error: {e}")
         raise credentials_exception
+    return payload
+
+
+def _user_not_found(email: str) -> HTTPException:
+    print(f"[AUTH] User {email} not found in DB")
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def get_current_user(
+    token: Annotated[str, fastapi.Depends(oauth2_scheme)],
+    db: Session = fastapi.Depends(get_db),
+):
+    """
+    Verifica el token JWT y retorna el usuario actual.
+    Sync def (threadpool): the user stays attached to the request's session,
+    so routes can modify it and commit with the same `db`.
+    """
+    email = _decode_token(token)["sub"]
 
     result = db.execute(select(User).where(User.email == email))
     user = result.scalars().first()
 
     if user is None:
-        print(f"[AUTH] User {email} not found in DB")
-        raise credentials_exception
+        raise _user_not_found(email)
 
     return user
 
+
+async def get_current_user_async(
+    token: Annotated[str, fastapi.Depends(oauth2_scheme)],
+) -> Principal:
+    """
+    Same check for async / read-only routes, returning an immutable `Principal`.
+    Served from the principal cache; on a miss the lookup runs on the async session.
+    """
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return cached
+
+    claims = _decode_token(token)
+    email = claims["sub"]
+
+    user = await async_queries.user_by_email(email)
+
+    if user is None:
+        raise _user_not_found(email)
+
+    principal = Principal.from_user(user)
+    principal_cache.put(token, principal, token_exp=claims.get("exp"))
+    return principal
+
 @router.post("/token")
 @limiter.limit("5/minute")
-async def login_for_access_token(
+def login_for_access_token(
     request: Request,  # Required for SlowAPI
     form_data: Annotated[OAuth2PasswordRequestForm, fastapi.Depends()],
     db: Session = fastapi.Depends(get_db),
@@ -91,13 +137,22 @@ async def login_for_access_token(
     result = db.execute(select(User).where(User.email == form_data.username))
     user = result.scalars().first()
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    ok, new_hash = (False, None)
+    if user:
+        ok, new_hash = verify_and_update_password(form_data.password, user.hashed_password)
+    if not ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if new_hash:
+        # Cost factor changed (BCRYPT_ROUNDS): upgrade the stored hash transparently
+        user.hashed_password = new_hash
+        db.commit()
+        print(f"[AUTH] Rehashed password for user {user.id}")
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email},
@@ -132,7 +187,7 @@ async def login_for_access_token(
     }
 
 @router.get("/me")
-async def get_me(current_user = Depends(get_current_user)):
+async def get_me(current_user = Depends(get_current_user_async)):
     """
     Minimal whoami endpoint used by frontend to validate session.
     Returns the authenticated user payload.
@@ -167,6 +222,11 @@ async def register_user(request: Request, db: Session = fastapi.Depends(get_db))
     except Exception as e:
         raise HTTPException(status_code=422, detail=str(e))
 
+    # Hashing + DB work are blocking: run them in the threadpool
+    return await run_in_threadpool(_register, db, user_data)
+
+
+def _register(db: Session, user_data: UserCreate) -> dict:
     email_norm = user_data.email.strip().lower()
 
     result = db.execute(select(User).where(User.email == email_norm))
@@ -200,6 +260,7 @@ async def register_user(request: Request, db: Session = fastapi.Depends(get_db))
 
     try:
         db.add(new_user)
+        admin_counters.user_created(db, new_user)
         db.commit()
         db.refresh(new_user)
 
@@ -267,9 +328,8 @@ def get_sync_db():
 
 
 @router.get("/me/entitlements")
-def read_my_entitlements(
-    current_user: User = fastapi.Depends(get_current_user),
-    db: Session = fastapi.Depends(get_sync_db),
+async def read_my_entitlements(
+    current_user: User = fastapi.Depends(get_current_user_async),
 ):
     """
     Diagnóstico de límites y cuotas.
@@ -292,7 +352,7 @@ def read_my_entitlements(
 
 
 @router.get("/users/me", response_model=UserResponse)
-async def read_users_me(current_user: User = fastapi.Depends(get_current_user)):
+async def read_users_me(current_user: User = fastapi.Depends(get_current_user_async)):
     """
     Get current user profile (synced with frontend requirements).
     """
@@ -320,7 +380,7 @@ class TelegramUpdate(BaseModel):
 
 
 @router.patch("/users/me/plan")
-async def update_my_plan(
+def update_my_plan(
     new_plan: str,
     db: Session = fastapi.Depends(get_db),
     current_user: User = fastapi.Depends(get_current_user),
@@ -337,15 +397,17 @@ async def update_my_plan(
             detail=f"Invalid plan. Must be one of: {', '.join(valid_plans)}",
         )
 
+    admin_counters.plan_changed(db, current_user.plan, plan_upper)
     current_user.plan = plan_upper
     db.commit()
+    principal_cache.invalidate(current_user.id)
     db.refresh(current_user)
 
     return {"message": f"Plan updated to {plan_upper}", "plan": plan_upper}
 
 
 @router.patch("/users/me/telegram")
-async def update_telegram_id(
+def update_telegram_id(
     payload: TelegramUpdate,
     current_user: User = fastapi.Depends(get_current_user),
     db: Session = fastapi.Depends(get_db),
@@ -355,6 +417,7 @@ async def update_telegram_id(
     """
     current_user.telegram_chat_id = payload.chat_id
     db.commit()
+    principal_cache.invalidate(current_user.id)
     return {"status": "ok", "telegram_chat_id": current_user.telegram_chat_id}
 
 
@@ -364,7 +427,7 @@ class PasswordUpdate(BaseModel):
 
 
 @router.patch("/users/me/password")
-async def update_password(
+def update_password(
     payload: PasswordUpdate,
     current_user: User = fastapi.Depends(get_current_user),
     db: Session = fastapi.Depends(get_db),
@@ -387,7 +450,7 @@ class TimezoneUpdate(BaseModel):
 
 
 @router.patch("/users/me/timezone")
-async def update_timezone(
+def update_timezone(
     payload: TimezoneUpdate,
     current_user: User = fastapi.Depends(get_current_user),
     db: Session = fastapi.Depends(get_db),
@@ -397,6 +460,7 @@ async def update_timezone(
     """
     current_user.timezone = payload.timezone
     db.commit()
+    principal_cache.invalidate(current_user.id)
     return {"status": "ok", "timezone": current_user.timezone}
 
 
@@ -411,7 +475,7 @@ class ResetRequest(BaseModel):
 
 
 @router.post("/recover")
-async def request_password_recovery(
+def request_password_recovery(
     payload: RecoverRequest,
     db: Session = fastapi.Depends(get_db)
 ):
@@ -437,7 +501,7 @@ async def request_password_recovery(
 
 
 @router.post("/reset")
-async def reset_password(
+def reset_password(
     payload: ResetRequest,
     db: Session = fastapi.Depends(get_db)
 ):
@@ -9,6 +9,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
+from core import admin_counters
+from core.principal_cache import principal_cache
 from database import get_db
 from models_db import User
 from routers.auth_new import get_current_user
@@ -103,6 +105,7 @@ def _apply_subscription_state(
 
     active_like = subscription_status in ("active", "trialing")
     plan_from_price = _infer_plan_from_price_id(price_id) if active_like else None
+    old_plan = user.plan
 
     if active_like and plan_from_price:
         user.plan = plan_from_price
@@ -117,7 +120,9 @@ def _apply_subscription_state(
         user.plan_status = "inactive"
         user.plan_expires_at = now
 
+    admin_counters.plan_changed(db, old_plan, user.plan)
     db.commit()
+    principal_cache.invalidate(user.id)
     db.refresh(user)
 
     return {"plan": user.plan, "plan_status": user.plan_status or ""}
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from core import dashboard_cache
 from database import get_db
 from models_db import Signal, SignalEvaluation, User
 
@@ -47,13 +54,14 @@ def _serialize_signal(sig: Signal, ev: Optional[SignalEvaluation]) -> Dict[str,
         },
     }
 
-def _base_query(db: Session, user: User):
+def _base_query(db: Session, user: User, *entities):
     # Regla MVP:
     # - Usuario normal: ver señales del sistema (user_id NULL) + las suyas (user_id = me)
     # - Privileged: ver todo
+    q = db.query(*(entities or (Signal,)))
     if _is_privileged(user):
-        return db.query(Signal)
-    return db.query(Signal).filter((Signal.user_id == None) | (Signal.user_id == user.id))  # noqa: E711
+        return q
+    return q.filter((Signal.user_id == None) | (Signal.user_id == user.id))  # noqa: E711
 
 @router.get("/recent")
 def get_recent_logs(
@@ -73,6 +81,128 @@ def get_recent_logs(
 
     return {"items": [_serialize_signal(s, ev_map.get(s.id)) for s in signals]}
 
+# === Export (full history, streamed) ===
+EXPORT_BATCH_ROWS = 1000  # rows per server-side cursor fetch
+EXPORT_CHUNK_BYTES = 64 * 1024  # bytes buffered before yielding to the client
+
+EXPORT_CSV_FIELDS = [
+    "id", "timestamp", "token", "timeframe", "direction", "entry", "tp", "sl", "confidence",
+    "rationale", "source", "mode", "strategy_id", "user_id", "is_saved",
+    "evaluated_at", "result", "pnl_r", "exit_price",
+]
+
+
+def _csv_row(item: Dict[str, Any]) -> Dict[str, Any]:
+    ev = item.pop("evaluation") or {}
+    item.update({k: ev.get(k) for k in ("evaluated_at", "result", "pnl_r", "exit_price")})
+    return item
+
+
+def iter_export(
+    session_factory: Callable[[], Session],
+    user: User,
+    fmt: str = "ndjson",
+    token: Optional[str] = None,
+    mode: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Iterator[bytes]:
+    """
+    Genera el export en chunks de ~EXPORT_CHUNK_BYTES (memoria acotada).
+    Abre su propia sesión: el generator sigue vivo después de que el endpoint retorna.
+    Rows stream from a server-side cursor (yield_per -> stream_results on Postgres).
+    """
+    db = session_factory()
+    try:
+        q = _base_query(db, user, Signal, SignalEvaluation).outerjoin(
+            SignalEvaluation, SignalEvaluation.signal_id == Signal.id
+        )
+        if token:
+            q = q.filter(Signal.token == token.upper())
+        if mode:
+            q = q.filter(Signal.mode == mode.upper())
+        if since:
+            q = q.filter(Signal.timestamp >= since)
+        if until:
+            q = q.filter(Signal.timestamp < until)
+        q = q.order_by(Signal.timestamp.asc(), Signal.id.asc()).yield_per(EXPORT_BATCH_ROWS)
+
+        buf = io.StringIO()
+        writer = None
+        if fmt == "csv":
+            writer = csv.DictWriter(buf, fieldnames=EXPORT_CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+
+        for sig, ev in q:
+            item = _serialize_signal(sig, ev)
+            if writer is not None:
+                writer.writerow(_csv_row(item))
+            else:
+                buf.write(json.dumps(item, default=str))
+                buf.write("\n")
+
+            if buf.tell() >= EXPORT_CHUNK_BYTES:
+                yield buf.getvalue().encode("utf-8")
+                buf.seek(0)
+                buf.truncate()
+            # Cada fila ya serializada: no acumular instancias en el identity map
+            db.expunge(sig)
+            if ev is not None:
+                db.expunge(ev)
+
+        if buf.tell():
+            yield buf.getvalue().encode("utf-8")
+    finally:
+        db.close()
+
+
+def gzip_chunks(chunks: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+    """Comprime on-the-fly (un solo stream gzip, sin bufferear el export)."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+@router.get("/export")
+def export_logs(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    token: Optional[str] = None,
+    mode: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user: User = Depends(get_current_user),
+):
+    """
+    Historial completo (sin el tope de 500 de /{mode}/{token}) como NDJSON o CSV.
+    Filtros: token, mode, since (inclusive), until (exclusive).
+    Gzip si el cliente manda Accept-Encoding: gzip.
+    """
+    from database import SessionLocal
+
+    if since and until and since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+
+    chunks = iter_export(
+        SessionLocal, user, fmt=format,
+        token=token, mode=mode, since=since, until=until,
+    )
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    name = "_".join(p for p in ("signals", (mode or "").lower(), (token or "").lower()) if p)
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{"csv" if format == "csv" else "ndjson"}"'}
+
+    if "gzip" in request.headers.get("accept-encoding", "").lower():
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+        chunks = gzip_chunks(chunks)
+
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+
 @router.get("/{mode}/{token}")
 def get_logs_by_mode_token(
     mode: str,
@@ -127,6 +257,7 @@ def track_signal(
 
     db.add(sig)
     db.commit()
+    dashboard_cache.invalidate([user.id])
     return {"ok": True, "id": sig.id, "is_saved": sig.is_saved}
 
 @router.post("/{signal_id}/toggle_save")
@@ -153,4 +284,5 @@ def toggle_save(
 
     db.add(sig)
     db.commit()
+    dashboard_cache.invalidate([user.id])
     return {"ok": True, "id": sig.id, "is_saved": sig.is_saved}
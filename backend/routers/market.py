@@ -1,24 +1,39 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
-from core.market_data_api import get_market_summary, get_ohlcv_data
+from core.market_data_api import MARKET_BOARD_SYMBOLS, get_market_summary, get_ohlcv_data
+from core.price_oracle import normalize_symbol
+from data.supported_tokens import VALID_TOKENS_FULL
 
 router = APIRouter()
 
+# Public endpoints: only symbols the board / strategies already cover
+ALLOWED_SYMBOLS = frozenset(VALID_TOKENS_FULL) | frozenset(MARKET_BOARD_SYMBOLS)
+
+
+def _allowed(symbols: List[str]) -> List[str]:
+    wanted = list(dict.fromkeys(normalize_symbol(s) for s in symbols if s.strip()))
+    unsupported = [s for s in wanted if s not in ALLOWED_SYMBOLS]
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported symbols: {', '.join(unsupported)}")
+    return wanted
+
 
 @router.get("/summary")
 def market_summary_endpoint(symbols: Optional[List[str]] = Query(None)):
     """
-    Returns price and 24h change for the default watchlist.
+    Returns price and 24h change for the default watchlist (or `symbols`,
+    repeated or comma-separated), served from the in-memory market board.
     """
-    if not symbols:
+    wanted = _allowed([s for item in symbols or [] for s in item.split(",")])
+    if not wanted:
         # Default watchlist (Prioritize Major Caps for Free Tier)
-        symbols = ["BTC", "ETH", "SOL", "BNB", "XRP", "ADA", "DOGE", "AVAX"]
+        wanted = MARKET_BOARD_SYMBOLS
 
-    return {"current_prices": get_market_summary(symbols)}
+    return {"current_prices": get_market_summary(wanted)}
 
 
 @router.get("/ohlcv/{token}")
-def get_market_ohlcv(token: str, timeframe: str = "30m", limit: int = 100):
+def get_market_ohlcv(token: str, timeframe: str = "30m", limit: int = Query(100, ge=1, le=1000)):
     """
     Obtiene datos OHLCV (candlestick) para un token específico.
 
@@ -33,6 +48,7 @@ def get_market_ohlcv(token: str, timeframe: str = "30m", limit: int = 100):
     # Validate timeframe?
     # Logic inside library handles it via CCXT
 
+    _allowed([token])
     data = get_ohlcv_data(token, timeframe, limit=limit)
     if not data:
         # 404? Or just empty list? Front needs list.
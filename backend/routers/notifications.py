@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from database import SessionLocal
 from models_db import PushSubscription
+from core.push_dispatcher import push_dispatcher
 
 router = APIRouter(tags=["notifications"])
 
@@ -41,6 +42,7 @@ def subscribe_push(sub: SubscriptionRequest, db: Session = Depends(get_db)):
         existing.p256dh = sub.keys.p256dh
         existing.auth = sub.keys.auth
         db.commit()
+        push_dispatcher.invalidate()
         return {"status": "updated"}
 
     new_sub = PushSubscription(
@@ -48,6 +50,7 @@ def subscribe_push(sub: SubscriptionRequest, db: Session = Depends(get_db)):
     )
     db.add(new_sub)
     db.commit()
+    push_dispatcher.invalidate()
     return {"status": "subscribed"}
 
 
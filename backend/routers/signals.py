@@ -1,15 +1,20 @@
+import base64
+import hashlib
+import json
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, or_
 # from models_db import Signal
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Tuple
 from pydantic import BaseModel
 
 from database import get_db
 # from models_db import Signal as SignalDB, User
-from models_db import Signal, User
-from routers.auth_new import get_current_user
+from models_db import SIGNAL_CLOSED, SIGNAL_WATCH, Signal, User
+from routers.auth_new import get_current_user, get_current_user_async
+from core import admin_counters, async_queries, dashboard_cache
 from core.signal_logger import log_signal
 from core.schemas import Signal as SignalSchema
 
@@ -27,81 +32,167 @@ class ManualSignalReq(BaseModel):
     rationale: Optional[str] = "Manual Entry from Scanner"
     extra: Optional[Dict[str, Any]] = None
 
+
+def _ui_status(s: Signal) -> str:
+    """Lifecycle status -> UI status (ACTIVE, CLOSED, WATCH)."""
+    if s.status == SIGNAL_CLOSED:
+        return "CLOSED"
+    if s.status == SIGNAL_WATCH:
+        return "WATCH"
+    if s.status is None:
+        # Transient row (not flushed yet): legacy computation
+        if s.evaluation:
+            return "CLOSED"
+        if s.source and "watchlist" in str(s.source).lower():
+            return "WATCH"
+    return "ACTIVE"
+
+# Columns serialized by the feed (no ORM __dict__ copy, no lazy loads)
+_SIGNAL_COLUMNS = tuple(c.key for c in Signal.__table__.columns)
+
+
+def _serialize_signal(s: Signal) -> Dict[str, Any]:
+    """Signal row -> feed item (columns + camelCase aliases + UI status)."""
+    item = {k: getattr(s, k) for k in _SIGNAL_COLUMNS}
+
+    # Frontend expects: entryPrice, targetPrice, stopLoss (camelCase)
+    item["entryPrice"] = s.entry
+    item["targetPrice"] = s.tp
+    item["stopLoss"] = s.sl
+    item["type"] = (s.direction or "NEUTRAL").upper()  # Ensure UPPERCASE for UI mapping
+
+    # Frontend expects: ACTIVE, CLOSED, CANCELLED, WATCH, CREATED
+    item["status"] = _ui_status(s)
+
+    ev = s.evaluation  # eager-loaded by the feed (selectinload)
+    item["evaluation"] = (
+        {"result": ev.result, "pnl_r": ev.pnl_r, "exit_price": ev.exit_price, "evaluated_at": ev.evaluated_at}
+        if ev is not None
+        else None
+    )
+    return item
+
+
+def _encode_cursor(s: Signal) -> str:
+    raw = f"{s.timestamp.isoformat()}|{s.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, sid = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(ts), int(sid)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _page_etag(items: List[Dict[str, Any]], next_cursor: Optional[str]) -> str:
+    payload = json.dumps([jsonable_encoder(items), next_cursor], sort_keys=True, default=str)
+    return '"' + hashlib.sha1(payload.encode()).hexdigest() + '"'
+
+
+def feed_page(
+    db: Session,
+    user_id: int,
+    limit: int = 50,
+    offset: int = 0,
+    after: Optional[Tuple[datetime, int]] = None,
+    token: Optional[str] = None,
+    strategy_id: Optional[str] = None,
+) -> List[Signal]:
+    """
+    One page of the feed: system signals (user_id NULL) + the user's own.
+    Evaluations are eager-loaded and the rows detached (safe after the session closes).
+    """
+    query = db.query(Signal).filter(Signal.is_saved == 1)
+
+    # Isolation Logic
+    query = query.filter(
+        or_(
+            Signal.user_id == user_id,
+            Signal.user_id.is_(None)
+        )
+    )
+
+    # Trial/Entitlement check could be here (e.g. hide signals if expired)
+    # But for now assume Auth is enough or frontend handles blurring.
+
+    if token:
+        query = query.filter(Signal.token == token.upper())
+
+    if strategy_id:
+        query = query.filter(Signal.strategy_id == strategy_id)
+
+    # Hard filter out "verification" signals from audit
+    query = query.filter(Signal.source != "verification")
+
+    if after:
+        # Keyset: strictly after the last row of the previous page
+        cur_ts, cur_id = after
+        query = query.filter(
+            or_(
+                Signal.timestamp < cur_ts,
+                and_(Signal.timestamp == cur_ts, Signal.id < cur_id),
+            )
+        )
+
+    # id as tie-breaker keeps the order (and the cursor) deterministic
+    query = query.order_by(Signal.timestamp.desc(), Signal.id.desc())
+    if offset and not after:
+        query = query.offset(offset)  # legacy clients
+    results = query.options(selectinload(Signal.evaluation)).limit(limit).all()
+    db.expunge_all()
+    return results
+
+
 @router.get("/", response_model=List[Any])
-def get_signals(
+async def get_signals(
+    request: Request,
+    response: Response,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     token: Optional[str] = None,
     strategy_id: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
 ):
     """
     Get recent signals. 
     Authenticated user can see:
     1. System signals (user_id is NULL)
     2. Their own signals (user_id = current_user.id)
+
+    Paging: pass the `X-Next-Cursor` response header back as `?cursor=` (keyset on
+    timestamp, id). `offset` still works for old clients. Responses carry an ETag;
+    `If-None-Match` with the same value returns 304.
     """
+    limit = max(1, min(limit, 500))
+    after = _decode_cursor(cursor) if cursor else None
     try:
-        query = db.query(Signal).filter(Signal.is_saved == 1)
-        
-        # Isolation Logic
-        query = query.filter(
-            or_(
-                Signal.user_id == current_user.id,
-                Signal.user_id.is_(None)
-            )
+        results = await async_queries.run(
+            lambda db: feed_page(db, current_user.id, limit=limit, offset=offset, after=after,
+                                 token=token, strategy_id=strategy_id)
         )
-        
-        # Trial/Entitlement check could be here (e.g. hide signals if expired)
-        # But for now assume Auth is enough or frontend handles blurring.
-        
-        if token:
-            query = query.filter(Signal.token == token.upper())
-            
-        if strategy_id:
-            query = query.filter(Signal.strategy_id == strategy_id)
-            
-        # Hard filter out "verification" signals from audit
-        query = query.filter(Signal.source != "verification")
-            
-        query = query.order_by(Signal.timestamp.desc())
-        
-        results = query.limit(limit).offset(offset).all()
-        
-        # Manual serialization to inject 'status' (computed)
-        # Frontend expects: ACTIVE, CLOSED, CANCELLED, WATCH, CREATED
-        response = []
-        for s in results:
-            item = s.__dict__.copy()
-            if "_sa_instance_state" in item:
-                del item["_sa_instance_state"]
-            
-            # Manual serialization & Mapping
-            # Frontend expects: entryPrice, targetPrice, stopLoss (camelCase)
-            # Backend has: entry, tp, sl (snake_caseish)
-            item["entryPrice"] = item.get("entry")
-            item["targetPrice"] = item.get("tp")
-            item["stopLoss"] = item.get("sl")
-            item["type"] = item.get("direction", "NEUTRAL").upper() # Ensure UPPERCASE for UI mapping
-            
-            # Compute Status
-            if s.evaluation:
-                item["status"] = "CLOSED"
-            elif s.source and "watchlist" in str(s.source).lower():
-                item["status"] = "WATCH"
-            else:
-                item["status"] = "ACTIVE"
-                
-            response.append(item)
-            
-        return response
+
+        items = [_serialize_signal(s) for s in results]
+        next_cursor = _encode_cursor(results[-1]) if len(results) == limit else None
+
+        etag = _page_etag(items, next_cursor)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+
+        if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        response.headers.update(headers)
+        return items
         
     except Exception as e:
         print(f"[SIGNALS] Error fetching signals: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
-
 @router.post("/", response_model=Dict[str, Any])
 def create_manual_signal(
     payload: ManualSignalReq,
@@ -158,6 +249,7 @@ def accept_signal(
         # 3. Flip to saved
         signal.is_saved = 1
         db.commit()
+        dashboard_cache.invalidate([current_user.id, signal.user_id])
         
         return {"status": "accepted", "id": signal_id}
         
@@ -187,8 +279,11 @@ def delete_signal(
         if signal.user_id and signal.user_id != current_user.id:
              raise HTTPException(status_code=403, detail="Not authorized to delete this signal")
 
+        owner_id = signal.user_id
+        admin_counters.signal_deleted(db, signal)
         db.delete(signal)
         db.commit()
+        dashboard_cache.invalidate([owner_id])
         return {"status": "deleted", "id": signal_id}
         
     except Exception as e:
@@ -217,25 +312,8 @@ def get_signal_by_id(
              # But if user_id is set and != me, block.
              raise HTTPException(status_code=403, detail="Not authorized")
 
-        item = s.__dict__.copy()
-        if "_sa_instance_state" in item:
-            del item["_sa_instance_state"]
-        
         # Consistent Serialization
-        item["entryPrice"] = item.get("entry")
-        item["targetPrice"] = item.get("tp")
-        item["stopLoss"] = item.get("sl")
-        item["type"] = item.get("direction", "NEUTRAL").upper()
-        
-        # Compute Status
-        if s.evaluation:
-            item["status"] = "CLOSED"
-        elif s.source and "watchlist" in str(s.source).lower():
-            item["status"] = "WATCH"
-        else:
-            item["status"] = "ACTIVE"
-            
-        return item
+        return _serialize_signal(s)
         
     except HTTPException:
         raise
@@ -1,26 +1,34 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import and_, case, func, or_
 from datetime import datetime, timedelta
 from database import get_db
-from routers.auth_new import get_current_user
-from models_db import User, Signal, SignalEvaluation
+from routers.auth_new import get_current_user_async
+from models_db import SIGNAL_CLOSED, User, Signal, SignalEvaluation
+from core import dashboard_cache
 
-router = APIRouter(tags=["Stats"], dependencies=[Depends(get_current_user)])
+router = APIRouter(tags=["Stats"], dependencies=[Depends(get_current_user_async)])
+
+TEST_SOURCES = ["audit_script", "verification"]
 
 
 @router.get("/dashboard")
 def get_dashboard_stats(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async), db: Session = Depends(get_db)
 ):
     """
     Returns aggregated stats and chart data for the dashboard.
     User-scoped: shows signals created by the user or system signals visible to them.
+    One aggregate query on a cache miss; none while the per-user cache is warm.
     """
     try:
-        summary = compute_stats_summary(db, current_user)
-        chart_data = get_performance_chart(db, current_user)
-        return {"summary": summary, "chart": chart_data}
+        cached = dashboard_cache.get(current_user.id)
+        if cached is not None:
+            return cached
+
+        payload = build_dashboard(db, current_user)
+        dashboard_cache.put(current_user.id, payload)
+        return payload
     except Exception as e:
         print(f"[STATS] Error calculating dashboard stats: {e}")
         return {
@@ -35,136 +43,89 @@ def get_dashboard_stats(
         }
 
 
-def compute_stats_summary(db: Session, user: User):
-    day_ago = datetime.utcnow() - timedelta(hours=24)
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    test_sources = ["audit_script", "verification"]
-
-    # Total Evaluated (All Time)
-    q_total = db.query(func.count(SignalEvaluation.id)).join(Signal)
-    q_total = q_total.filter(
-        Signal.source.notin_(test_sources),
-        Signal.user_id == user.id,
-        Signal.is_saved == 1,
-    )
-    if user.created_at:
-        q_total = q_total.filter(Signal.timestamp >= user.created_at)
-    total_eval = q_total.scalar() or 0
-
-    # Evaluations Last 24h
-    q_eval_24 = db.query(func.count(SignalEvaluation.id)).join(Signal)
-    q_eval_24 = q_eval_24.filter(
-        SignalEvaluation.evaluated_at >= day_ago,
-        Signal.source.notin_(test_sources),
-        Signal.user_id == user.id,
-        Signal.is_saved == 1,
-    )
-    if user.created_at:
-        q_eval_24 = q_eval_24.filter(Signal.timestamp >= user.created_at)
-    eval_24h_count = q_eval_24.scalar() or 0
-
-    # Wins Last 24h
-    q_wins = (
-        db.query(func.count(SignalEvaluation.id))
-        .join(Signal)
+def _dashboard_row(db: Session, user: User, now: datetime):
+    """
+    Una sola query (agregación condicional) con todo lo que necesita el
+    dashboard: summary counters + wins/losses per day for the last 7 days.
+    """
+    day_ago = now - timedelta(hours=24)
+    week_ago = now - timedelta(days=7)
+    today = datetime(now.year, now.month, now.day)
+
+    ev = SignalEvaluation
+    result_up = func.upper(ev.result)
+    chart_win = or_(result_up.like("%WIN%"), result_up.like("%TP%"))
+    chart_loss = and_(~chart_win, or_(result_up.like("%LOSS%"), result_up.like("%SL%")))
+
+    def count_if(cond):
+        return func.coalesce(func.sum(case((cond, 1), else_=0)), 0)
+
+    cols = [
+        func.count(ev.id).label("total_eval"),
+        count_if(ev.evaluated_at >= day_ago).label("eval_24h"),
+        count_if(and_(ev.evaluated_at >= day_ago, ev.result == "WIN")).label("wins_24h"),
+        count_if(Signal.status != SIGNAL_CLOSED).label("open_signals"),
+        func.coalesce(func.sum(case((ev.evaluated_at >= week_ago, ev.pnl_r), else_=0.0)), 0.0).label("pnl_7d"),
+    ]
+    for i in range(7):
+        start = today - timedelta(days=6 - i)
+        in_day = and_(ev.evaluated_at >= start, ev.evaluated_at < start + timedelta(days=1))
+        cols.append(count_if(and_(in_day, chart_win)).label(f"wins_{i}"))
+        cols.append(count_if(and_(in_day, chart_loss)).label(f"losses_{i}"))
+
+    q = (
+        db.query(*cols)
+        .select_from(Signal)
+        .outerjoin(ev, ev.signal_id == Signal.id)
         .filter(
-            SignalEvaluation.evaluated_at >= day_ago,
-            SignalEvaluation.result == "WIN",
-            Signal.source.notin_(test_sources),
+            Signal.source.notin_(TEST_SOURCES),
             Signal.user_id == user.id,
             Signal.is_saved == 1,
         )
     )
     if user.created_at:
-        q_wins = q_wins.filter(Signal.timestamp >= user.created_at)
-    wins_24h = q_wins.scalar() or 0
+        q = q.filter(Signal.timestamp >= user.created_at)
+    return q.one()
 
-    win_rate_24h = (wins_24h / eval_24h_count * 100) if eval_24h_count > 0 else 0
 
-    # Open Signals (Accurate): saved signals without evaluation
-    open_q = (
-        db.query(func.count(Signal.id))
-        .outerjoin(SignalEvaluation, SignalEvaluation.signal_id == Signal.id)
-        .filter(
-            Signal.source.notin_(test_sources),
-            Signal.user_id == user.id,
-            Signal.is_saved == 1,
-            SignalEvaluation.id.is_(None),
-        )
-    )
-    if user.created_at:
-        open_q = open_q.filter(Signal.timestamp >= user.created_at)
-    open_signals = int(open_q.scalar() or 0)
-
-    # PnL Last 7 Days
-    q_pnl = (
-        db.query(func.sum(SignalEvaluation.pnl_r))
-        .join(Signal)
-        .filter(
-            SignalEvaluation.evaluated_at >= week_ago,
-            Signal.source.notin_(test_sources),
-            Signal.user_id == user.id,
-            Signal.is_saved == 1,
-        )
-    )
-    if user.created_at:
-        q_pnl = q_pnl.filter(Signal.timestamp >= user.created_at)
-    pnl_7d = q_pnl.scalar() or 0.0
+def _summary_from_row(row):
+    eval_24h_count = int(row.eval_24h or 0)
+    wins_24h = int(row.wins_24h or 0)
+    win_rate_24h = (wins_24h / eval_24h_count * 100) if eval_24h_count > 0 else 0
 
     return {
         "win_rate_24h": round(win_rate_24h, 1),
         "signals_evaluated_24h": eval_24h_count,
-        "signals_total_evaluated": total_eval,
-        "open_signals": open_signals,
-        "pnl_7d": round(pnl_7d, 2),
+        "signals_total_evaluated": int(row.total_eval or 0),
+        "open_signals": int(row.open_signals or 0),
+        "pnl_7d": round(float(row.pnl_7d or 0.0), 2),
     }
 
 
-def get_performance_chart(db: Session, user: User):
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    test_sources = ["audit_script", "verification"]
-
-    active_evals = (
-        db.query(SignalEvaluation.evaluated_at, SignalEvaluation.result)
-        .join(Signal)
-        .filter(
-            SignalEvaluation.evaluated_at >= week_ago,
-            Signal.source.notin_(test_sources),
-            Signal.user_id == user.id,
-            Signal.is_saved == 1,
-        )
-        .all()
-    )
-
-    from collections import defaultdict
-
-    daily_stats = defaultdict(lambda: {"wins": 0, "losses": 0, "date": ""})
-
-    for i in range(7):
-        d = (datetime.utcnow() - timedelta(days=6 - i)).strftime("%a")
-        daily_stats[d]["date"] = d
-
-    for ev in active_evals:
-        if not ev.evaluated_at:
-            continue
-        day_str = ev.evaluated_at.strftime("%a")
-        res = str(ev.result).upper()
-
-        if "WIN" in res or "TP" in res:
-            daily_stats[day_str]["wins"] += 1
-        elif "LOSS" in res or "SL" in res:
-            daily_stats[day_str]["losses"] += 1
-
+def _chart_from_row(row, now: datetime):
     final_chart = []
     for i in range(7):
-        d_obj = datetime.utcnow() - timedelta(days=6 - i)
-        day_label = d_obj.strftime("%a")
+        d_obj = now - timedelta(days=6 - i)
         final_chart.append(
             {
-                "date": day_label,
-                "wins": daily_stats[day_label]["wins"],
-                "losses": daily_stats[day_label]["losses"],
+                "date": d_obj.strftime("%a"),
+                "wins": int(getattr(row, f"wins_{i}") or 0),
+                "losses": int(getattr(row, f"losses_{i}") or 0),
             }
         )
-
     return final_chart
+
+
+def build_dashboard(db: Session, user: User):
+    """Summary + chart en un solo round trip."""
+    now = datetime.utcnow()
+    row = _dashboard_row(db, user, now)
+    return {"summary": _summary_from_row(row), "chart": _chart_from_row(row, now)}
+
+
+def compute_stats_summary(db: Session, user: User):
+    return build_dashboard(db, user)["summary"]
+
+
+def get_performance_chart(db: Session, user: User):
+    return build_dashboard(db, user)["chart"]
@@ -12,14 +12,42 @@ from typing import List, Dict, Any
 from database import get_db
 from models_db import User, Signal
 from routers.auth_new import get_current_user
+from core import strategy_rollups
 from core.entitlements import get_user_entitlements
 
 router = APIRouter(tags=["strategies"])
 
+# Offering code -> engine strategy_id (signals are tagged with the engine id)
+OFFERING_STRATEGY_IDS = {
+    "TITAN_BREAKOUT": "donchian_v2",
+    "FLOW_MASTER": "trend_following_native_v1",
+    "MEAN_REVERSION": "mean_reversion_v1",
+}
+
+
+def _offering_stats(offering: Dict[str, Any], totals: Dict[Any, Dict[str, Any]]) -> Dict[str, Any]:
+    """Suma los totales del rollup que corresponden a una offering (id o engine id + TF)."""
+    engine_id = OFFERING_STRATEGY_IDS.get(offering["strategy_code"])
+    tf = offering["timeframe"].lower()
+
+    acc = {"wins": 0, "losses": 0, "breakeven": 0, "count": 0, "sum_r": 0.0}
+    for (strategy_id, timeframe), t in totals.items():
+        if strategy_id == offering["id"] or (strategy_id == engine_id and (timeframe or "").lower() == tf):
+            for k in acc:
+                acc[k] += t[k]
+
+    return {
+        "total_signals": acc["count"],
+        "wins": acc["wins"],
+        "losses": acc["losses"],
+        "win_rate": round(acc["wins"] / acc["count"] * 100, 1) if acc["count"] else 0.0,
+        "pnl_r": round(acc["sum_r"], 2),
+    }
+
 # === Endpoints ===
 
 @router.get("/marketplace", response_model=Dict[str, List[Any]])
-async def get_marketplace(
+def get_marketplace(
     db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
 ):
     """
@@ -31,21 +59,13 @@ async def get_marketplace(
     # 1. Calculate Entitlements / Offerings
     offerings_data = get_user_entitlements(current_user)
     
-    # 2. Enrich with Stats (Win Rate, Signals, etc.) - Dynamic Calculation per Strategy Code?
-    # For MVP, we might show Global Stats per Strategy Code, or per specific Offering ID.
-    # Since existing signals have 'strategy_id' like 'titan_btc_4h', we can try to find stats.
-    # BUT, the new system uses 'strategy_code' and entitlements.
-    # Let's attach basic stats if available, or 0.
-    
-    # We'll just return the structure as computed by core/entitlements.
-    # The frontend expects "win_rate" etc. logic? 
-    # The previous code calculated it live. 
-    # For performance, we can skip live calc for now or do a quick aggregation if needed.
-    # Let's keep it lightweight.
-    
-    # Just return raw offering data for now. Frontend will render chips.
-    # If stats are needed, we can query `SignalEvaluation` by strategy_id matching the ID conventions.
-    
+    # 2. Enrich with Stats (Win Rate, Signals, etc.) from the strategy rollup
+    # (a few rows per strategy; no scan over evaluations). Sync route: the
+    # query runs in the threadpool, not on the event loop.
+    totals = strategy_rollups.strategy_totals(db, by_timeframe=True)
+    for offering in offerings_data["offerings"] + offerings_data["locked_offerings"]:
+        offering["stats"] = _offering_stats(offering, totals)
+
     return offerings_data
 
 
@@ -40,6 +40,71 @@ def get_system_config():
     return defaults
 
 
+@router.get("/dedupe-stats")
+def dedupe_stats():
+    """
+    Hit ratio of the in-memory signal idempotency filter (per process).
+    """
+    from core.idempotency_filter import idempotency_filter
+
+    return idempotency_filter.stats()
+
+
+@router.get("/push-stats")
+def push_stats():
+    """
+    Web Push dispatcher delivery metrics (per process).
+    """
+    from core.push_dispatcher import push_dispatcher
+
+    return push_dispatcher.stats()
+
+
+@router.get("/principal-cache-stats")
+def principal_cache_stats():
+    """
+    Hit ratio of the authenticated-principal cache (per process).
+    """
+    from core.principal_cache import principal_cache
+
+    return principal_cache.stats()
+
+
+@router.get("/password-hasher-stats")
+def password_hasher_stats():
+    """
+    Password hashing pool: queue depth (pending), rejections, cost factor (per process).
+    """
+    from core.password_hasher import password_hasher
+
+    return password_hasher.stats()
+
+
+@router.get("/price-oracle-stats")
+def price_oracle_stats():
+    """
+    Last-price oracle: board age, fetches vs boards adopted from the shared cache (per process).
+    """
+    from core.price_oracle import price_oracle
+
+    return price_oracle.stats()
+
+
+@router.get("/outbox-stats")
+def outbox_stats():
+    """
+    Notification outbox throughput, lag and backlog.
+    """
+    from core import notification_outbox
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return notification_outbox.stats(db)
+    finally:
+        db.close()
+
+
 @router.get("/telegram-debug")
 def telegram_debug_status():
     """
@@ -7,6 +7,11 @@ from typing import Optional
 
 import stripe
 from fastapi import APIRouter, Request, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import object_session
+
+from core import admin_counters
+from core.principal_cache import principal_cache
 from database import SessionLocal
 from models_db import User
 
@@ -55,6 +60,7 @@ def _apply_subscription_state(
 
     active_like = subscription_status in ("active", "trialing")
     plan_from_price = _infer_plan_from_price_id(price_id) if active_like else None
+    old_plan = user.plan
 
     if active_like and plan_from_price:
         user.plan = plan_from_price
@@ -68,6 +74,11 @@ def _apply_subscription_state(
         user.plan_status = "inactive"
         user.plan_expires_at = now
 
+    # Same transaction as the caller's commit
+    db = object_session(user)
+    if db is not None:
+        admin_counters.plan_changed(db, old_plan, user.plan)
+
 
 @router.post("/stripe")
 async def stripe_webhook(
@@ -96,6 +107,11 @@ async def stripe_webhook(
     ev_type = event.get("type")
     obj = (event.get("data") or {}).get("object") or {}
 
+    # DB + Stripe API calls are blocking: keep them off the event loop
+    return await run_in_threadpool(_handle_event, ev_type, obj)
+
+
+def _handle_event(ev_type: str, obj: dict) -> dict:
     db = SessionLocal()
     try:
         # 1) Checkout completed: Link user <-> customer
@@ -147,6 +163,7 @@ async def stripe_webhook(
                 customer_id=cust_id,
             )
             db.commit()
+            principal_cache.invalidate(user.id)
             return {"received": True}
 
         # 2) Subscription Updates (Renewals, Cancellations, Downgrades)
@@ -176,6 +193,7 @@ async def stripe_webhook(
                 customer_id=cust_id
             )
             db.commit()
+            principal_cache.invalidate(user.id)
             LOG.info(f"Updated subscription for user {user.id} to status: {status}")
             return {"received": True}
 
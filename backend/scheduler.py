@@ -15,18 +15,21 @@ import time
 import uuid
 import os
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 # DB / Models
 from database import SessionLocal
-from models_db import SchedulerLock, User
+from models_db import SchedulerLock
 from sqlalchemy.orm import Session
 
 # Core
 from strategies.registry import get_registry, load_default_strategies
-from core.signal_logger import log_signal
+from core.signal_logger import log_signals_bulk
+from core import admin_counters, evaluation_memo, quota_counters
+from core.idempotency_filter import idempotency_filter
 from core.entitlements import PLANS
-from notify import send_telegram
+from core.notification_outbox import OUTBOX_ENABLED, plan_chat_ids, telegram_message
+from services.telegram_queue import telegram_queue
 
 # -------------------------------------------------------------------------
 # Logging
@@ -93,7 +96,17 @@ class StrategyScheduler:
             
         # State
         self.last_run: Dict[str, datetime] = {} # Key: "{plan}_{strat}_{tf}"
-        self.dedupe_cache: Dict[str, datetime] = {}
+        # Repeated emissions are dropped by core.idempotency_filter (warmed in run())
+        self.dedupe = idempotency_filter
+        # Admin KPI counters drift check (core.admin_counters.reconcile)
+        self.last_counters_reconcile: Optional[datetime] = None
+        # Redis quota counters -> daily_usage write-back (core.quota_counters.flush)
+        self.last_quota_flush: Optional[datetime] = None
+        # Price feed (services.price_feed): alerts + TP/SL react to ticks,
+        # the candle pass only runs once per closed 1h bar
+        self.feed_running = False
+        self.feed_started = False
+        self.last_eval_bar: Optional[int] = None
         
     def acquire_lock(self, db: Session) -> bool:
         now = datetime.utcnow()
@@ -174,19 +187,31 @@ class StrategyScheduler:
         strategy_impl = self.registry.get(impl_id)
         if not strategy_impl:
             # Try direct code lower
-            strategy_impl = self.registry.get(task["strategy_code"].lower())
+            impl_id = task["strategy_code"].lower()
+            strategy_impl = self.registry.get(impl_id)
             
         if not strategy_impl:
             LOG.warning("Strategy implementation not found: %s", task["strategy_code"])
             return []
 
         try:
-             # Run Generator
-             # return list of Signal objects (or dicts)
-             signals = strategy_impl.generate_signals(
-                 tokens=task["tokens"],
-                 timeframe=task["timeframe"]
-             )
+             # Run Generator (per token, memoized on the candles evaluated).
+             # Plans share strategy/timeframe/token combos, so TRIAL/TRADER/PRO
+             # tasks (and LITE requests) on the same data reuse one evaluation.
+             tf = task["timeframe"]
+             params = evaluation_memo.strategy_config(strategy_impl)
+             fetched = {t: self._prefetch_candles(t, tf) for t in task["tokens"]}
+             signals = []
+             for t in task["tokens"]:
+                 ctx = {"data": {t.upper(): fetched[t]}} if fetched[t] else None
+                 cached = evaluation_memo.memoize(
+                     impl_id, params, t, tf, evaluation_memo.data_key(fetched[t]), "signals",
+                     lambda: [
+                         evaluation_memo.signal_to_dict(s)
+                         for s in strategy_impl.generate_signals(tokens=[t], timeframe=tf, context=ctx)
+                     ],
+                 )
+                 signals.extend(evaluation_memo.signal_from_dict(d) for d in cached)
              
              # MARKETING/ACTIVITY BOOST:
              # If no confirmed trades, check for "Watchlist" items (Near-Misses)
@@ -201,7 +226,11 @@ class StrategyScheduler:
                  from datetime import datetime
                  
                  for t in task["tokens"]:
-                     items = strategy_impl.analyze_watchlist(t, task["timeframe"])
+                     ctx = {"data": {t.upper(): fetched[t]}} if fetched[t] else None
+                     items = evaluation_memo.memoize(
+                         impl_id, params, t, tf, evaluation_memo.data_key(fetched[t]), "watchlist",
+                         lambda: strategy_impl.analyze_watchlist(t, tf, context=ctx),
+                     )
                      for item in items:
                          # Convert dict to Signal (Activity Mode)
                          # direction = item['side']
@@ -233,6 +262,18 @@ class StrategyScheduler:
             LOG.error("Task failed %s: %s", task["key"], e)
             return []
 
+    @staticmethod
+    def _prefetch_candles(token: str, tf: str) -> List[Dict[str, Any]]:
+        """Same candles LITE evaluates (resampled 1h series, native fallback); [] on failure."""
+        from core.market_data_api import get_ohlcv_data
+        from market_data.resample import resampled_ohlcv
+
+        try:
+            return resampled_ohlcv(token.upper(), tf, 350) or get_ohlcv_data(token.upper(), tf, limit=350) or []
+        except Exception:
+            LOG.exception("Candle prefetch failed for %s %s", token, tf)
+            return []
+
     def process_and_persist_signals(self, signals: List[Any], task: Dict[str, Any]):
         """
         Persist signals as Master Signals (user_id=NULL, mode=PLAN).
@@ -243,8 +284,7 @@ class StrategyScheduler:
         
         db = SessionLocal()
         try:
-            # 1. Persist Master Signals
-            cnt = 0
+            # 1. Enrich Master Signals
             for sig in signals:
                 # Enrich Signal
                 # strategy_id used to be specific instance ID 'titan_btc_4h'.
@@ -256,64 +296,84 @@ class StrategyScheduler:
                 sig.mode = task["plan"] # Scope
                 sig.user_id = None # Master Signal
                 sig.is_saved = 1
-                
-                if log_signal(sig, db_session=db):
-                    cnt += 1
-                    # Notification Fan-out
-                    self.fan_out_notifications(db, sig, task["plan"])
-            
-            if cnt > 0:
-                LOG.info("Persisted %d signals for %s", cnt, task["key"])
+
+            # 2. Persist in ONE idempotent multi-row INSERT (only new rows come back)
+            #    Notifications go to the outbox in the same transaction
+            #    (delivered by outbox_worker, not by this loop).
+            new_ids = log_signals_bulk(signals, telegram_plan=task["plan"])
+            new_signals = [sig for sig, new_id in zip(signals, new_ids) if new_id]
+
+            if new_signals:
+                LOG.info("Persisted %d signals for %s", len(new_signals), task["key"])
+                if not OUTBOX_ENABLED:
+                    # 3. Inline Fan-out (queued; delivered at end of cycle)
+                    self.fan_out_notifications(db, new_signals, task["plan"])
                 
         except Exception:
             LOG.exception("Persistence failed")
         finally:
             db.close()
 
-    def fan_out_notifications(self, db: Session, sig: Any, plan: str):
+    def fan_out_notifications(self, db: Session, sigs: List[Any], plan: str):
         """
-        Sends Telegram alerts to all users in 'plan' who have Telegram configured.
+        Inline fan-out (only with NOTIFY_OUTBOX=false; otherwise outbox_worker does it).
+        Queues Telegram alerts for all users in 'plan' who have Telegram configured.
+        One user query per batch; the queue coalesces per chat and delivers
+        rate-limited at the end of the cycle (telegram_queue.flush_cycle()).
         """
-        # 1. Find Users in Plan (active coverage)
-        # Normalize plan query often requires handling aliases if DB has mixed data.
-        # We assume strict adherence to 'TRADER', 'PRO' etc. or map aliases.
-        
-        target_plans = [plan]
-        if plan == "TRADER": 
-            target_plans.extend(["FREE", "LITE", "SWINGLITE"]) # Legacy compat
-        if plan == "PRO":
-            target_plans.extend(["SWINGPRO", "PREMIUM"])
-
-        # 2. Query Users with Chat ID
-        users = db.query(User).filter(
-            User.plan.in_(target_plans),
-            User.telegram_chat_id.isnot(None)
-        ).all()
-        
-        if not users:
+        chat_ids = plan_chat_ids(db, plan)
+        if not chat_ids:
             return
 
-        # 3. Dedupe & Send
-        # We use a cache key to avoid spamming the same global signal repeated times 
-        # (log_signal handles idempotency DB-side, but duplicate execution might trigger this)
-        
-        msg = (
-            f"⚡ <b>{plan} ALERT</b>\n"
-            f"{'🟢' if sig.direction=='long' else '🔴'} <b>{sig.token} {sig.direction.upper()}</b>\n"
-            f"TF: {sig.timeframe}\n"
-            f"Entry: {sig.entry}\n"
-            f"Stop: {sig.sl}\n"
-            f"Target: {sig.tp}"
-        )
-        
-        for u in users:
-            # Simple check if user wants alerts? Assuming 'Yes' if ChatID present for MVP.
-            # In future: check User preferences.
-            send_telegram(msg, chat_id=u.telegram_chat_id)
+        # Enqueue (duplicates across cycles are already dropped by log_signals_bulk)
+        for sig in sigs:
+            msg = telegram_message(sig, plan)
+            for chat_id in chat_ids:
+                # Simple check if user wants alerts? Assuming 'Yes' if ChatID present for MVP.
+                # In future: check User preferences.
+                telegram_queue.enqueue(chat_id, msg)
 
+    def start_price_feed(self) -> None:
+        """Subscribes alerts + evaluator to the price feed and starts it."""
+        from services.alerts_checker import on_price_ticks as alerts_on_ticks
+        from services.price_feed import price_feed, start_price_feed
+
+        price_feed.subscribe(alerts_on_ticks)
+        price_feed.subscribe(self.on_price_ticks)
+        try:
+            self.feed_running = start_price_feed()
+        except Exception:
+            LOG.exception("Price feed start failed (falling back to polling)")
+            self.feed_running = False
+
+    def on_price_ticks(self, ticks: List[Any]) -> None:
+        """Price feed subscriber: closes signals whose TP/SL the tick range touched."""
+        from core.signal_evaluator import evaluate_on_ticks
+
+        db = SessionLocal()
+        try:
+            closed = evaluate_on_ticks(db, ticks)
+            if closed:
+                LOG.info(f"Validator (ticks): Closed {closed} signals (TP/SL)")
+        except Exception:
+            db.rollback()
+            LOG.exception("Tick evaluation failed")
+        finally:
+            db.close()
 
     def run(self):
         LOG.info("Scheduler Starting... (Plan-Based)")
+        if OUTBOX_ENABLED:
+            from outbox_worker import start_outbox_worker_thread
+            start_outbox_worker_thread()
+        db = SessionLocal()
+        try:
+            self.dedupe.warm(db)
+        except Exception:
+            LOG.exception("Idempotency filter warm-up failed")
+        finally:
+            db.close()
+
         while True:
             db = SessionLocal()
             has_lock = False
@@ -345,16 +405,73 @@ class StrategyScheduler:
                 # Persist
                 self.process_and_persist_signals(signals, task)
 
-            # === VALIDATION STEP ===
+            # One coalesced Telegram message per chat for this cycle (non-blocking)
             try:
-                db_val = SessionLocal()
-                from core.signal_evaluator import evaluate_pending_signals
-                validated_count = evaluate_pending_signals(db_val)
-                if validated_count > 0:
-                    LOG.info(f"Validator: Updated {validated_count} signals (TP/SL/Timeout)")
-                db_val.close()
-            except Exception as e:
-                LOG.error(f"Validator failed: {e}")
+                telegram_queue.flush_cycle()
+            except Exception:
+                LOG.exception("Telegram flush failed")
+
+            # === VALIDATION STEP ===
+            # With the price feed, TP/SL touches close on ticks (on_price_ticks);
+            # the candle pass (timeouts, gaps, history) runs once per closed bar.
+            eval_bar = evaluation_memo.last_closed_bar_ts("1h")
+            if not self.feed_running or eval_bar != self.last_eval_bar:
+                self.last_eval_bar = eval_bar
+                try:
+                    db_val = SessionLocal()
+                    from core.signal_evaluator import evaluate_pending_signals
+                    validated_count = evaluate_pending_signals(db_val)
+                    if validated_count > 0:
+                        LOG.info(f"Validator: Updated {validated_count} signals (TP/SL/Timeout)")
+                    db_val.close()
+                except Exception as e:
+                    LOG.error(f"Validator failed: {e}")
+
+            # Feed starts after the first bar pass: signals that expired while
+            # we were down are settled on candles before ticks can touch them
+            if not self.feed_started:
+                self.feed_started = True
+                self.start_price_feed()
+
+            # === WATCH ALERTS (polling, only without the price feed) ===
+            if not self.feed_running:
+                try:
+                    import asyncio
+                    from services.alerts_checker import check_watch_alerts
+                    asyncio.run(check_watch_alerts())
+                except Exception:
+                    LOG.exception("Watch alerts check failed")
+
+            # === ADMIN COUNTERS RECONCILIATION (periodic) ===
+            if (
+                self.last_counters_reconcile is None
+                or (now - self.last_counters_reconcile).total_seconds() >= admin_counters.RECONCILE_SECONDS
+            ):
+                self.last_counters_reconcile = now
+                db_rec = SessionLocal()
+                try:
+                    admin_counters.reconcile(db_rec)
+                except Exception:
+                    db_rec.rollback()
+                    LOG.exception("Admin counters reconcile failed")
+                finally:
+                    db_rec.close()
+
+            # === QUOTA COUNTERS WRITE-BACK (periodic) ===
+            if (
+                self.last_quota_flush is None
+                or (now - self.last_quota_flush).total_seconds() >= quota_counters.FLUSH_SECONDS
+            ):
+                self.last_quota_flush = now
+                db_q = SessionLocal()
+                try:
+                    flushed = quota_counters.flush(db_q)
+                    if flushed:
+                        LOG.info(f"Quota counters flushed to daily_usage: {flushed}")
+                except Exception:
+                    LOG.exception("Quota counters flush failed")
+                finally:
+                    db_q.close()
 
             time.sleep(self.loop_interval)
 
@@ -8,7 +8,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine_sync, Base
-from models_db import Signal, SignalEvaluation, User, StrategyConfig
+from models_db import SIGNAL_CLOSED, Signal, SignalEvaluation, User, StrategyConfig
 
 # --- Configuration ---
 NUM_PAST_SIGNALS = 45
@@ -193,6 +193,7 @@ def generate_signals(db: Session):
                 exit_price=round(exit_price, 4),
             )
             db.add(eval_obj)
+            sig.status = SIGNAL_CLOSED
         else:
             # Open signal!
             # Ensure Dashboard sees it as "Active"
@@ -6,145 +6,157 @@ from database import SessionLocal
 from models_db import WatchAlert, User
 from core.market_data_api import get_current_price
 from services.telegram_bot import bot
-from core.entitlements import get_user_entitlements
+from core.entitlements import allowed_pairs
+from core.alert_index import alert_index
 
 # -----------------------------------------------------------------------------
 # Watchlist / Entitlement-based Alert Checker
 # -----------------------------------------------------------------------------
 
-async def check_watch_alerts():
+# Expire + index sync cadence when driven by price feed ticks (every second)
+SYNC_SECONDS = float(os.getenv("ALERTS_SYNC_SECONDS", "10"))
+_last_sync = None
+
+
+def _housekeeping(db, now):
+    """Expires old alerts and pulls new ones into the index."""
+    global _last_sync
+    _last_sync = now
+
+    # 1. Expire old alerts
+    expired_ids = [r[0] for r in db.query(WatchAlert.id).filter(
+        WatchAlert.status == "PENDING",
+        WatchAlert.expires_at < now
+    ).all()]
+    if expired_ids:
+        db.query(WatchAlert).filter(WatchAlert.id.in_(expired_ids)).update(
+            {WatchAlert.status: "EXPIRED"}, synchronize_session=False
+        )
+        db.commit()
+        alert_index.discard_many(expired_ids)
+        print(f"[ALERTS] Expired {len(expired_ids)} alerts.")
+
+    # 2. Index: new alerts since last run (+ periodic full rebuild)
+    alert_index.sync(db)
+
+
+async def check_watch_alerts(ticks=None):
     """
-    Periodic job to check Watchlist Alerts.
-    Checks: PENDING alerts -> trigger vs price.
+    Checks Watchlist Alerts.
+    Checks: PENDING alerts -> trigger vs price, via the price-level index
+    (core.alert_index): only alerts whose level was crossed are loaded.
     Action: Send Telegram & Update DB.
+
+    ticks: price feed ticks (services.price_feed) -> no price fetch, LONG vs
+    tick high / SHORT vs tick low; expire + sync at most every SYNC_SECONDS.
+    None: polling run (fetches prices, always expires + syncs).
     
     [SECURED] filtering by Entitlements (no alerts if plan expired or token not allowed).
     """
     db = SessionLocal()
     try:
         now = datetime.utcnow()
-        
-        # 1. Expire old alerts
-        expired = db.query(WatchAlert).filter(
-            WatchAlert.status == "PENDING",
-            WatchAlert.expires_at < now
-        ).all()
-        for exp in expired:
-            exp.status = "EXPIRED"
-        
-        if expired:
-            db.commit()
-            print(f"[ALERTS] Expired {len(expired)} alerts.")
-
-        # 2. Check Active Alerts
-        active = db.query(WatchAlert).filter(WatchAlert.status == "PENDING").all()
-        if not active:
-            return
+        if ticks is None or _last_sync is None or (now - _last_sync).total_seconds() >= SYNC_SECONDS:
+            _housekeeping(db, now)
+
+        if ticks is None:
+            tokens_to_fetch = alert_index.tokens()
+            if not tokens_to_fetch:
+                return
+
+            # Optimization: Fetch prices once per token
+            async def fetch_price_safe(t):
+                try:
+                    # Assuming get_current_price is blocking I/O
+                    return t, await asyncio.to_thread(get_current_price, t)
+                except Exception as e:
+                    print(f"[ALERTS] Error fetching price for {t}: {e}")
+                    return t, None
+
+            tasks = [fetch_price_safe(t) for t in tokens_to_fetch]
+            results = await asyncio.gather(*tasks)
+            ranges = {t: (p, p, p) for t, p in results if p and p > 0}
+        else:
+            ranges = {t.token: (t.price, t.high, t.low) for t in ticks}
 
-        # Optimization: Fetch prices once per token
-        tokens_to_fetch = set(a.token for a in active)
+        # 2a. Binary search: only the levels crossed since the previous price
         prices = {}
-        
-        async def fetch_price_safe(t):
-            try:
-                # Assuming get_current_price is blocking I/O
-                return t, await asyncio.to_thread(get_current_price, t)
-            except Exception as e:
-                print(f"[ALERTS] Error fetching price for {t}: {e}")
-                return t, None
-
-        tasks = [fetch_price_safe(t) for t in tokens_to_fetch]
-        results = await asyncio.gather(*tasks)
-        
-        for token, price in results:
-            if price and price > 0:
-                prices[token] = price
+        crossed_ids = []
+        for token, (price, high, low) in ranges.items():
+            prices[token] = price
+            crossed_ids += alert_index.pop_crossed(token, high, low)
+        if not crossed_ids:
+            return
+
+        # Re-read from DB: canceled / deleted in another worker since indexed
+        crossed = db.query(WatchAlert).filter(
+            WatchAlert.id.in_(crossed_ids), WatchAlert.status == "PENDING"
+        ).all()
 
         triggered_count = 0
-        
-        for alert in active:
-            # 2a. Entitlement Check
-            # We must load the user to verify if they still have access to this token/timeframe
-            # Optimization: could cache user entitlements, but for safety lets check.
-            user = db.query(User).filter(User.id == alert.user_id).first()
+
+        # 2b. Entitlements: one query for the distinct users, then O(1) set lookups
+        # (allowed (token, timeframe) pairs are precomputed per plan)
+        user_ids = {a.user_id for a in crossed}
+        users = {u.id: u for u in db.query(User).filter(User.id.in_(user_ids)).all()}
+        allowed = {uid: allowed_pairs(u) for uid, u in users.items()}
+
+        for alert in crossed:
+            alert.last_check_at = datetime.utcnow()
+            user = users.get(alert.user_id)
             if not user:
                 continue
-                
-            # Verify Entitlements
-            entitlements = get_user_entitlements(user)
-            offerings = entitlements.get("offerings", [])
-            
-            # Check if ANY offering covers this token + timeframe?
-            # WatchAlert has 'token' and 'timeframe'.
-            # We need to see if user has an ACTIVE offering that includes this token.
-            
-            # Helper: Is (token, timeframe) in offerings?
-            is_allowed = False
-            for off in offerings:
-                # off['tokens'] is list of strings, off['timeframe'] is string
-                if (alert.timeframe == off["timeframe"]) and (alert.token in off["tokens"]):
-                    is_allowed = True
-                    break
-            
-            if not is_allowed:
-                # Silent skip, or expire?
+
+            if (alert.token, alert.timeframe) not in allowed[user.id]:
                 # If plan downgraded, maybe we shouldn't alert.
                 # Skip alert if user lost entitlement for token/timeframe
+                # (stays PENDING; re-indexed on the next full rebuild)
                 continue
 
-            # 2b. Price Check
-            current_price = prices.get(alert.token)
-            if not current_price:
-                continue
-                
-            is_triggered = False
-            if alert.side.upper() == "LONG":
-                if current_price >= alert.trigger_price:
-                    is_triggered = True
-            elif alert.side.upper() == "SHORT":
-                if current_price <= alert.trigger_price:
-                    is_triggered = True
+            current_price = prices[alert.token]
+            print(
+                f"[ALERTS] TRIGGERED! {alert.token} {alert.side} @ {current_price} "
+                f"(Target: {alert.trigger_price})"
+            )
             
-            if is_triggered:
-                print(
-                    f"[ALERTS] TRIGGERED! {alert.token} {alert.side} @ {current_price} "
-                    f"(Target: {alert.trigger_price})"
+            chat_id = user.telegram_chat_id 
+            # Fallback for dev/testing
+            if not chat_id:
+                 chat_id = os.getenv("TELEGRAM_DEFAULT_CHAT_ID")
+
+            if chat_id:
+                msg = (
+                    f"🚨 <b>WATCH ALERT</b>\n\n"
+                    f"🪙 <b>{alert.token} {alert.side}</b>\n"
+                    f"TF: {alert.timeframe}\n"
+                    f"Hit: <b>${alert.trigger_price}</b>\n"
+                    f"Current: ${current_price}\n"
+                    f"<i>Verified Entitlement ✅</i>"
                 )
                 
-                chat_id = user.telegram_chat_id 
-                # Fallback for dev/testing
-                if not chat_id:
-                     chat_id = os.getenv("TELEGRAM_DEFAULT_CHAT_ID")
-
-                if chat_id:
-                    msg = (
-                        f"🚨 <b>WATCH ALERT</b>\n\n"
-                        f"🪙 <b>{alert.token} {alert.side}</b>\n"
-                        f"TF: {alert.timeframe}\n"
-                        f"Hit: <b>${alert.trigger_price}</b>\n"
-                        f"Current: ${current_price}\n"
-                        f"<i>Verified Entitlement ✅</i>"
-                    )
-                    
-                    try:
-                        await bot.send_message(chat_id, msg)
-                        alert.status = "TRIGGERED"
-                        alert.fired_at = datetime.utcnow()
-                        triggered_count += 1
-                    except Exception as e:
-                        print(f"[ALERTS] Failed to send Telegram to {chat_id}: {e}")
-                else:
-                    alert.status = "TRIGGERED" 
+                try:
+                    await bot.send_message(chat_id, msg)
+                    alert.status = "TRIGGERED"
                     alert.fired_at = datetime.utcnow()
                     triggered_count += 1
+                except Exception as e:
+                    print(f"[ALERTS] Failed to send Telegram to {chat_id}: {e}")
+                    alert_index.add(alert)  # retry on the next run
+            else:
+                alert.status = "TRIGGERED" 
+                alert.fired_at = datetime.utcnow()
+                triggered_count += 1
             
-            alert.last_check_at = datetime.utcnow()
-            
+        db.commit()
         if triggered_count > 0:
-            db.commit()
             print(f"[ALERTS] Fired {triggered_count} alerts.")
             
     except Exception as e:
         print(f"[ALERTS] Job Error: {e}")
     finally:
         db.close()
+
+
+def on_price_ticks(ticks):
+    """services.price_feed subscriber (dispatcher thread, no running loop)."""
+    asyncio.run(check_watch_alerts(ticks))
@@ -0,0 +1,304 @@
+# backend/services/price_feed.py
+"""
+In-process streaming price feed for the supported universe.
+
+Replaces per-consumer polling of `get_current_price` (one-bar OHLCV through
+the four-exchange race) with one subscription per exchange:
+
+- websocket: ccxt.pro `watch_tickers(pairs)` per exchange
+  (PRICE_FEED_EXCHANGES, in priority order; PRICE_FEED_WS=false disables)
+- polling fallback: one batched `fetch_tickers(pairs)` every
+  PRICE_FEED_POLL_SECONDS for the tokens with no update in the last
+  PRICE_FEED_STALE_SECONDS (all of them when no websocket is up)
+
+Raw updates are coalesced per token and dispatched every
+PRICE_FEED_TICK_SECONDS as `Tick(price, high, low)`: high / low cover every
+update since the previous tick *including* its price, so a level between two
+ticks is always inside [low, high]. Updates from a less preferred exchange
+are only taken while the preferred one is stale (no cross-exchange spread
+in the ranges).
+
+Subscribers (`subscribe(fn)`) receive the list of ticks of each dispatch on
+the dispatcher thread. `replay(rows)` drives the same path from recorded
+prices (tests, backfills) without any network.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from data.supported_tokens import VALID_TOKENS_FULL
+
+EXCHANGES = [
+    e.strip() for e in os.getenv("PRICE_FEED_EXCHANGES", "binance,bybit,kucoin,kraken").split(",") if e.strip()
+]
+WS_ENABLED = os.getenv("PRICE_FEED_WS", "true").lower() in ("1", "true", "yes")
+TICK_SECONDS = float(os.getenv("PRICE_FEED_TICK_SECONDS", "1"))
+POLL_SECONDS = float(os.getenv("PRICE_FEED_POLL_SECONDS", "10"))
+STALE_SECONDS = float(os.getenv("PRICE_FEED_STALE_SECONDS", "30"))
+QUOTE = "USDT"
+
+Subscriber = Callable[[List["Tick"]], None]
+
+
+@dataclass(frozen=True, slots=True)
+class Tick:
+    token: str
+    price: float  # last
+    high: float  # max since the previous tick (incl. its price)
+    low: float  # min since the previous tick (incl. its price)
+    ts: float  # epoch seconds of the last update
+    source: str
+
+
+class PriceFeed:
+    def __init__(
+        self,
+        tokens: Optional[Iterable[str]] = None,
+        exchanges: Optional[List[str]] = None,
+        tick_seconds: float = TICK_SECONDS,
+        poll_seconds: float = POLL_SECONDS,
+        stale_seconds: float = STALE_SECONDS,
+        websocket: bool = WS_ENABLED,
+    ):
+        self.tokens = [t.upper() for t in (tokens or VALID_TOKENS_FULL)]
+        self.exchanges = list(exchanges or EXCHANGES)
+        self.tick_seconds = tick_seconds
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.websocket = websocket
+
+        self._lock = threading.Lock()
+        self._token_set = set(self.tokens)
+        self._last: Dict[str, Tick] = {}
+        self._pending: Dict[str, List[Any]] = {}  # token -> [price, high, low, ts, source]
+        self._owner: Dict[str, tuple] = {}  # token -> (source, ts of its last update)
+        self._subscribers: List[Subscriber] = []
+        self._rest: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._stats = {"updates": 0, "dropped": 0, "ticks": 0, "polls": 0, "poll_errors": 0, "ws_errors": 0}
+
+    # === Subscribers ===
+    def subscribe(self, fn: Subscriber) -> Callable[[], None]:
+        with self._lock:
+            self._subscribers.append(fn)
+
+        def _unsubscribe() -> None:
+            with self._lock:
+                if fn in self._subscribers:
+                    self._subscribers.remove(fn)
+
+        return _unsubscribe
+
+    # === Ingest ===
+    def update(self, token: str, price: Optional[float], source: str = "manual", ts: Optional[float] = None) -> bool:
+        """Raw price from a source; coalesced until the next dispatch()."""
+        token = (token or "").upper()
+        if not price or price <= 0 or token not in self._token_set:
+            return False
+        price = float(price)
+        now = ts if ts is not None else time.time()
+        with self._lock:
+            if not self._accept(token, source, now):
+                self._stats["dropped"] += 1
+                return False
+            self._owner[token] = (source, now)
+            self._stats["updates"] += 1
+            p = self._pending.get(token)
+            if p is None:
+                prev = self._last.get(token)
+                base = prev.price if prev else price
+                self._pending[token] = [price, max(base, price), min(base, price), now, source]
+            else:
+                p[0], p[1], p[2], p[3], p[4] = price, max(p[1], price), min(p[2], price), now, source
+        return True
+
+    def _rank(self, source: str) -> int:
+        return self.exchanges.index(source) if source in self.exchanges else len(self.exchanges)
+
+    def _accept(self, token: str, source: str, now: float) -> bool:
+        owner = self._owner.get(token)
+        if owner is None or owner[0] == source or self._rank(source) <= self._rank(owner[0]):
+            return True
+        # Less preferred exchange: only while the preferred one is silent
+        return now - owner[1] >= self.stale_seconds
+
+    def dispatch(self) -> List[Tick]:
+        """Emits one Tick per token updated since the last dispatch."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            ticks = [Tick(token, *p) for token, p in pending.items()]
+            for t in ticks:
+                self._last[t.token] = t
+            self._stats["ticks"] += len(ticks)
+            subscribers = list(self._subscribers)
+        if ticks:
+            for fn in subscribers:
+                try:
+                    fn(ticks)
+                except Exception as e:
+                    print(f"[PRICE FEED] Subscriber {getattr(fn, '__name__', fn)} failed: {e}")
+        return ticks
+
+    # === Reads ===
+    def last(self, token: str) -> Optional[Tick]:
+        with self._lock:
+            return self._last.get((token or "").upper())
+
+    def price(self, token: str, max_age: Optional[float] = None) -> Optional[float]:
+        """Last dispatched price, or None if unknown / older than max_age (default stale_seconds)."""
+        tick = self.last(token)
+        max_age = self.stale_seconds if max_age is None else max_age
+        if tick is None or time.time() - tick.ts > max_age:
+            return None
+        return tick.price
+
+    def stale_tokens(self, now: Optional[float] = None) -> List[str]:
+        now = now if now is not None else time.time()
+        with self._lock:
+            return [t for t in self.tokens if t not in self._owner or now - self._owner[t][1] >= self.stale_seconds]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            s["tokens"] = len(self._last)
+            s["sources"] = sorted({o[0] for o in self._owner.values()})
+        s["running"] = self.running
+        return s
+
+    # === Polling fallback (batched fetch_tickers) ===
+    def poll_once(self, tokens: Optional[List[str]] = None) -> int:
+        """One fetch_tickers for `tokens` (default: stale ones), exchanges in priority order."""
+        tokens = self.stale_tokens() if tokens is None else [t.upper() for t in tokens]
+        if not tokens:
+            return 0
+        pairs = [f"{t}/{QUOTE}" for t in tokens]
+        for ex_id in self.exchanges:
+            try:
+                tickers = self._rest_exchange(ex_id).fetch_tickers(pairs)
+            except Exception as e:
+                self._count("poll_errors")
+                print(f"[PRICE FEED] fetch_tickers failed on {ex_id}: {e}")
+                continue
+            self._count("polls")
+            n = sum(1 for sym, t in (tickers or {}).items() if self.update(sym.split("/")[0], t.get("last"), ex_id))
+            if n:
+                return n
+        return 0
+
+    def _rest_exchange(self, ex_id: str):
+        ex = self._rest.get(ex_id)
+        if ex is None:
+            import ccxt
+
+            ex = self._rest[ex_id] = getattr(ccxt, ex_id)({"enableRateLimit": True, "timeout": 5000})
+        return ex
+
+    # === Websocket ===
+    async def _watch(self, ex_id: str) -> None:
+        import ccxt.pro as ccxtpro
+
+        exchange = getattr(ccxtpro, ex_id)({"enableRateLimit": True})
+        try:
+            if not exchange.has.get("watchTickers"):
+                print(f"[PRICE FEED] {ex_id}: no watchTickers, polling only")
+                return
+            pairs = [f"{t}/{QUOTE}" for t in self.tokens]
+            backoff = 1.0
+            while not self._stop.is_set():
+                try:
+                    tickers = await exchange.watch_tickers(pairs)
+                    backoff = 1.0
+                    for sym, t in tickers.items():
+                        self.update(sym.split("/")[0], t.get("last"), ex_id)
+                except Exception as e:
+                    self._count("ws_errors")
+                    print(f"[PRICE FEED] {ex_id} websocket error: {e} (retry in {backoff:.0f}s)")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 60.0)
+        finally:
+            await exchange.close()
+
+    # === Local replay ===
+    def replay(self, rows: Iterable[Any], batch: int = 1) -> List[Tick]:
+        """
+        Drives the feed from recorded prices: rows of (token, price[, ts]) or
+        dicts with those keys. Dispatches every `batch` rows (and at the end).
+        Returns every tick emitted.
+        """
+        ticks: List[Tick] = []
+        for i, row in enumerate(rows, 1):
+            if isinstance(row, dict):
+                token, price, ts = row["token"], row["price"], row.get("ts")
+            else:
+                token, price, ts = row[0], row[1], (row[2] if len(row) > 2 else None)
+            self.update(token, float(price), "replay", float(ts) if ts not in (None, "") else None)
+            if i % batch == 0:
+                ticks += self.dispatch()
+        ticks += self.dispatch()
+        return ticks
+
+    def replay_csv(self, path: str, batch: int = 1) -> List[Tick]:
+        """CSV with header token,price[,ts]."""
+        with open(path, newline="", encoding="utf-8") as f:
+            return self.replay(csv.DictReader(f), batch=batch)
+
+    # === Lifecycle ===
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._dispatch_loop, name="price-feed-dispatch", daemon=True),
+            threading.Thread(target=self._poll_loop, name="price-feed-poll", daemon=True),
+        ]
+        if self.websocket:
+            for ex_id in self.exchanges:
+                self._threads.append(threading.Thread(
+                    target=lambda ex_id=ex_id: asyncio.run(self._watch(ex_id)),
+                    name=f"price-feed-ws-{ex_id}", daemon=True,
+                ))
+        for t in self._threads:
+            t.start()
+        print(f"[PRICE FEED] Started: {len(self.tokens)} tokens, exchanges={self.exchanges}, ws={self.websocket}")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _dispatch_loop(self) -> None:
+        while not self._stop.wait(self.tick_seconds):
+            self.dispatch()
+
+    def _poll_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"[PRICE FEED] Poll failed: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+
+price_feed = PriceFeed()
+
+
+def start_price_feed() -> bool:
+    """Arranca (una vez por proceso) el feed si RUN_PRICE_FEED no lo desactiva."""
+    if os.getenv("RUN_PRICE_FEED", "true").lower() not in ("1", "true", "yes"):
+        return False
+    price_feed.start()
+    return True
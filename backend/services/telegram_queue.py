@@ -0,0 +1,356 @@
+"""
+Rate-limited asynchronous Telegram delivery queue.
+
+The scheduler used to call notify.send_telegram (blocking requests.post,
+8s timeout) once per user and per signal. This queue:
+
+- coalesces every message enqueued for the same chat during a scheduler
+  cycle into as few messages as possible (flush_cycle()): alerts are packed
+  whole into messages of at most 4096 chars, never cut (a cut inside an HTML
+  tag makes Telegram reject the whole message),
+- delivers on a background asyncio loop with ONE pooled httpx.AsyncClient,
+- respects Telegram limits with token buckets: global (~30 msg/s) and
+  per chat (~1 msg/s),
+- honours `retry_after` on 429 and backs off on 5xx / network errors,
+- send_tracked(): immediate delivery with a per-message outcome, for callers
+  that must know what was delivered (the notification outbox worker).
+
+TELEGRAM_API_BASE overrides https://api.telegram.org (local stub bot API).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+PER_CHAT_RATE = float(os.getenv("TELEGRAM_PER_CHAT_RATE", "1"))
+MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+MAX_MESSAGE_CHARS = 4096
+CHAT_BUCKET_IDLE_SECONDS = 300
+
+
+class TokenBucket:
+    """Token bucket asyncio: `rate` tokens/s, ráfaga máxima `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Vacía el bucket durante `seconds` (retry_after del servidor)."""
+        self.tokens = -seconds * self.rate
+        self.updated = time.monotonic()
+
+
+class TelegramQueue:
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        api_base: Optional[str] = None,
+        global_rate: float = GLOBAL_RATE,
+        per_chat_rate: float = PER_CHAT_RATE,
+        max_retries: int = MAX_RETRIES,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.token = token
+        self.api_base = api_base
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.max_retries = max_retries
+        self._transport = transport
+
+        # chat_id -> [text, ...] (coalesced on flush_cycle)
+        self._pending: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._pending_lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._global_bucket: Optional[TokenBucket] = None
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+
+        self._stats = {"enqueued": 0, "sent": 0, "failed": 0, "retries": 0, "rate_limited": 0, "coalesced": 0}
+
+    # --- Config ---
+    def _bot_token(self) -> str:
+        return (
+            self.token
+            or os.getenv("TRADERCOPILOT_BOT_TOKEN", "").strip()
+            or os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
+        )
+
+    def _url(self) -> str:
+        base = self.api_base or os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+        return f"{base.rstrip('/')}/bot{self._bot_token()}/sendMessage"
+
+    # --- Producer side (sync, any thread) ---
+    def enqueue(self, chat_id: Any, text: str) -> None:
+        if not chat_id or not text:
+            return
+        with self._pending_lock:
+            self._pending.setdefault(str(chat_id), []).append(text)
+            self._stats["enqueued"] += 1
+
+    def _drain(self) -> List[Tuple[str, str]]:
+        with self._pending_lock:
+            pending, self._pending = self._pending, OrderedDict()
+        messages = []
+        for chat_id, texts in pending.items():
+            parts = self._coalesce(texts)
+            self._stats["coalesced"] += len(texts) - len(parts)
+            messages.extend((chat_id, part) for part in parts)
+        return messages
+
+    @staticmethod
+    def _split(text: str, limit: int) -> List[str]:
+        """A text over `limit` split at line boundaries; only a single line over the limit is hard-cut."""
+        if len(text) <= limit:
+            return [text]
+        pieces: List[str] = []
+        chunk = ""
+        for line in text.split("\n"):
+            while len(line) > limit:
+                if chunk:
+                    pieces.append(chunk)
+                    chunk = ""
+                pieces.append(line[:limit])
+                line = line[limit:]
+            if chunk and len(chunk) + 1 + len(line) > limit:
+                pieces.append(chunk)
+                chunk = line
+            else:
+                chunk = f"{chunk}\n{line}" if chunk else line
+        if chunk:
+            pieces.append(chunk)
+        return pieces
+
+    @classmethod
+    def _pack(cls, items: List[Tuple[str, Any]], limit: int = MAX_MESSAGE_CHARS) -> List[Tuple[str, List[Any]]]:
+        """
+        Packs whole (text, ref) items into messages of at most `limit` chars
+        (split only at message boundaries). Returns (message, refs it carries).
+        """
+        messages: List[Tuple[str, List[Any]]] = []
+        for text, ref in items:
+            for piece in cls._split(text, limit):
+                if messages and len(messages[-1][0]) + 2 + len(piece) <= limit:
+                    message, refs = messages[-1]
+                    messages[-1] = (f"{message}\n\n{piece}", refs + [ref])
+                else:
+                    messages.append((piece, [ref]))
+        return messages
+
+    @classmethod
+    def _coalesce(cls, texts: List[str], limit: int = MAX_MESSAGE_CHARS) -> List[str]:
+        return [message for message, _ in cls._pack([(text, None) for text in texts], limit)]
+
+    def flush_cycle(self, wait: bool = False, timeout: Optional[float] = None):
+        """
+        Fin de ciclo del scheduler: lo encolado por chat, agrupado en el mínimo de mensajes.
+        No bloquea salvo wait=True.
+        """
+        messages = self._drain()
+        if not messages:
+            return {"sent": 0, "failed": 0}
+        if not self._bot_token():
+            print("[TELEGRAM] ⚠️ No Bot Token configured.")
+            return {"sent": 0, "failed": len(messages)}
+
+        self._ensure_loop()
+        fut = asyncio.run_coroutine_threadsafe(self.deliver(messages), self._loop)
+        if wait:
+            return fut.result(timeout)
+        return fut
+
+    def send_tracked(self, items: List[Tuple[Any, str, Any]], timeout: float) -> Dict[Tuple[Any, str], str]:
+        """
+        Entrega inmediata de items (chat_id, text, ref), agrupados por chat como en
+        flush_cycle, con resultado por (ref, chat_id): "sent", "rejected" (4xx,
+        no se reintenta) o "failed" (sin token, reintentos agotados o fuera de
+        `timeout`). Lo que no terminó dentro de `timeout` se cancela.
+        """
+        by_chat: "OrderedDict[str, List[Tuple[str, Any]]]" = OrderedDict()
+        for chat_id, text, ref in items:
+            if chat_id and text:
+                by_chat.setdefault(str(chat_id), []).append((text, ref))
+
+        messages: List[Tuple[str, str]] = []
+        carried: List[Tuple[str, List[Any]]] = []
+        parts: Dict[Tuple[Any, str], int] = {}
+        for chat_id, chat_items in by_chat.items():
+            packed = self._pack(chat_items)
+            self._stats["coalesced"] += len(chat_items) - len(packed)
+            for message, refs in packed:
+                messages.append((chat_id, message))
+                carried.append((chat_id, refs))
+                for ref in refs:
+                    parts[(ref, chat_id)] = parts.get((ref, chat_id), 0) + 1
+        self._stats["enqueued"] += len(parts)
+
+        outcome = {key: "failed" for key in parts}
+        if not messages:
+            return outcome
+        if not self._bot_token():
+            print("[TELEGRAM] ⚠️ No Bot Token configured.")
+            return outcome
+
+        done: Dict[int, str] = {}
+        self._ensure_loop()
+        fut = asyncio.run_coroutine_threadsafe(self.deliver(messages, on_result=done.__setitem__), self._loop)
+        try:
+            fut.result(timeout)
+        except concurrent.futures.TimeoutError:
+            fut.cancel()
+            print(f"[TELEGRAM] ⚠️ Delivery not finished in {timeout}s: {len(messages) - len(done)} messages pending")
+
+        statuses: Dict[Tuple[Any, str], List[str]] = {}
+        for idx, status in dict(done).items():
+            chat_id, refs = carried[idx]
+            for ref in refs:
+                statuses.setdefault((ref, chat_id), []).append(status)
+        for key, got in statuses.items():
+            if len(got) == parts[key] and "failed" not in got:
+                outcome[key] = "rejected" if "rejected" in got else "sent"
+        return outcome
+
+    # --- Delivery loop (background thread) ---
+    def _ensure_loop(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run():
+            asyncio.set_event_loop(self._loop)
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=_run, name="telegram-queue", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=10.0,
+                limits=httpx.Limits(max_connections=int(self.global_rate), max_keepalive_connections=10),
+                transport=self._transport,
+            )
+        return self._client
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.per_chat_rate, capacity=1)
+        return bucket
+
+    def _evict_idle_buckets(self) -> None:
+        """Drops chat buckets idle long enough to be full again (a new one is identical)."""
+        now = time.monotonic()
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            idle = now - bucket.updated
+            if idle >= CHAT_BUCKET_IDLE_SECONDS and bucket.tokens + idle * bucket.rate >= bucket.capacity:
+                del self._chat_buckets[chat_id]
+
+    async def deliver(
+        self, messages: List[Tuple[str, str]], on_result: Optional[Callable[[int, str], None]] = None
+    ) -> Dict[str, int]:
+        """Envía (chat_id, text); on_result(index, status) se llama al resolver cada mensaje."""
+        if self._global_bucket is None:
+            self._global_bucket = TokenBucket(self.global_rate)
+        self._evict_idle_buckets()
+
+        # Parts of one chat go out in order; chats in parallel
+        by_chat: "OrderedDict[str, List[Tuple[int, str]]]" = OrderedDict()
+        for idx, (chat_id, text) in enumerate(messages):
+            by_chat.setdefault(chat_id, []).append((idx, text))
+
+        async def _chat(chat_id: str, texts: List[Tuple[int, str]]) -> List[str]:
+            statuses = []
+            for idx, text in texts:
+                status = await self._send(chat_id, text)
+                if on_result is not None:
+                    on_result(idx, status)
+                statuses.append(status)
+            return statuses
+
+        results = [s for ss in await asyncio.gather(*(_chat(c, t) for c, t in by_chat.items())) for s in ss]
+        sent = results.count("sent")
+        return {"sent": sent, "failed": len(results) - sent}
+
+    async def _send(self, chat_id: str, text: str) -> str:
+        """"sent", "rejected" (4xx permanente) o "failed" (reintentos agotados)."""
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML", "disable_web_page_preview": True}
+        chat_bucket = self._chat_bucket(chat_id)
+
+        for attempt in range(self.max_retries + 1):
+            await chat_bucket.acquire()
+            await self._global_bucket.acquire()
+            try:
+                resp = await self._http().post(self._url(), json=payload)
+            except Exception as e:
+                print(f"[TELEGRAM] ❌ Exception ({chat_id}): {e}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+                self._stats["retries"] += 1
+                continue
+
+            if resp.status_code == 200:
+                self._stats["sent"] += 1
+                return "sent"
+
+            if resp.status_code == 429:
+                self._stats["rate_limited"] += 1
+                self._stats["retries"] += 1
+                try:
+                    retry_after = float(resp.json().get("parameters", {}).get("retry_after", 1))
+                except Exception:
+                    retry_after = 1.0
+                # 429 puede ser por chat o global: pausamos ambos buckets
+                chat_bucket.pause(retry_after)
+                self._global_bucket.pause(retry_after)
+                continue
+
+            if resp.status_code >= 500:
+                self._stats["retries"] += 1
+                await asyncio.sleep(min(2 ** attempt, 30))
+                continue
+
+            # 4xx (chat bloqueado, id inválido...): no reintentar
+            print(f"[TELEGRAM] ❌ Error {resp.status_code} ({chat_id}): {resp.text[:200]}")
+            self._stats["failed"] += 1
+            return "rejected"
+
+        self._stats["failed"] += 1
+        return "failed"
+
+    def stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        with self._pending_lock:
+            s["pending_chats"] = len(self._pending)
+        s["chat_buckets"] = len(self._chat_buckets)
+        return s
+
+
+telegram_queue = TelegramQueue()
@@ -0,0 +1,100 @@
+import inspect
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from core import admin_counters
+from core.cache import cache
+from models_db import AdminCounter, Base, Signal, User
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: session.statements.append(a[2]))
+    cache.delete(admin_counters.SNAPSHOT_KEY)
+    yield session
+    cache.delete(admin_counters.SNAPSHOT_KEY)
+    session.close()
+    engine.dispose()
+
+
+def _counters(db):
+    return {c.name: c.value for c in db.query(AdminCounter).all() if c.value}
+
+
+def test_write_paths_match_reconcile(db):
+    now = datetime.utcnow()
+
+    # Registration
+    for i, plan in enumerate(["FREE", "TRADER", "PRO"]):
+        user = User(id=i + 1, email=f"u{i}@x.io", plan=plan, created_at=now - timedelta(hours=i))
+        db.add(user)
+        admin_counters.user_created(db, user)
+    old = User(id=9, email="old@x.io", plan="FREE", created_at=now - timedelta(days=10))
+    db.add(old)
+    admin_counters.user_created(db, old)
+    db.commit()
+
+    # Plan change
+    u = db.get(User, 1)
+    admin_counters.plan_changed(db, u.plan, "PRO")
+    u.plan = "PRO"
+
+    # Signal inserts + hide + delete
+    sigs = [
+        Signal(id=i, timestamp=now - timedelta(hours=i * 10), token="BTC", timeframe="1h",
+               direction="long", strategy_id=f"s{i}")
+        for i in range(1, 5)
+    ]
+    db.add_all(sigs)
+    admin_counters.signals_created(db, [s.timestamp for s in sigs])
+    admin_counters.signal_hidden_changed(db, 0, 1)
+    sigs[0].is_hidden = 1
+    admin_counters.signal_hidden_changed(db, 1, 1)  # no-op
+    admin_counters.signal_deleted(db, sigs[3])
+    db.delete(sigs[3])
+    db.commit()
+
+    # reconcile() prunes hourly buckets outside the retention window
+    oldest = admin_counters._hour(now - timedelta(hours=admin_counters.BUCKET_RETENTION_HOURS))
+    incremental = {
+        k: v for k, v in _counters(db).items()
+        if not k.startswith(admin_counters.USERS_CREATED) or k.rsplit(":", 1)[1] >= oldest
+    }
+    assert incremental == {k: v for k, v in admin_counters.reconcile(db).items() if v}
+
+    db.statements.clear()
+    stats = admin_counters.snapshot(db)
+    assert len(db.statements) == 1
+    assert stats["total_users"] == 4
+    assert stats["users_24h"] == 3
+    assert stats["active_plans"] == 2
+    assert stats["total_signals"] == 3
+    assert stats["hidden_signals"] == 1
+    assert stats["signals_24h"] == 2  # 10h and 20h ago
+    assert stats["mrr"] == 49 + 2 * 149
+
+    # Short cache: no DB round trip
+    db.statements.clear()
+    assert admin_counters.snapshot(db) == stats
+    assert db.statements == []
+
+
+def test_snapshot_bootstraps_empty_table(db):
+    db.add(User(id=1, email="a@x.io", plan="PRO", created_at=datetime.utcnow()))
+    db.commit()
+
+    stats = admin_counters.snapshot(db, use_cache=False)
+    assert stats["total_users"] == 1 and stats["active_plans"] == 1
+
+
+def test_admin_stats_endpoint_runs_off_the_event_loop():
+    from routers.admin import get_admin_stats
+
+    assert not inspect.iscoroutinefunction(get_admin_stats)
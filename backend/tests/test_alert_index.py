@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.alert_index import AlertLevelIndex, alert_index
+from models_db import Base, User, WatchAlert
+from services import alerts_checker
+
+
+def _alert(id, side, trigger, token="BTC"):
+    return SimpleNamespace(id=id, token=token, side=side, trigger_price=trigger, status="PENDING")
+
+
+def test_pop_crossed_returns_only_reached_levels():
+    idx = AlertLevelIndex()
+    for a in [_alert(1, "LONG", 105), _alert(2, "LONG", 110), _alert(3, "LONG", 110),
+              _alert(4, "SHORT", 95), _alert(5, "SHORT", 90), _alert(6, "LONG", 5, token="ETH")]:
+        assert idx.add(a)
+    assert not idx.add(_alert(1, "LONG", 105))  # already indexed
+
+    assert idx.pop_crossed("BTC", 100) == []
+    assert idx.pop_crossed("btc", 110) == [1, 2, 3]
+    assert idx.pop_crossed("BTC", 120) == []  # already fired, not returned again
+    assert idx.pop_crossed("BTC", 92) == [4]
+
+    assert idx.discard(5) and not idx.discard(5)
+    assert idx.pop_crossed("BTC", 1) == []
+    assert idx.tokens() == ["ETH"] and len(idx) == 1
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(alerts_checker, "SessionLocal", factory)
+    monkeypatch.delenv("TELEGRAM_DEFAULT_CHAT_ID", raising=False)
+
+    session = factory()
+    session.statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: session.statements.append(a[2]))
+    now = datetime.utcnow()
+    session.add(User(id=1, email="alerts@test.io", plan="PRO"))
+    session.add_all([
+        WatchAlert(id=i, user_id=1, token="BTC", timeframe="4H", side="LONG", trigger_price=100.0 + i,
+                   status="PENDING", expires_at=now + timedelta(hours=1))
+        for i in range(1, 201)
+    ])
+    session.add(WatchAlert(id=500, user_id=1, token="BTC", timeframe="4H", side="SHORT", trigger_price=90.0,
+                           status="PENDING", expires_at=now - timedelta(minutes=1)))
+    session.commit()
+    alert_index.clear()
+    yield session
+    alert_index.clear()
+    session.close()
+    engine.dispose()
+
+
+def _run(monkeypatch, price):
+    monkeypatch.setattr(alerts_checker, "get_current_price", lambda token: price)
+    asyncio.run(alerts_checker.check_watch_alerts())
+
+
+def test_checker_loads_only_crossed_alerts(db, monkeypatch):
+    _run(monkeypatch, 103.0)
+    assert db.get(WatchAlert, 500).status == "EXPIRED"
+    assert 500 not in alert_index
+    fired = db.query(WatchAlert).filter(WatchAlert.status == "TRIGGERED").order_by(WatchAlert.id).all()
+    assert [a.id for a in fired] == [1, 2, 3]
+    assert len(alert_index) == 197
+
+    # Next tick: new alert from another worker is picked up, the tick touches only crossed rows
+    db.expire_all()
+    db.add(WatchAlert(id=900, user_id=1, token="BTC", timeframe="4H", side="SHORT", trigger_price=104.5,
+                      status="PENDING", expires_at=datetime.utcnow() + timedelta(hours=1)))
+    db.commit()
+    db.statements.clear()
+    _run(monkeypatch, 104.0)
+
+    loads = [s for s in db.statements if s.lstrip().upper().startswith("SELECT") and "watch_alerts" in s]
+    # expire ids + incremental sync + crossed rows
+    assert len(loads) == 3
+    fired = {a.id for a in db.query(WatchAlert).filter(WatchAlert.status == "TRIGGERED")}
+    assert fired == {1, 2, 3, 4, 900}
+
+
+def test_canceled_elsewhere_is_not_fired(db, monkeypatch):
+    alert_index.sync(db, force=True)
+    db.get(WatchAlert, 1).status = "CANCELED"  # another worker, index not told
+    db.commit()
+    _run(monkeypatch, 101.5)
+    assert db.get(WatchAlert, 1).status == "CANCELED"
+    assert 1 not in alert_index
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from core import async_queries
+from core.security import create_access_token
+from database import _normalize_async_db_url
+from models_db import Base, User
+from routers.auth_new import get_current_user_async
+
+
+def test_async_url_normalization():
+    assert _normalize_async_db_url("postgres://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert _normalize_async_db_url("postgresql+asyncpg://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert _normalize_async_db_url("sqlite:///./x.db") == "sqlite+aiosqlite:///./x.db"
+
+
+@pytest.fixture
+def async_db(tmp_path, monkeypatch):
+    path = tmp_path / "async.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=3, email="async@test.io", plan="PRO"))
+    db.commit()
+    db.close()
+
+    aengine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    factory = async_sessionmaker(bind=aengine, expire_on_commit=False)
+    monkeypatch.setattr(async_queries, "_async_sessionmaker", lambda: factory)
+    yield
+    asyncio.run(aengine.dispose())
+    engine.dispose()
+
+
+def test_current_user_lookup_runs_on_async_session(async_db):
+    async def scenario():
+        token = create_access_token(data={"sub": "async@test.io"})
+        user = await get_current_user_async(token)
+        assert (user.id, user.plan) == (3, "PRO")
+
+        with pytest.raises(HTTPException) as exc:
+            await get_current_user_async(create_access_token(data={"sub": "ghost@test.io"}))
+        assert exc.value.status_code == 401
+
+    asyncio.run(scenario())
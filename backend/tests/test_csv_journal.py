@@ -0,0 +1,89 @@
+import csv
+
+from core.csv_journal import CsvJournal, segments
+
+HEADERS = ["timestamp", "token", "entry"]
+
+
+def test_journal_writes_same_csv_format(tmp_path):
+    journal = CsvJournal(fsync_seconds=0.05)
+    path = tmp_path / "LITE" / "btc.csv"
+
+    journal.append(path, HEADERS, {"timestamp": "2025-01-01T00:00:00Z", "token": "BTC", "entry": 1.5})
+    journal.append(path, HEADERS, [
+        {"timestamp": "2025-01-01T01:00:00Z", "token": "BTC", "entry": 2},
+        {"timestamp": "2025-01-01T02:00:00Z", "token": "BTC", "entry": "a,b"},
+    ])
+    assert journal.flush()
+
+    # Byte-identical to the old open/append/close DictWriter path
+    expected = tmp_path / "expected.csv"
+    with expected.open("a", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=HEADERS)
+        w.writeheader()
+        w.writerow({"timestamp": "2025-01-01T00:00:00Z", "token": "BTC", "entry": 1.5})
+        w.writerow({"timestamp": "2025-01-01T01:00:00Z", "token": "BTC", "entry": 2})
+        w.writerow({"timestamp": "2025-01-01T02:00:00Z", "token": "BTC", "entry": "a,b"})
+    assert path.read_bytes() == expected.read_bytes()
+
+    # Existing file: no second header after reopen
+    journal.close()
+    reopened = CsvJournal()
+    reopened.append(path, HEADERS, {"timestamp": "x", "token": "BTC", "entry": 3})
+    reopened.close()
+    assert path.read_text(encoding="utf-8").count("timestamp,token,entry") == 1
+
+
+def test_journal_rotates_by_size(tmp_path):
+    journal = CsvJournal(max_bytes=64)
+    path = tmp_path / "eth.csv"
+    for i in range(10):
+        journal.append(path, HEADERS, {"timestamp": f"t{i}", "token": "ETH", "entry": i})
+        journal.flush()
+    journal.close()
+
+    segments = sorted(tmp_path.glob("eth.*.csv"))
+    assert segments, "expected rotated segments"
+    for seg in segments + [path]:
+        rows = list(csv.DictReader(seg.open(encoding="utf-8")))
+        assert rows and all(r["token"] == "ETH" for r in rows)
+    total = sum(len(list(csv.DictReader(p.open(encoding="utf-8")))) for p in segments + [path])
+    assert total == 10
+    assert journal.stats()["rotations"] == len(segments)
+
+
+def test_two_processes_rotate_the_same_file(tmp_path):
+    # API + scheduler: one journal each on the same path
+    api, worker = CsvJournal(max_bytes=64), CsvJournal(max_bytes=64)
+    path = tmp_path / "sol.csv"
+    for i in range(20):
+        j = api if i % 2 else worker
+        j.append(path, HEADERS, {"timestamp": f"t{i}", "token": "SOL", "entry": i})
+        j.flush()
+    api.close()
+    worker.close()
+
+    segs = segments(path)
+    assert segs[-1] == path and len(segs) > 2
+    rows = [r for seg in segs for r in csv.DictReader(seg.open(encoding="utf-8"))]
+    # Nobody kept appending to a renamed segment: rows stay in write order
+    assert [int(r["entry"]) for r in rows] == list(range(20))
+    assert all(seg.stat().st_size < 64 + 40 for seg in segs[:-1])
+
+
+def test_mismatched_keys_do_not_lose_other_rows(tmp_path):
+    path = tmp_path / "ada.csv"
+    path.write_text("timestamp,token,entry\r\nt0,ADA,0\r\n", encoding="utf-8")
+
+    journal = CsvJournal()
+    # Existing file: columns come from its header, not from the caller's keys
+    journal.append(path, ["token", "timestamp", "entry"], {"token": "ADA", "timestamp": "t1", "entry": 1})
+    # Extra keys (e.g. a new field in log_row) are dropped instead of failing the batch
+    journal.append(path, HEADERS + ["extra"], {"timestamp": "t2", "token": "ADA", "entry": 2, "extra": "x"})
+    journal.append(path, HEADERS, {"timestamp": "t3", "token": "ADA", "entry": 3})
+    assert journal.flush()
+    journal.close()
+
+    rows = list(csv.DictReader(path.open(encoding="utf-8")))
+    assert [(r["timestamp"], r["entry"]) for r in rows] == [("t0", "0"), ("t1", "1"), ("t2", "2"), ("t3", "3")]
+    assert journal.stats()["errors"] == 0
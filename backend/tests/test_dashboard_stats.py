@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from core import dashboard_cache
+from models_db import SIGNAL_CLOSED, Base, Signal, SignalEvaluation, User
+from routers.stats import build_dashboard, get_dashboard_stats
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: session.statements.append(a[2]))
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _seed(db):
+    now = datetime.utcnow()
+    user = User(id=42, email="dash@test.io", created_at=now - timedelta(days=30))
+    db.add(user)
+
+    def sig(i, **kw):
+        base = dict(id=i, timestamp=now - timedelta(days=8, minutes=i), token="BTC", timeframe="4h",
+                    direction="long", entry=100.0, source="lite", user_id=42, is_saved=1,
+                    strategy_id=f"s{i}")
+        base.update(kw)
+        return Signal(**base)
+
+    def ev(i, hours_ago, result, pnl):
+        return SignalEvaluation(signal_id=i, evaluated_at=now - timedelta(hours=hours_ago),
+                                result=result, pnl_r=pnl)
+
+    db.add_all([
+        sig(1, status=SIGNAL_CLOSED), ev(1, 2, "WIN", 1.5),
+        sig(2, status=SIGNAL_CLOSED), ev(2, 3, "LOSS", -1.0),
+        sig(3, status=SIGNAL_CLOSED), ev(3, 24 * 3, "hit-tp", 2.0),
+        sig(4, status=SIGNAL_CLOSED), ev(4, 24 * 10, "WIN", 1.0),  # outside 7d
+        sig(5),  # open
+        sig(6, source="verification"),  # test source, ignored
+        sig(7, is_saved=0),  # transient, ignored
+        sig(8, user_id=7),  # someone else
+    ])
+    db.commit()
+    db.refresh(user)  # loaded like get_current_user would
+    return user, now
+
+
+def test_dashboard_single_query_matches_expected(db):
+    user, now = _seed(db)
+    db.statements.clear()
+
+    payload = build_dashboard(db, user)
+
+    assert len(db.statements) == 1
+    assert payload["summary"] == {
+        "win_rate_24h": 50.0,
+        "signals_evaluated_24h": 2,
+        "signals_total_evaluated": 4,
+        "open_signals": 1,
+        "pnl_7d": 2.5,
+    }
+
+    chart = payload["chart"]
+    assert [c["date"] for c in chart] == [(now - timedelta(days=6 - i)).strftime("%a") for i in range(7)]
+    by_day = {(now - timedelta(days=6 - i)).date(): c for i, c in enumerate(chart)}
+    for hours, kind in ((2, "wins"), (3, "losses"), (72, "wins")):
+        assert by_day[(now - timedelta(hours=hours)).date()][kind] >= 1
+    assert sum(c["wins"] for c in chart) == 2
+    assert sum(c["losses"] for c in chart) == 1
+
+
+def test_dashboard_cache_hit_and_invalidation(db):
+    user, _ = _seed(db)
+    dashboard_cache.invalidate([user.id])
+
+    first = get_dashboard_stats(current_user=user, db=db)
+    db.statements.clear()
+
+    # Warm cache: no DB round trip
+    assert get_dashboard_stats(current_user=user, db=db) == first
+    assert db.statements == []
+
+    # An evaluation for this user invalidates the cached payload
+    dashboard_cache.invalidate([user.id])
+    get_dashboard_stats(current_user=user, db=db)
+    assert len(db.statements) == 1
+    dashboard_cache.invalidate([user.id])
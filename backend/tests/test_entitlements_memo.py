@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from core import entitlements
+from core.entitlements import allowed_pairs, assert_token_allowed, get_user_entitlements, is_pair_allowed
+from models_db import User
+
+
+def _legacy_allowed(user, token, timeframe):
+    return any(
+        timeframe == off["timeframe"] and token in off["tokens"]
+        for off in get_user_entitlements(user)["offerings"]
+    )
+
+
+@pytest.mark.parametrize("plan,expires", [
+    ("FREE", None), ("FREE", -1), ("TRADER", None), ("PRO", None), ("OWNER", None), ("swingpro", None), (None, None),
+])
+def test_pair_set_matches_offerings(plan, expires):
+    exp = datetime.utcnow() + timedelta(days=expires) if expires else None
+    user = User(id=1, plan=plan, plan_expires_at=exp)
+    for token in ("BTC", "SOL", "XRP", "DOGE"):
+        for tf in ("1H", "4H", "1D", "15m"):
+            assert is_pair_allowed(user, token, tf) == _legacy_allowed(user, token, tf)
+
+
+def test_offerings_are_built_once_per_plan_and_copied_per_call():
+    entitlements._plan_offerings.cache_clear()
+    a, b = User(id=1, plan="PRO"), User(id=2, plan="PRO")
+
+    first = get_user_entitlements(a)
+    first["offerings"][0]["stats"] = {"win_rate": 1}  # routers enrich their copy
+    second = get_user_entitlements(b)
+
+    assert "stats" not in second["offerings"][0]
+    info = entitlements._plan_offerings.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
+    assert allowed_pairs(a) is allowed_pairs(b)
+    assert isinstance(allowed_pairs(a), frozenset)
+
+
+def test_expired_trial_locks_everything():
+    user = User(id=1, plan="FREE", plan_expires_at=datetime.utcnow() - timedelta(days=1))
+    assert allowed_pairs(user) == frozenset()
+    with pytest.raises(Exception) as exc:
+        assert_token_allowed(user, "btc")
+    assert exc.value.status_code == 403
+    assert assert_token_allowed(User(id=2, plan="PRO"), " xrp ") == "XRP"
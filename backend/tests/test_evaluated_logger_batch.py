@@ -0,0 +1,116 @@
+import csv
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import evaluated_logger
+from evaluated_logger import EVAL_HEADERS, _EvaluatedIndex, _reconcile_evaluations
+from models_db import SIGNAL_CLOSED, Base, Signal, SignalEvaluation, StrategyPerformanceDaily
+
+T0 = datetime(2025, 5, 1, 8, 0)
+
+
+def _iso(dt):
+    return dt.replace(microsecond=0).isoformat() + "Z"
+
+
+def _write(path, rows, header=True):
+    with path.open("a", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=EVAL_HEADERS)
+        if header:
+            w.writeheader()
+        w.writerows(rows)
+
+
+def test_evaluated_index_reads_only_appended_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(evaluated_logger, "EVAL_DIR", tmp_path)
+    path = tmp_path / "BTC.evaluated.csv"
+    index = _EvaluatedIndex()
+
+    assert index.get("BTC") == set()
+
+    _write(path, [{"signal_ts": "a"}, {"signal_ts": "b"}])
+    assert index.get("BTC") == {"a", "b"}
+
+    reads = []
+    original = _EvaluatedIndex._read_from
+
+    def spy(p, offset, fieldnames, ts_set):
+        reads.append(offset)
+        return original(p, offset, fieldnames, ts_set)
+
+    monkeypatch.setattr(_EvaluatedIndex, "_read_from", staticmethod(spy))
+
+    # Nothing new on disk -> no parse at all
+    assert index.get("BTC") == {"a", "b"}
+    assert reads == []
+
+    # Appended rows -> only the tail is parsed
+    _write(path, [{"signal_ts": "c"}], header=False)
+    assert index.get("BTC") == {"a", "b", "c"}
+    assert reads and reads[0] > 0
+
+    # Truncated file -> full reload
+    path.unlink()
+    _write(path, [{"signal_ts": "z"}])
+    assert index.get("BTC") == {"z"}
+
+    # Rotated by the journal -> the segment's keys are still known
+    path.rename(tmp_path / "BTC.evaluated.20250501.csv")
+    _write(path, [{"signal_ts": "y"}])
+    assert index.get("BTC") == {"z", "y"}
+
+
+def test_reconcile_batches_token_rows_in_one_query():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    common = dict(token="ETH", timeframe="30m", direction="long", entry=100.0, source="lite")
+    db.add_all([
+        Signal(id=1, timestamp=T0, strategy_id="s1", **common),
+        Signal(id=2, timestamp=T0 + timedelta(hours=1, milliseconds=400), strategy_id="s1", **common),
+        Signal(id=3, timestamp=T0 + timedelta(hours=2), strategy_id="s1", **common),
+    ])
+    db.add(SignalEvaluation(signal_id=3, evaluated_at=T0, result="hit-sl", pnl_r=0.0))
+    db.commit()
+
+    rows = [
+        {"signal_ts": _iso(T0), "result": "hit-tp", "price_at_eval": "110"},  # exact
+        {"signal_ts": _iso(T0 + timedelta(hours=1)), "result": "hit-sl", "price_at_eval": "95"},  # ±1s
+        {"signal_ts": _iso(T0 + timedelta(hours=2)), "result": "hit-tp", "price_at_eval": "110"},  # already done
+        {"signal_ts": _iso(T0 + timedelta(hours=9)), "result": "neutral", "price_at_eval": "100"},  # no signal
+        {"signal_ts": "", "result": "hit-tp"},
+    ]
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+    assert _reconcile_evaluations(db, "eth", rows) == 2
+    db.commit()
+
+    signal_selects = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM signals" in s]
+    assert len(signal_selects) == 1
+
+    evals = {e.signal_id: e for e in db.query(SignalEvaluation).all()}
+    assert evals[1].result == "hit-tp" and evals[1].exit_price == 110.0
+    assert evals[2].result == "hit-sl"
+    assert evals[3].result == "hit-sl"  # untouched
+    assert {db.get(Signal, i).status for i in (1, 2)} == {SIGNAL_CLOSED}
+
+    perf = db.query(StrategyPerformanceDaily).one()
+    assert (perf.strategy_id, perf.wins, perf.losses, perf.count) == ("s1", 1, 1, 2)
+    db.close()
+
+
+@pytest.mark.parametrize("offset_ms", [0, 900])
+def test_match_signals_uses_each_signal_once(offset_ms):
+    from types import SimpleNamespace
+
+    sig = SimpleNamespace(id=7)
+    ts = T0 + timedelta(milliseconds=offset_ms)
+    rows = [{"_ts": T0}, {"_ts": T0}]
+    matches = evaluated_logger._match_signals(rows, [(ts, sig)])
+    assert [m[1].id for m in matches] == [7]
@@ -0,0 +1,91 @@
+from core import evaluation_memo
+from core.cache import cache
+
+
+def test_last_closed_bar_ts_clock_and_candles():
+    # 2025-01-01 14:23:45 UTC
+    now = 1735741425.0
+    hour_ms = 3600 * 1000
+
+    # Clock: current bar opened 14:00 -> last closed opened 13:00
+    assert evaluation_memo.last_closed_bar_ts("1h", now=now) == 1735740000000 - hour_ms
+
+    # Candles: the forming 14:00 bar is skipped, 13:00 is the last closed
+    candles = [{"timestamp": 1735740000000 - hour_ms}, {"timestamp": 1735740000000}]
+    assert evaluation_memo.last_closed_bar_ts("1h", candles=candles, now=now) == 1735740000000 - hour_ms
+
+
+def test_memoize_computes_once_per_bar():
+    cache._memory_storage.clear()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [{"direction": "long"}]
+
+    args = ("donchian_v2", {"tp_atr": 2.0}, "BTC", "4h")
+    first = evaluation_memo.memoize(*args, 1000, "signals", compute)
+    second = evaluation_memo.memoize(*args, 1000, "signals", compute)
+    assert first == second == [{"direction": "long"}]
+    assert len(calls) == 1
+
+    # Returned values are copies: callers can't corrupt the memo
+    second[0]["direction"] = "short"
+    assert evaluation_memo.memoize(*args, 1000, "signals", compute)[0]["direction"] == "long"
+
+    # New bar -> new key -> recompute
+    evaluation_memo.memoize(*args, 2000, "signals", compute)
+    assert len(calls) == 2
+
+
+def test_memoize_caches_empty_results_and_separates_variants():
+    cache._memory_storage.clear()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return []
+
+    args = ("trend_following_native_v1", {}, "ETH", "1h", 1000, "watchlist")
+    evaluation_memo.memoize(*args, compute)
+    evaluation_memo.memoize(*args, compute)
+    assert len(calls) == 1
+
+    evaluation_memo.memoize(*args, compute, variant={"near_atr": 3.0})
+    assert len(calls) == 2
+
+
+def test_config_hash_is_order_independent():
+    assert evaluation_memo.config_hash({"a": 1, "b": 2}) == evaluation_memo.config_hash({"b": 2, "a": 1})
+    assert evaluation_memo.config_hash({"a": 1}) != evaluation_memo.config_hash({"a": 2})
+
+
+def test_data_key_tracks_the_forming_bar_and_no_data_is_not_cached():
+    cache._memory_storage.clear()
+    candles = [{"timestamp": 1000, "close": 10.0}, {"timestamp": 2000, "close": 11.0}]
+    key = evaluation_memo.data_key(candles)
+    # Same bar, new price -> new key (a mid-bar breakout is re-evaluated)
+    assert evaluation_memo.data_key(candles[:1] + [{"timestamp": 2000, "close": 11.5}]) != key
+    assert evaluation_memo.data_key([]) is None
+
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return []
+
+    # Failed fetch: an empty result is "no data", never stored as "no setup"
+    evaluation_memo.memoize("donchian_v2", {}, "BTC", "1d", None, "signals", compute)
+    evaluation_memo.memoize("donchian_v2", {}, "BTC", "1d", None, "signals", compute)
+    assert len(calls) == 2
+
+
+def test_scheduler_and_lite_configs_share_one_key():
+    from strategies.registry import get_registry, load_default_strategies
+
+    load_default_strategies()
+    registry = get_registry()
+    # Scheduler: registry default; LITE: parsed config_json (ignored by this strategy)
+    default = evaluation_memo.strategy_config(registry.get("donchian_v2"))
+    from_lite = evaluation_memo.strategy_config(registry.get("donchian_v2", config={"tp_atr": 2.0}))
+    assert default == from_lite and default["tp_atr"] == 2.0
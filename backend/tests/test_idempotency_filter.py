@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.idempotency_filter import MAYBE, NEW, SEEN, IdempotencyFilter, idempotency_filter, split_known
+from core.schemas import Signal
+from core.signal_logger import log_signals_bulk
+from models_db import Base, Signal as SignalDB
+
+
+def _session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_filter_lru_eviction_falls_back_to_maybe():
+    f = IdempotencyFilter(capacity=2)
+    assert f.check("a") == NEW
+    f.add_many(["a", "b", "c"])  # "a" evicted from the exact set, still in the Bloom
+    assert len(f) == 2
+    assert f.check("c") == SEEN
+    assert f.check("a") == MAYBE
+
+    stats = f.stats()
+    assert stats["lookups"] == 3
+    assert stats["exact_hits"] == 1
+    assert stats["hit_ratio"] == round(1 / 3, 4)
+
+
+def test_warm_and_exact_db_fallback():
+    db = _session()
+    recent = datetime.utcnow()
+    db.add_all([
+        SignalDB(timestamp=recent, token="BTC", timeframe="1h", direction="long", entry=1.0,
+                 idempotency_key="recent"),
+        SignalDB(timestamp=recent - timedelta(days=30), token="ETH", timeframe="1h", direction="long",
+                 entry=1.0, idempotency_key="old"),
+    ])
+    db.commit()
+
+    idempotency_filter.clear()
+    assert idempotency_filter.warm(db, days=3) == 1
+    assert split_known(["recent", "old"], db=db) == {"recent": SEEN, "old": NEW}
+
+    # Filter MAYBE (false positive or evicted key) -> exact DB answer
+    with patch.object(idempotency_filter, "check", return_value=MAYBE):
+        assert split_known(["old", "missing"], db=db) == {"old": SEEN, "missing": NEW}
+    assert idempotency_filter.stats()["db_confirmed"] == 1
+    db.close()
+
+
+def test_bulk_logger_skips_db_for_known_keys():
+    db = _session()
+    idempotency_filter.clear()
+    sig = Signal(
+        timestamp=datetime(2025, 1, 1, 14, 5), token="AAA", direction="long", entry=100.0,
+        timeframe="1h", strategy_id="s", mode="TEST", source="test",
+    )
+
+    with patch("core.signal_logger._write_to_csv"), patch("core.signal_logger._send_push_notification"):
+        assert log_signals_bulk([sig], db=db)[0]
+        with patch.object(db, "execute", side_effect=AssertionError("DB hit")):
+            assert log_signals_bulk([sig], db=db) == [None]
+
+    assert idempotency_filter.stats()["exact_hits"] == 1
+    db.close()
+
+
+def test_warm_keeps_the_newest_keys_when_over_capacity():
+    db = _session()
+    now = datetime.utcnow()
+    db.add_all([
+        SignalDB(timestamp=now - timedelta(hours=h), token="BTC", timeframe="1h", direction="long", entry=1.0,
+                 strategy_id=f"s{h}", idempotency_key=f"k{h}")
+        for h in range(4)
+    ])
+    db.commit()
+
+    f = IdempotencyFilter(capacity=2)
+    assert f.warm(db, days=1) == 2
+    # Newest two kept, oldest first in LRU order (k1 is evicted first)
+    assert list(f._keys) == ["k1", "k0"]
+    f.add("new")
+    assert f.check("k0") == SEEN and f.check("k1") == MAYBE
+    db.close()
@@ -0,0 +1,56 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models_db import Base, Signal, SignalEvaluation, User
+from routers import logs
+from routers.logs import gzip_chunks, iter_export
+
+T0 = datetime(2025, 3, 1)
+
+
+@pytest.fixture
+def factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    rows = []
+    for i in range(1, 1201):
+        rows.append(Signal(id=i, timestamp=T0 + timedelta(minutes=i), token="BTC" if i % 2 else "ETH",
+                           timeframe="1h", direction="long", entry=100.0, source="lite", mode="LITE",
+                           strategy_id="s", user_id=None if i % 3 else 7))
+    rows.append(SignalEvaluation(signal_id=1, evaluated_at=T0, result="WIN", pnl_r=1.5, exit_price=110.0))
+    db.add_all(rows)
+    db.commit()
+    db.close()
+    yield Session
+    engine.dispose()
+
+
+def test_ndjson_export_streams_in_bounded_chunks(factory, monkeypatch):
+    monkeypatch.setattr(logs, "EXPORT_CHUNK_BYTES", 4096)
+
+    chunks = list(iter_export(factory, User(id=1, plan="FREE"), token="btc"))
+    assert len(chunks) > 1
+    assert all(len(c) < 4096 + 2048 for c in chunks)
+
+    items = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    # odd ids = BTC, minus the multiples of 3 owned by user 7
+    assert [i["id"] for i in items] == [i for i in range(1, 1201) if i % 2 and i % 3]
+    assert items[0]["evaluation"]["result"] == "WIN"
+
+
+def test_csv_export_with_time_window_and_gzip(factory):
+    since, until = T0 + timedelta(minutes=10), T0 + timedelta(minutes=20)
+    body = b"".join(gzip_chunks(iter_export(factory, User(id=7, role="admin"), fmt="csv",
+                                            since=since, until=until)))
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(body).decode())))
+    assert [int(r["id"]) for r in rows] == list(range(10, 20))
+    assert rows[0]["result"] == ""
@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from routers import market
+
+app = FastAPI()
+app.include_router(market.router, prefix="/market")
+client = TestClient(app)
+
+
+def test_market_router_is_mounted():
+    with patch.object(market, "get_market_summary", return_value=[]):
+        assert TestClient(main.app).get("/market/summary").json() == {"current_prices": []}
+
+
+def test_summary_only_accepts_supported_symbols():
+    with patch.object(market, "get_market_summary", side_effect=lambda s: [{"symbol": x} for x in s]) as summary:
+        # web client: comma-separated
+        r = client.get("/market/summary", params={"symbols": "btc,ETHUSDT,doge"})
+        assert r.status_code == 200
+        assert summary.call_args[0][0] == ["BTC", "ETH", "DOGE"]
+
+        assert client.get("/market/summary").json()["current_prices"][0] == {"symbol": "BTC"}
+
+        r = client.get("/market/summary", params=[("symbols", "BTC"), ("symbols", "PEPE2")])
+        assert r.status_code == 400 and "PEPE2" in r.json()["detail"]
+        assert summary.call_count == 2
+
+    with patch.object(market, "get_ohlcv_data", return_value=[]) as ohlcv:
+        assert client.get("/market/ohlcv/notacoin").status_code == 400
+        assert client.get("/market/ohlcv/sol", params={"limit": 5000}).status_code == 422
+        ohlcv.assert_not_called()
@@ -0,0 +1,189 @@
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core import notification_outbox as outbox
+from core.idempotency_filter import idempotency_filter
+from core.schemas import Signal
+from core.signal_logger import log_signals_bulk
+from models_db import Base, NotificationOutbox, Signal as SignalRow, User
+from outbox_worker import OutboxWorker
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    idempotency_filter.clear()
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _sig(token):
+    return Signal(
+        timestamp=datetime(2025, 1, 1, 8), token=token, direction="long", entry=10.0,
+        timeframe="4h", strategy_id="TITAN_4h", mode="PRO", source="PLAN:PRO", tp=12.0, sl=9.0,
+    )
+
+
+def test_worker_delivers_outbox_batch(session_factory):
+    db = session_factory()
+    db.add_all([
+        User(email="a@x.io", hashed_password="x", plan="PRO", telegram_chat_id="111"),
+        User(email="b@x.io", hashed_password="x", plan="PREMIUM", telegram_chat_id="222"),
+        User(email="c@x.io", hashed_password="x", plan="TRADER", telegram_chat_id="333"),
+    ])
+    db.commit()
+
+    with patch("core.signal_logger._write_to_csv"):
+        log_signals_bulk([_sig("BTC"), _sig("ETH")], db=db, telegram_plan="PRO")
+
+    worker = OutboxWorker(session_factory=session_factory)
+    with patch("core.push_dispatcher.push_dispatcher.send_now", return_value={"success": 1}) as send_now, \
+            patch("services.telegram_queue.telegram_queue.send_tracked",
+                  side_effect=lambda items, timeout: {(ref, c): "sent" for c, _, ref in items}) as send:
+        assert worker.run_once() == 4
+        assert worker.run_once() == 0  # nothing left to claim
+
+    # Two push rows -> one coalesced notification
+    send_now.assert_called_once()
+    assert send_now.call_args[0][0] == "2 New Signals"
+    # PRO + legacy PREMIUM chats, both signals each; TRADER chat excluded
+    send.assert_called_once()
+    assert sorted(c for c, _, _ in send.call_args[0][0]) == ["111", "111", "222", "222"]
+    assert send.call_args[1]["timeout"] < outbox.VISIBILITY_SECONDS / 2
+
+    statuses = {o.status for o in db.query(NotificationOutbox).all()}
+    assert statuses == {"sent"}
+    s = outbox.stats(db)
+    assert s["backlog"] == 0 and s["sent"] >= 4
+    db.close()
+
+
+def test_failed_delivery_is_retried_later(session_factory):
+    db = session_factory()
+    outbox.add_to_session(db, outbox.outbox_rows(_sig("SOL"), signal_id=None))
+    db.commit()
+
+    worker = OutboxWorker(session_factory=session_factory)
+    with patch("core.push_dispatcher.push_dispatcher.send_now", side_effect=RuntimeError("boom")):
+        assert worker.run_once() == 1
+
+    row = db.query(NotificationOutbox).one()
+    db.refresh(row)
+    assert row.status == "pending"
+    assert row.attempts == 1
+    assert row.available_at > datetime.utcnow()
+    assert worker.run_once() == 0  # backoff: not claimable yet
+    db.close()
+
+
+def test_claims_do_not_overlap_and_stale_claims_are_reclaimed(session_factory):
+    db = session_factory()
+    outbox.add_to_session(db, outbox.outbox_rows(_sig("XRP"), signal_id=None))
+    db.commit()
+
+    first = outbox.claim_batch(db, "w1")
+    assert len(first) == 1
+    assert outbox.claim_batch(db, "w2") == []
+
+    # Crashed worker: claim expires after the visibility timeout
+    first[0].claimed_at = datetime.utcnow() - timedelta(seconds=outbox.VISIBILITY_SECONDS + 1)
+    db.commit()
+    again = outbox.claim_batch(db, "w2")
+    assert [r.id for r in again] == [first[0].id]
+    assert json.loads(again[0].payload)["title"] == "New Signal: LONG XRP"
+    db.close()
+
+
+def test_partial_telegram_failure_retries_only_missing_chats(session_factory):
+    db = session_factory()
+    db.add_all([
+        User(email="a@x.io", hashed_password="x", plan="PRO", telegram_chat_id="111"),
+        User(email="b@x.io", hashed_password="x", plan="PRO", telegram_chat_id="222"),
+        User(email="c@x.io", hashed_password="x", plan="PRO", telegram_chat_id="333"),
+    ])
+    outbox.add_to_session(db, outbox.outbox_rows(_sig("ADA"), signal_id=None, telegram_plan="PRO")[1:])
+    db.commit()
+
+    status = {"111": "sent", "222": "failed", "333": "rejected"}
+    worker = OutboxWorker(session_factory=session_factory)
+    with patch("services.telegram_queue.telegram_queue.send_tracked",
+               side_effect=lambda items, timeout: {(ref, c): status[c] for c, _, ref in items}):
+        assert worker.run_once() == 1
+
+    row = db.query(NotificationOutbox).one()
+    db.refresh(row)
+    # Not marked sent: retried with backoff, only for the chat that failed
+    assert row.status == "pending" and row.attempts == 1
+    assert json.loads(row.payload)["chat_ids"] == ["222"]
+
+    row.available_at = datetime.utcnow()
+    db.commit()
+    with patch("services.telegram_queue.telegram_queue.send_tracked",
+               side_effect=lambda items, timeout: {(ref, c): "sent" for c, _, ref in items}) as send:
+        assert worker.run_once() == 1
+    assert [c for c, _, _ in send.call_args[0][0]] == ["222"]
+    db.refresh(row)
+    assert row.status == "sent"
+    db.close()
+
+
+def test_prune_deletes_old_sent_rows(session_factory):
+    db = session_factory()
+    outbox.add_to_session(db, outbox.outbox_rows(_sig("DOT"), signal_id=None, telegram_plan="PRO"))
+    db.commit()
+    old, recent = db.query(NotificationOutbox).order_by(NotificationOutbox.id).all()
+    outbox.mark_sent(db, [old, recent])
+    old.sent_at = datetime.utcnow() - timedelta(days=outbox.RETENTION_DAYS + 1)
+    db.commit()
+
+    assert OutboxWorker(session_factory=session_factory).prune() == 1
+    assert [o.id for o in db.query(NotificationOutbox).all()] == [recent.id]
+    db.close()
+
+
+def test_deleting_a_signal_keeps_its_outbox_rows():
+    engine = create_engine("sqlite:///:memory:")
+    event.listen(engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    with patch("core.signal_logger._write_to_csv"):
+        log_signals_bulk([_sig("LINK")], db=db, telegram_plan="PRO")
+    signal = db.query(SignalRow).one()
+    outbox.mark_sent(db, db.query(NotificationOutbox).all())
+
+    # DELETE /signals/{id}: not blocked by the (sent) notifications
+    db.delete(signal)
+    db.commit()
+    rows = db.query(NotificationOutbox).all()
+    assert len(rows) == 2 and all(r.signal_id is None for r in rows)
+    db.close()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("result, status", [
+    ({"ok": False, "error": "Missing VAPID_PRIVATE_KEY"}, "sent"),  # not configured: nothing to deliver
+    ({"ok": False, "error": "pool exhausted"}, "pending"),
+    ({"success": 0, "failed": 3, "removed": 0}, "pending"),  # no device reached
+    ({"success": 2, "failed": 1, "removed": 0}, "sent"),
+])
+def test_push_errors_are_retried(session_factory, result, status):
+    db = session_factory()
+    outbox.add_to_session(db, outbox.outbox_rows(_sig("AVAX"), signal_id=None))
+    db.commit()
+
+    with patch("core.push_dispatcher.push_dispatcher.send_now", return_value=result):
+        assert OutboxWorker(session_factory=session_factory).run_once() == 1
+    row = db.query(NotificationOutbox).one()
+    db.refresh(row)
+    assert row.status == status
+    db.close()
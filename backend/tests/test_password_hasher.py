@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from core.password_hasher import PasswordHasher, build_context
+
+
+def test_pool_hash_verify_and_rehash_on_cost_change():
+    old = PasswordHasher(workers=1, rounds=4)
+    try:
+        hashed = old.hash("hunter2")
+        assert hashed.startswith("$2b$04$")
+        assert old.verify_and_update("hunter2", hashed) == (True, None)
+        assert old.verify("wrong", hashed) is False
+        assert old.verify("x", "not-a-hash") is False
+    finally:
+        old.shutdown()
+
+    # Cost factor raised -> verify returns an upgraded hash
+    new = PasswordHasher(workers=0, rounds=5)
+    ok, upgraded = new.verify_and_update("hunter2", hashed)
+    assert ok and upgraded.startswith("$2b$05$")
+    assert build_context(5).verify("hunter2", upgraded)
+    assert new.stats()["pending"] == 0
+
+
+def test_bounded_queue_rejects_when_saturated():
+    hasher = PasswordHasher(workers=0, max_pending=1, wait_seconds=0.05, rounds=4)
+    gate, started = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        gate.wait(2)
+        return "done"
+
+    t = threading.Thread(target=lambda: hasher._submit(slow))
+    t.start()
+    started.wait(2)
+    assert hasher.stats()["pending"] == 1
+
+    with pytest.raises(HTTPException) as exc:
+        hasher.hash("x")
+    assert exc.value.status_code == 503
+
+    gate.set()
+    t.join()
+    stats = hasher.stats()
+    assert (stats["pending"], stats["rejected"], stats["max_pending_seen"]) == (0, 1, 1)
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core import signal_evaluator
+from core.alert_index import alert_index
+from models_db import SIGNAL_CLOSED, Base, Signal, SignalEvaluation, User, WatchAlert
+from services import alerts_checker
+from services.price_feed import PriceFeed
+
+
+def test_ticks_carry_range_since_previous_tick():
+    feed = PriceFeed(tokens=["BTC", "ETH"], exchanges=["binance", "bybit"], stale_seconds=30)
+    received = []
+    feed.subscribe(received.append)
+
+    ticks = feed.replay([("BTC", 100), ("BTC", 104), ("BTC", 97), ("ETH", 10), ("DOGE", 1)], batch=3)
+    assert [(t.token, t.price, t.high, t.low) for t in ticks] == [("BTC", 97, 104, 97), ("ETH", 10, 10, 10)]
+    assert received == [ticks[:1], ticks[1:]]
+
+    # Next tick's range starts at the previous tick price
+    (tick,) = feed.replay([("BTC", 99)])
+    assert (tick.high, tick.low) == (99, 97)
+    assert feed.price("btc") == 99 and feed.price("XRP") is None
+
+
+def test_less_preferred_exchange_only_while_primary_is_stale():
+    feed = PriceFeed(tokens=["BTC"], exchanges=["binance", "bybit"], stale_seconds=30)
+    assert feed.update("BTC", 100, "binance", ts=1000)
+    assert not feed.update("BTC", 150, "bybit", ts=1010)  # spread would fake a range
+    assert feed.stale_tokens(now=1020) == []
+    assert feed.stale_tokens(now=1031) == ["BTC"]
+    assert feed.update("BTC", 101, "bybit", ts=1031)
+    assert feed.update("BTC", 102, "binance", ts=1032)
+    (tick,) = feed.dispatch()
+    assert (tick.price, tick.high, tick.source) == (102, 102, "binance")
+    assert feed.stats()["dropped"] == 1
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(alerts_checker, "SessionLocal", factory)
+    monkeypatch.setattr(alerts_checker, "_last_sync", None)
+    monkeypatch.setattr(signal_evaluator, "_open_levels_at", None)
+    monkeypatch.setattr(alerts_checker, "get_current_price", lambda t: pytest.fail("polled price"))
+    monkeypatch.delenv("TELEGRAM_DEFAULT_CHAT_ID", raising=False)
+    alert_index.clear()
+
+    session = factory()
+    now = datetime.utcnow()
+    session.add(User(id=1, email="feed@test.io", plan="PRO"))
+    session.add_all([
+        WatchAlert(id=1, user_id=1, token="BTC", timeframe="4H", side="LONG", trigger_price=105.0,
+                   status="PENDING", expires_at=now + timedelta(hours=1)),
+        WatchAlert(id=2, user_id=1, token="BTC", timeframe="4H", side="SHORT", trigger_price=95.0,
+                   status="PENDING", expires_at=now + timedelta(hours=1)),
+        Signal(id=10, timestamp=now - timedelta(hours=1), token="BTC", timeframe="1h", direction="long",
+               entry=100.0, tp=106.0, sl=90.0, strategy_id="s", is_saved=1),
+        Signal(id=11, timestamp=now - timedelta(hours=1), token="BTC", timeframe="1h", direction="short",
+               entry=100.0, tp=80.0, sl=104.0, strategy_id="s", is_saved=1),
+        # Past its 24h horizon (e.g. scheduler was down): left to the bar pass
+        Signal(id=12, timestamp=now - timedelta(hours=30), token="BTC", timeframe="1h", direction="long",
+               entry=100.0, tp=105.0, sl=90.0, strategy_id="s", is_saved=1),
+    ])
+    session.commit()
+    yield session
+    alert_index.clear()
+    session.close()
+    engine.dispose()
+
+
+def test_replay_drives_alerts_and_evaluator(db):
+    feed = PriceFeed(tokens=["BTC"])
+    feed.subscribe(alerts_checker.on_price_ticks)
+    feed.subscribe(lambda ticks: signal_evaluator.evaluate_on_ticks(db, ticks))
+
+    # 100 -> spike to 106 -> back to 101 inside one tick: the range catches it
+    feed.replay([("BTC", 100)])
+    feed.replay([("BTC", 106), ("BTC", 101)], batch=2)
+    db.expire_all()
+
+    assert db.get(WatchAlert, 1).status == "TRIGGERED"
+    assert db.get(WatchAlert, 2).status == "PENDING"
+    evals = {e.signal_id: e for e in db.query(SignalEvaluation)}
+    assert evals[10].result == "WIN" and evals[10].exit_price == 106.0
+    assert evals[11].result == "LOSS" and evals[11].exit_price == 104.0
+    assert db.get(Signal, 10).status == SIGNAL_CLOSED
+    assert 12 not in evals and db.get(Signal, 12).status != SIGNAL_CLOSED
+
+    # Closed signals are not evaluated twice
+    assert signal_evaluator.evaluate_on_ticks(db, feed.replay([("BTC", 110)])) == 0
+
+
+def test_concurrent_passes_write_one_evaluation(db):
+    sig = db.get(Signal, 10)
+    now = datetime.utcnow()
+    win = signal_evaluator._evaluation_row(sig, "WIN", 106.0, now)
+    loss = signal_evaluator._evaluation_row(sig, "LOSS", 90.0, now)
+
+    # Tick pass and bar pass both resolved signal 10 from their own snapshot
+    assert signal_evaluator._write_results(db, {10: sig}, [win], []) == 1
+    assert signal_evaluator._write_results(db, {10: sig}, [loss], []) == 0
+    assert [(e.signal_id, e.result) for e in db.query(SignalEvaluation)] == [(10, "WIN")]
@@ -0,0 +1,146 @@
+import pytest
+
+from core import price_oracle as oracle_mod
+from core.cache import cache
+from core.market_data_api import get_current_price, get_market_summary
+from core.price_oracle import CACHE_KEY, PriceOracle, normalize_symbol
+from market_data import get_price_snapshot
+from rag_context import _get_realtime_snapshot
+
+PRICES = {"BTC": 100000.0, "ETH": 3000.0, "SOL": 150.0, "DOGE": 0.2}
+
+
+class FakeExchange:
+    def __init__(self, ex_id, fail=False):
+        self.id = ex_id
+        self.fail = fail
+        self.calls = []
+
+    def load_markets(self):
+        return {f"{t}/USDT": {} for t in PRICES}
+
+    def fetch_tickers(self, pairs):
+        self.calls.append(list(pairs))
+        if self.fail:
+            raise RuntimeError("exchange down")
+        return {p: {"symbol": p, "last": PRICES[p.split("/")[0]], "percentage": 1.5, "baseVolume": 10.0,
+                    "timestamp": 1_700_000_000_000} for p in pairs}
+
+
+@pytest.fixture
+def exchanges():
+    cache.delete(CACHE_KEY)
+    made = {}
+
+    def factory(ex_id):
+        made[ex_id] = FakeExchange(ex_id, fail=(ex_id == "binance"))
+        return made[ex_id]
+
+    yield made, factory
+    cache.delete(CACHE_KEY)
+
+
+def test_one_batched_fetch_serves_every_symbol(exchanges):
+    made, factory = exchanges
+    oracle = PriceOracle(tokens=["BTC", "ETH", "SOL", "XRP"], exchanges=["binance", "bybit"],
+                         refresh_seconds=60, exchange_factory=factory)
+
+    quotes = oracle.get_many(["btc", "ETH/USDT", "SOLUSDT"])
+    assert {t: q.price for t, q in quotes.items()} == {"BTC": 100000.0, "ETH": 3000.0, "SOL": 150.0}
+    # binance failed -> bybit; unlisted XRP filtered out of the batch
+    assert made["bybit"].calls == [["BTC/USDT", "ETH/USDT", "SOL/USDT"]]
+
+    for _ in range(20):
+        assert oracle.price("BTC") == 100000.0
+    assert len(made["bybit"].calls) == 1  # served from memory
+
+    meta = quotes["BTC"].as_dict()
+    assert meta["exchange"] == "bybit" and meta["stale"] is False and meta["age_s"] >= 0
+    assert meta["change_24h"] == 1.5 and quotes["BTC"].age_seconds(now=quotes["BTC"].fetched_at + 5) == 5
+
+    # New symbol: tracked from now on, no fetch of its own on the read path
+    assert oracle.price("DOGE") is None
+    assert len(made["bybit"].calls) == 1
+    oracle.refresh(force=True)
+    assert oracle.price("DOGE") == 0.2
+    assert made["bybit"].calls[-1] == ["BTC/USDT", "ETH/USDT", "SOL/USDT", "DOGE/USDT"]
+
+
+def test_only_listed_symbols_are_tracked_up_to_the_cap(exchanges):
+    made, factory = exchanges
+    oracle = PriceOracle(tokens=["BTC"], exchanges=["bybit"], refresh_seconds=60, exchange_factory=factory,
+                         max_symbols=3)
+    # Markets not loaded yet: accepted, dropped once the listing is known
+    assert oracle.track(["NOTACOIN"]) == ["NOTACOIN"]
+    oracle.refresh()
+    assert oracle.tokens == ["BTC"]
+
+    assert oracle.track(["nope", "ETH", "SOL", "DOGE"]) == ["ETH", "SOL"]
+    assert oracle.stats()["untracked"] == 2  # NOPE unlisted, DOGE over the cap
+
+
+def test_stale_quotes_are_misses(exchanges, monkeypatch):
+    _, factory = exchanges
+    oracle = PriceOracle(tokens=["BTC", "SOL"], exchanges=["bybit"], refresh_seconds=60, exchange_factory=factory)
+    oracle.refresh()
+    monkeypatch.setattr(oracle_mod, "price_oracle", oracle)
+    monkeypatch.setattr(PriceOracle, "running", property(lambda self: True))  # no refresh on read
+    monkeypatch.setattr(oracle_mod, "STALE_SECONDS", -1)
+
+    assert oracle.get("BTC").stale and oracle.price("BTC") is None
+    monkeypatch.setattr("core.market_data_api.get_ohlcv_data", lambda *a, **kw: [{"close": 99.0}])
+    assert get_current_price("BTC") == 99.0
+    assert _get_realtime_snapshot("btc") is None
+
+
+def test_workers_adopt_the_shared_board(exchanges):
+    made, factory = exchanges
+    first = PriceOracle(tokens=["BTC", "ETH"], exchanges=["bybit"], refresh_seconds=60, exchange_factory=factory)
+    first.refresh()
+    fetches = len(made["bybit"].calls)
+
+    other = PriceOracle(tokens=["BTC", "ETH"], exchanges=["bybit"], refresh_seconds=60, exchange_factory=factory)
+    assert other.price("ETH") == 3000.0
+    assert len(made["bybit"].calls) == fetches
+    assert other.stats()["shared_hits"] == 1
+
+    # A worker tracking more symbols adopts what the board has and fetches only the rest
+    wider = PriceOracle(tokens=["BTC", "ETH", "SOL"], exchanges=["bybit"], refresh_seconds=60,
+                        exchange_factory=factory)
+    assert wider.price("SOL") == 150.0
+    assert made["bybit"].calls[-1] == ["SOL/USDT"]
+    assert wider.stats()["shared_hits"] == 1
+    assert {t: q.exchange for t, q in wider.peek_many(["BTC", "ETH", "SOL"]).items()} == {
+        "BTC": "bybit", "ETH": "bybit", "SOL": "bybit"
+    }
+
+
+def test_callers_read_from_the_oracle(exchanges, monkeypatch):
+    _, factory = exchanges
+    oracle = PriceOracle(tokens=["BTC", "SOL"], exchanges=["bybit"], refresh_seconds=60, exchange_factory=factory)
+    monkeypatch.setattr(oracle_mod, "price_oracle", oracle)
+
+    assert get_current_price("BTCUSDT") == 100000.0
+    snap = get_price_snapshot("sol")
+    assert (snap.symbol, snap.price, snap.exchange, snap.change_24h) == ("SOL/USDT", 150.0, "bybit", 1.5)
+    assert _get_realtime_snapshot("btc") == "BTC = 100000.00 USD · 24h: +1.50%"
+    assert normalize_symbol("btc-usdt") == "BTC"
+
+
+def test_market_summary_is_assembled_from_the_board(exchanges, monkeypatch):
+    made, factory = exchanges
+    oracle = PriceOracle(tokens=["BTC", "ETH", "SOL"], exchanges=["bybit"], refresh_seconds=60,
+                         exchange_factory=factory)
+    oracle.refresh()
+    monkeypatch.setattr(oracle_mod, "price_oracle", oracle)
+    monkeypatch.setattr(PriceOracle, "running", property(lambda self: True))  # background refresher up
+
+    rows = get_market_summary(["sol", "BTC", "DOGE", "sol"])
+    assert [(r["symbol"], r["price"], r["change_24h"]) for r in rows] == [("SOL", 150.0, 1.5), ("BTC", 100000.0, 1.5)]
+    assert rows[0]["stale"] is False
+    assert get_market_summary(["ETH"])[0]["price"] == 3000.0
+    assert len(made["bybit"].calls) == 1  # no network on reads
+
+    # DOGE joined the board: quoted after the next background refresh
+    oracle.refresh(force=True)
+    assert get_market_summary(["DOGE"])[0]["price"] == 0.2
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from core import async_queries
+from core.principal_cache import Principal, PrincipalCache, principal_cache
+from core.security import create_access_token
+from routers.auth_new import get_current_user_async
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+    users = {
+        "p@test.io": SimpleNamespace(id=5, email="p@test.io", plan="TRADER", role="user",
+                                     hashed_password="secret", telegram_chat_id="42"),
+    }
+
+    async def fake_lookup(email):
+        calls.append(email)
+        return users.get(email)
+
+    monkeypatch.setattr(async_queries, "user_by_email", fake_lookup)
+    principal_cache.clear()
+    yield calls, users
+    principal_cache.clear()
+
+
+def test_hit_skips_lookup_until_invalidated(lookups):
+    calls, users = lookups
+    token = create_access_token(data={"sub": "p@test.io"})
+    before = principal_cache.stats()
+
+    async def scenario():
+        first = await get_current_user_async(token)
+        second = await get_current_user_async(token)
+        assert first is second and calls == ["p@test.io"]
+        assert isinstance(first, Principal) and not hasattr(first, "hashed_password")
+        with pytest.raises(AttributeError):
+            first.plan = "PRO"  # frozen
+
+        # Plan change elsewhere -> invalidate -> fresh snapshot
+        users["p@test.io"].plan = "PRO"
+        principal_cache.invalidate(5)
+        third = await get_current_user_async(token)
+        assert third.plan == "PRO" and len(calls) == 2
+
+    asyncio.run(scenario())
+    after = principal_cache.stats()
+    assert tuple(after[k] - before[k] for k in ("hits", "misses", "invalidations")) == (1, 2, 1)
+
+
+def test_entries_respect_ttl_token_exp_and_capacity():
+    cache = PrincipalCache(ttl=60, max_entries=2)
+    p = Principal(id=1, email="a@x.io")
+
+    cache.put("h.c.sig-expired", p, token_exp=time.time() - 1)
+    assert cache.get("h.c.sig-expired") is None
+
+    cache.put("h.c.sig-short", p, token_exp=time.time() + 0.05)
+    assert cache.get("h.c.sig-short") is p
+    time.sleep(0.06)
+    assert cache.get("h.c.sig-short") is None
+
+    for sig in ("a", "b", "c"):
+        cache.put(f"h.c.{sig}", Principal(id=ord(sig), email=sig))
+    assert cache.get("h.c.a") is None and cache.get("h.c.c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_jwt_is_rejected_not_cached(lookups):
+    token = create_access_token(data={"sub": "p@test.io"}, expires_delta=timedelta(seconds=-5))
+    with pytest.raises(Exception):
+        asyncio.run(get_current_user_async(token))
+    assert principal_cache.stats()["entries"] == 0
@@ -0,0 +1,115 @@
+import base64
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.push_dispatcher import PushDispatcher
+from models_db import Base, PushSubscription
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+class _FakePushService(BaseHTTPRequestHandler):
+    """Local push service: /gone/* -> 410, anything else -> 201."""
+
+    received = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        _FakePushService.received.append(self.path)
+        self.send_response(410 if self.path.startswith("/gone") else 201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_push():
+    _FakePushService.received = []
+    server = HTTPServer(("127.0.0.1", 0), _FakePushService)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _subscriber_keys():
+    key = ec.generate_private_key(ec.SECP256R1())
+    p256dh = key.public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    return _b64(p256dh), _b64(os.urandom(16))
+
+
+def _vapid_key():
+    key = ec.generate_private_key(ec.SECP256R1())
+    return _b64(key.private_numbers().private_value.to_bytes(32, "big"))
+
+
+def test_dispatcher_coalesces_and_removes_gone(fake_push, session_factory):
+    db = session_factory()
+    for i in range(6):
+        p256dh, auth = _subscriber_keys()
+        path = "gone" if i < 2 else "ok"
+        db.add(PushSubscription(endpoint=f"{fake_push}/{path}/{i}", p256dh=p256dh, auth=auth))
+    db.commit()
+
+    dispatcher = PushDispatcher(max_workers=4, session_factory=session_factory)
+    with patch.dict(os.environ, {"VAPID_PRIVATE_KEY": _vapid_key()}):
+        dispatcher.enqueue("New Signal: LONG BTC", "b1", {"token": "BTC"})
+        dispatcher.enqueue("New Signal: SHORT ETH", "b2", {"token": "ETH"})
+        res = dispatcher.flush()
+
+    # Two signals -> one notification per subscriber
+    assert len(_FakePushService.received) == 6
+    assert res == {"success": 4, "failed": 0, "removed": 2}
+    assert db.query(PushSubscription).count() == 4
+
+    stats = dispatcher.stats()
+    assert stats["notifications"] == 1
+    assert stats["coalesced_signals"] == 2
+    assert stats["delivery_rate"] == round(4 / 6, 4)
+    assert stats["cached_subscriptions"] is None  # invalidated after removal
+    db.close()
+
+
+def test_subscription_cache_refreshes_on_change(session_factory):
+    db = session_factory()
+    db.add(PushSubscription(endpoint="https://push.example/1", p256dh="k", auth="a"))
+    db.commit()
+
+    dispatcher = PushDispatcher(probe_seconds=0, session_factory=session_factory)
+    first = dispatcher.subscriptions()
+    assert dispatcher.subscriptions() is first  # unchanged fingerprint -> same cached list
+
+    db.add(PushSubscription(endpoint="https://push.example/2", p256dh="k", auth="a"))
+    db.commit()
+    assert len(dispatcher.subscriptions()) == 2
+    db.close()
+
+
+def test_coalesce_single_passthrough():
+    title, body, data = PushDispatcher.coalesce([{"title": "t", "body": "b", "data": {"x": 1}}])
+    assert (title, body, data) == ("t", "b", {"x": 1})
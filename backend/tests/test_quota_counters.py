@@ -0,0 +1,148 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import pytest
+
+from core import quota_counters
+from core.cache import cache
+from models_db import Base, DailyUsage
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: session.statements.append(a[2]))
+    yield session
+    session.close()
+    engine.dispose()
+
+
+class _Pipeline:
+    def __init__(self, client):
+        self.client, self.ops = client, []
+
+    def __getattr__(self, name):
+        return lambda *a, **kw: self.ops.append((name, a, kw))
+
+    def execute(self):
+        self.client.round_trips += 1
+        return [getattr(self.client, "_" + name)(*a, **kw) for name, a, kw in self.ops]
+
+
+class FakeRedis:
+    """Minimal in-process stand-in for the handful of commands the counters use."""
+
+    def __init__(self):
+        self.data, self.sets, self.round_trips = {}, {}, 0
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    def register_script(self, source):
+        assert "EXISTS" in source
+
+        def incr_if_exists(keys, args):
+            # Same effect as the Lua script, in one round trip
+            self.round_trips += 1
+            if keys[0] not in self.data:
+                return None
+            count = self._incr(keys[0])
+            self._sadd(keys[1], keys[0])
+            return count
+
+        return incr_if_exists
+
+    def _set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = int(value)
+        return True
+
+    def _incr(self, key):
+        return self._incrby(key, 1)
+
+    def _incrby(self, key, n):
+        self.data[key] = int(self.data.get(key, 0)) + n
+        return self.data[key]
+
+    def _expire(self, key, ttl):
+        return True
+
+    def _sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    def incrby(self, key, n):
+        self.round_trips += 1
+        return self._incrby(key, n)
+
+    def sadd(self, key, *members):
+        self._sadd(key, *members)
+
+    def spop(self, key, count):
+        members = list(self.sets.pop(key, set()))
+        return members[:count]
+
+    def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+
+def test_db_counter_is_one_atomic_statement(db, monkeypatch):
+    monkeypatch.setattr(cache, "redis_client", None)
+
+    db.statements.clear()
+    assert [quota_counters.increment(db, 1, "advisor_chat", "2025-01-01") for _ in range(3)] == [1, 2, 3]
+    upserts = [s for s in db.statements if s.lstrip().upper().startswith("INSERT")]
+    assert len(upserts) == 3 and all("ON CONFLICT" in s and "RETURNING" in s for s in upserts)
+    assert not [s for s in db.statements if s.lstrip().upper().startswith("SELECT")]
+
+    assert quota_counters.increment(db, 1, "ai_analysis", "2025-01-01") == 1
+    assert quota_counters.increment(db, 2, "advisor_chat", "2025-01-01") == 1
+    assert db.query(DailyUsage).filter_by(user_id=1, feature="advisor_chat").one().count == 3
+
+
+def test_redis_counter_seeds_from_db_and_flushes_back(db, monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(cache, "redis_client", fake)
+
+    # Redis lost its key mid-day: continue from daily_usage
+    db.add(DailyUsage(user_id=7, feature="advisor_chat", date="2025-01-01", count=4))
+    db.commit()
+    assert quota_counters.increment(db, 7, "advisor_chat", "2025-01-01") == 5
+
+    fake.round_trips = 0
+    db.statements.clear()
+    assert quota_counters.increment(db, 7, "advisor_chat", "2025-01-01") == 6
+    assert fake.round_trips == 1  # one script call per check, once seeded
+    assert quota_counters.increment(db, 8, "ai_analysis", "2025-01-01") == 1
+    assert fake.round_trips == 3  # miss + seed pipeline for the brand-new key
+    assert len(db.statements) == 1  # seed lookup for the brand-new key only
+
+    assert quota_counters.flush(db) == 2
+    rows = {(r.user_id, r.feature): r.count for r in db.query(DailyUsage)}
+    assert rows == {(7, "advisor_chat"): 6, (8, "ai_analysis"): 1}
+    assert quota_counters.flush(db) == 0
+
+
+def test_concurrent_first_calls_never_see_an_unseeded_counter(db, monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(cache, "redis_client", fake)
+    db.add(DailyUsage(user_id=3, feature="advisor_chat", date="2025-01-01", count=10))
+    db.commit()
+
+    # Both callers miss the key and read the same base before either seeds it
+    real_stored = quota_counters._stored_count
+    seen = []
+
+    def racing_stored(*a):
+        base = real_stored(*a)
+        if not seen:
+            seen.append(None)
+            seen[0] = quota_counters._increment_redis(db, fake, 3, "advisor_chat", "2025-01-01")
+        return base
+
+    monkeypatch.setattr(quota_counters, "_stored_count", racing_stored)
+    second = quota_counters.increment(db, 3, "advisor_chat", "2025-01-01")
+    assert sorted(seen + [second]) == [11, 12]
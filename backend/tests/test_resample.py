@@ -0,0 +1,112 @@
+import time
+
+from market_data import resample
+from market_data.resample import BASE_MS, SeriesStore, resample_candles, verify_against_native
+
+DAY_MS = 24 * BASE_MS
+T0 = 1_717_200_000_000  # 2024-06-01 00:00 UTC
+
+
+def _hourly(start_ms, n):
+    return [{"timestamp": start_ms + i * BASE_MS, "open": 100.0 + i, "high": 101.0 + i + (i % 3),
+             "low": 99.0 + i - (i % 2), "close": 100.5 + i, "volume": 10.0 + i} for i in range(n)]
+
+
+def _until_now(since_ms, max_candles):
+    now_bar = int(time.time() * 1000) // BASE_MS * BASE_MS
+    return _hourly(since_ms, min(max_candles, (now_bar - since_ms) // BASE_MS + 1))
+
+
+def test_buckets_align_to_session_boundaries_with_partial_bars():
+    # Starts at 02:00 -> the 00:00-04:00 bucket is incomplete and dropped
+    base = _hourly(T0 + 2 * BASE_MS, 2 + 4 + 4 + 3)
+    out = resample_candles(base, "4H", now_ms=T0 + 14 * BASE_MS)
+
+    assert [(c["timestamp"] - T0) // BASE_MS for c in out] == [4, 8, 12]
+    first = out[0]
+    bars = base[2:6]
+    assert first["open"] == bars[0]["open"] and first["close"] == bars[-1]["close"]
+    assert first["high"] == max(b["high"] for b in bars) and first["low"] == min(b["low"] for b in bars)
+    assert first["volume"] == sum(b["volume"] for b in bars)
+    # 12:00 bucket has 3 of 4 bars and is still forming
+    assert [c["partial"] for c in out] == [False, False, True]
+
+    daily = resample_candles(_hourly(T0, 30), "1d", now_ms=T0 + 30 * BASE_MS)
+    assert [c["timestamp"] for c in daily] == [T0, T0 + DAY_MS]
+    assert [c["partial"] for c in daily] == [False, True]
+
+
+def test_verification_against_native():
+    base = _hourly(T0, 12)
+    resampled = resample_candles(base, "4h", now_ms=T0 + 12 * BASE_MS)
+    native = [dict(c) for c in resampled] + [{"timestamp": T0 + 12 * BASE_MS}]  # + native forming bar
+    assert verify_against_native(resampled, native) == {"compared": 3, "mismatches": [], "ok": True}
+
+    native[1]["close"] += 0.5
+    res = verify_against_native(resampled, native)
+    assert not res["ok"] and res["mismatches"][0]["field"] == "close"
+
+
+def test_store_serves_three_timeframes_from_one_series():
+    calls = []
+
+    def fetch_since(symbol, tf, since_ms, max_candles, source):
+        calls.append((symbol, tf, since_ms))
+        return _until_now(since_ms, max_candles), source or "binance"
+
+    native = {}
+    store = SeriesStore(fetch_since=fetch_since, fetch_native=lambda s, tf, limit, src: native.get(tf, []),
+                        tail_ttl=60)
+
+    daily = store.candles("btc", "1d", 30)
+    four = store.candles("BTC", "4H", 100)
+    hourly = store.candles("BTC", "1h", 200)
+    assert (len(daily), len(four), len(hourly)) == (30, 100, 200)
+    assert calls == [calls[0]] and calls[0][1] == "1h"  # one backfill, 1h only
+    assert daily[-1]["partial"] and not daily[-2]["partial"]
+    assert daily[-2]["timestamp"] % DAY_MS == 0
+
+    # Native 4h disagrees -> served natively (None) until a later check passes
+    bad = [dict(c) for c in four[-6:]]
+    bad[0]["high"] *= 1.01
+    native["4h"] = bad
+    store._verified.clear()
+    assert store.candles("BTC", "4h", 10) is None
+    assert store.stats()["native_only"] == ["BTC:4h"]
+    assert store.candles("BTC", "15m", 10) is None
+
+
+def test_series_source_is_recorded_and_used_for_tail_and_verification(monkeypatch):
+    up = {"binance": False, "bybit": True}
+    fetches, native_sources = [], []
+
+    def fetch_since(symbol, tf, since_ms, max_candles, source):
+        fetches.append(source)
+        for ex in [source] if source else ["binance", "bybit"]:
+            if up.get(ex):
+                return _until_now(since_ms, max_candles), ex
+        return [], None
+
+    def fetch_native(symbol, tf, limit, source):
+        native_sources.append(source)
+        return []
+
+    store = SeriesStore(fetch_since=fetch_since, fetch_native=fetch_native, tail_ttl=0)
+    assert store.candles("ETH", "4h", 10)
+    assert store.stats()["sources"] == {"ETH": "bybit"} and store.source("eth") == "bybit"
+    # Verified against the exchange the 1h series came from, not a race winner
+    assert native_sources == ["bybit"]
+
+    store.base_series("ETH", 10)
+    assert fetches[-1] == "bybit"  # tail pinned to the series' source
+
+    # Source down: the whole series is rebuilt from another exchange and verified again
+    up.update(binance=True, bybit=False)
+    series = store.base_series("ETH", 10)
+    assert fetches[-2:] == ["bybit", None]
+    assert store.stats()["sources"] == {"ETH": "binance"}
+    monkeypatch.setattr(resample, "series_store", store)
+    assert resample.resampled_source("ETH") == "binance (resampled)"
+    assert series[-1]["timestamp"] - series[0]["timestamp"] == (len(series) - 1) * BASE_MS
+    assert store.candles("ETH", "4h", 10)
+    assert native_sources == ["bybit", "binance"]
@@ -0,0 +1,84 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.idempotency_filter import idempotency_filter
+from core.schemas import Signal
+from core.signal_logger import log_signals_bulk
+from models_db import Base, NotificationOutbox, Signal as SignalDB
+
+
+@pytest.fixture(params=[True, False], ids=["returning", "insert_or_ignore"])
+def db_session(request):
+    engine = create_engine("sqlite:///:memory:")
+    # False -> exercise the fallback for SQLite builds without RETURNING
+    engine.dialect.insert_returning = request.param
+    idempotency_filter.clear()
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+def _sig(token, ts, direction="long"):
+    return Signal(
+        timestamp=ts, token=token, direction=direction, entry=100.0, timeframe="1h",
+        strategy_id="bulk_strat", mode="TEST", source="test", user_id=None,
+    )
+
+
+def test_log_signals_bulk_returns_only_new_rows(db_session):
+    ts = datetime(2025, 1, 1, 14, 23, 45)
+    batch = [
+        _sig("AAA", ts),
+        _sig("BBB", ts),
+        _sig("AAA", ts.replace(minute=59)),  # same candle -> duplicate inside the batch
+    ]
+
+    with patch("core.signal_logger._write_to_csv") as csv_mock, \
+            patch("core.signal_logger._send_push_notification") as push_mock:
+        first = log_signals_bulk(batch, db=db_session, telegram_plan="PRO")
+        assert first[0] and first[1] and first[0] != first[1]
+        assert first[2] is None
+        assert csv_mock.call_count == 2
+
+        # Re-run: AAA/BBB already stored, CCC is new
+        second = log_signals_bulk(batch[:2] + [_sig("CCC", ts)], db=db_session)
+        assert second[:2] == [None, None]
+        assert second[2]
+
+        # Notifications go to the outbox (same transaction), never inline
+        assert push_mock.call_count == 0
+
+    outbox = db_session.query(NotificationOutbox).order_by(NotificationOutbox.id).all()
+    assert [(o.signal_id, o.channel) for o in outbox] == [
+        (first[0], "push"), (first[0], "telegram"),
+        (first[1], "push"), (first[1], "telegram"),
+        (second[2], "push"),
+    ]
+    assert all(o.status == "pending" for o in outbox)
+
+    rows = db_session.query(SignalDB).order_by(SignalDB.token).all()
+    assert [r.token for r in rows] == ["AAA", "BBB", "CCC"]
+    assert rows[0].timestamp == datetime(2025, 1, 1, 14, 0, 0)
+    assert rows[0].is_saved == 0
+
+
+def test_log_signals_bulk_empty():
+    assert log_signals_bulk([]) == []
+
+
+def test_log_signals_bulk_sets_lifecycle_status(db_session):
+    ts = datetime(2025, 1, 2, 10, 0, 0)
+    watch = _sig("WWW", ts)
+    watch.source = "lite:watchlist:bulk_strat"
+
+    with patch("core.signal_logger._write_to_csv"):
+        ids = log_signals_bulk([_sig("OOO", ts), watch], db=db_session)
+
+    assert db_session.get(SignalDB, ids[0]).status == "OPEN"
+    assert db_session.get(SignalDB, ids[1]).status == "WATCH"
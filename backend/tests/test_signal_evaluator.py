@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core import signal_evaluator
+from core.signal_evaluator import EVAL_TF_MS, _to_ms, evaluate_pending_signals, resolve_first_touch
+from models_db import (
+    SIGNAL_CLOSED,
+    SIGNAL_OPEN,
+    SIGNAL_WATCH,
+    Base,
+    Signal,
+    SignalEvaluation,
+    StrategyPerformanceDaily,
+)
+
+T0 = datetime(2025, 3, 1, 0, 0)
+
+
+def _candles(rows, start=T0):
+    """rows: (high, low, close) per 1h bar starting at `start`."""
+    base = _to_ms(start)
+    return [
+        {"timestamp": base + i * EVAL_TF_MS, "open": c, "high": h, "low": lo, "close": c, "volume": 1.0}
+        for i, (h, lo, c) in enumerate(rows)
+    ]
+
+
+def test_resolve_first_touch_paths():
+    candles = _candles([(101, 99, 100), (103, 98, 102), (111, 100, 110), (112, 89, 95)])
+    start = np.full(4, _to_ms(T0), dtype=np.int64)
+    res = resolve_first_touch(
+        candles,
+        start_ms=start,
+        is_long=np.array([True, True, False, True]),
+        tp=np.array([110.0, 150.0, 90.0, 111.5]),
+        sl=np.array([97.0, 97.5, 115.0, 88.0]),
+    )
+    # long TP 110: high wick on bar 2
+    # long SL 97.5: first low below it is bar 3 (89)
+    # short TP 90: bar 3 low 89
+    # long TP 111.5: bar 3 high 112 (SL 88 never touched)
+    assert res["outcome"].tolist() == [1, -1, 1, 1]
+    assert res["bar_idx"].tolist() == [2, 3, 3, 3]
+
+
+def test_same_bar_touch_is_conservative_and_window_respected():
+    candles = _candles([(120, 80, 100), (101, 99, 100)])
+    both = resolve_first_touch(
+        candles, np.array([_to_ms(T0)]), np.array([True]), np.array([110.0]), np.array([90.0])
+    )
+    assert both["outcome"].tolist() == [-1]
+
+    # Scan starts after bar 0 -> the wide bar is ignored
+    later = resolve_first_touch(
+        candles, np.array([_to_ms(T0) + EVAL_TF_MS]), np.array([True]), np.array([110.0]), np.array([90.0])
+    )
+    assert later["outcome"].tolist() == [0]
+
+
+def test_evaluate_pending_signals_bulk_and_progress():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    now = T0 + timedelta(hours=5, minutes=30)
+    common = dict(token="BTC", timeframe="4h", entry=100.0, source="t")
+    db.add_all([
+        Signal(id=1, timestamp=T0, direction="long", tp=110.0, sl=95.0, strategy_id="donchian_v2", **common),  # TP wick
+        Signal(id=2, timestamp=T0, direction="long", tp=150.0, sl=50.0, **common),  # still open
+        Signal(id=3, timestamp=T0 - timedelta(hours=20), direction="short", tp=50.0, sl=150.0,
+               strategy_id="donchian_v2", **common),  # timeout (horizon bar: 03:00)
+    ])
+    db.commit()
+
+    candles = _candles([(101, 99, 100), (111, 100, 104), (105, 101, 103), (104, 102, 103), (104, 102, 103),
+                        (104, 102, 103)])
+    with patch.object(signal_evaluator, "get_ohlcv_since", return_value=candles) as fetch, \
+            patch.object(signal_evaluator, "datetime", wraps=datetime) as dt:
+        dt.utcnow.return_value = now
+        assert evaluate_pending_signals(db) == 2
+
+    # One range fetch for the token, starting at the oldest pending signal
+    fetch.assert_called_once()
+    assert fetch.call_args[0][2] == _to_ms(T0 - timedelta(hours=20))
+
+    evals = {e.signal_id: e for e in db.query(SignalEvaluation).all()}
+    assert evals[1].result == "WIN" and evals[1].exit_price == 110.0
+    assert evals[3].result == "LOSS"  # short timed out at 103 (> 0.5% against)
+    assert evals[3].exit_price == 103.0
+    assert 2 not in evals
+
+    # Open signal remembers the last CLOSED bar (04:00; the 05:00 bar is forming)
+    open_sig = db.get(Signal, 2)
+    assert open_sig.last_evaluated_bar_ts == T0 + timedelta(hours=4)
+
+    # Lifecycle status is flipped in the same transaction as the evaluation
+    assert open_sig.status == SIGNAL_OPEN
+    assert db.get(Signal, 1).status == SIGNAL_CLOSED
+    assert db.get(Signal, 3).status == SIGNAL_CLOSED
+
+    # ...and so is the strategy rollup (1 WIN + 1 LOSS on the same day)
+    perf = db.query(StrategyPerformanceDaily).one()
+    assert (perf.strategy_id, perf.wins, perf.losses, perf.count) == ("donchian_v2", 1, 1, 2)
+    db.close()
+
+
+def test_evaluate_pending_signals_uses_status():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    common = dict(token="ETH", timeframe="1h", direction="long", entry=100.0, tp=110.0, sl=95.0)
+    db.add_all([
+        Signal(id=1, timestamp=T0, source="t", status=SIGNAL_CLOSED, **common),
+        Signal(id=2, timestamp=T0, source="lite:watchlist:x", status=SIGNAL_WATCH, **common),
+    ])
+    db.commit()
+
+    candles = _candles([(111, 99, 110), (104, 102, 103)])
+    with patch.object(signal_evaluator, "get_ohlcv_since", return_value=candles), \
+            patch.object(signal_evaluator, "datetime", wraps=datetime) as dt:
+        dt.utcnow.return_value = T0 + timedelta(hours=3)
+        # CLOSED rows are never re-scanned; WATCH rows are still evaluated
+        assert evaluate_pending_signals(db) == 1
+
+    assert [e.signal_id for e in db.query(SignalEvaluation).all()] == [2]
+    assert db.get(Signal, 2).status == SIGNAL_CLOSED
+    db.close()
+
+
+def test_scan_window_starts_at_emission_and_stops_at_horizon():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    common = dict(token="SOL", direction="long", entry=100.0, sl=90.0, source="t")
+    db.add_all([
+        # 4h bar opens 00:00, signal really emitted at 02:30 -> first scanned bar is 03:00
+        Signal(id=1, timestamp=T0, emitted_at=T0 + timedelta(hours=2, minutes=30), timeframe="4h", tp=110.0,
+               **common),
+        # 1h signal at 00:00: TP only touched after its 24h horizon
+        Signal(id=2, timestamp=T0, emitted_at=T0, timeframe="1h", tp=114.0, **common),
+    ])
+    db.commit()
+
+    rows = [(101, 99, 100)] * 30
+    rows[1] = (112, 99, 100)  # 01:00: before signal 1 was emitted
+    rows[23] = (104, 99, 103)  # 23:00: last bar inside signal 2's window
+    rows[25] = (115, 99, 104)  # after the horizon
+    candles = _candles(rows)
+    with patch.object(signal_evaluator, "get_ohlcv_since", return_value=candles) as fetch, \
+            patch.object(signal_evaluator, "datetime", wraps=datetime) as dt:
+        dt.utcnow.return_value = T0 + timedelta(hours=30)
+        assert evaluate_pending_signals(db) == 2
+
+    assert fetch.call_args[0][2] == _to_ms(T0)
+    evals = {e.signal_id: e for e in db.query(SignalEvaluation).all()}
+    # Signal 1: the 01:00 wick predates it; its window (03:00 +24h) sees the 25:00 wick
+    assert evals[1].result == "WIN" and evals[1].exit_price == 110.0
+    # Signal 2: timeout priced at the horizon bar close, not WIN at 25:00 nor candles[-1]
+    assert evals[2].result == "WIN" and evals[2].exit_price == 103.0
+    db.close()
@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import Request
+
+from core import async_queries
+from models_db import SIGNAL_CLOSED, Base, Signal, SignalEvaluation, User
+from routers.signals import get_signals
+
+T0 = datetime(2025, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    # In-memory DB -> async_queries uses the threadpool fallback with this factory
+    monkeypatch.setattr(async_queries, "_sync_session", factory)
+    session = factory()
+    session.statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: session.statements.append(a[2]))
+
+    user = User(id=1, email="feed@test.io")
+    session.add(user)
+    rows = []
+    for i in range(1, 8):
+        # 2 rows share each timestamp -> the id tie-breaker matters
+        rows.append(Signal(id=i, timestamp=T0 - timedelta(hours=i // 2), token="BTC", timeframe="1h",
+                           direction="long", entry=100.0, tp=110.0, sl=95.0, source="lite",
+                           user_id=None, is_saved=1, strategy_id=f"s{i}"))
+    rows.append(Signal(id=50, timestamp=T0, token="BTC", direction="long", source="verification",
+                       is_saved=1, strategy_id="v"))
+    rows.append(Signal(id=51, timestamp=T0, token="BTC", direction="long", source="lite",
+                       user_id=99, is_saved=1, strategy_id="other"))
+    rows[0].status = SIGNAL_CLOSED
+    rows.append(SignalEvaluation(signal_id=1, evaluated_at=T0, result="WIN", pnl_r=1.5, exit_price=110.0))
+    session.add_all(rows)
+    session.commit()
+    session.refresh(user)
+    session.user = user
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _request(etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/signals/", "headers": headers})
+
+
+def _call(db, etag=None, **kw):
+    response = Response()
+    result = asyncio.run(get_signals(
+        request=_request(etag), response=response, current_user=db.user,
+        **{"limit": 50, "offset": 0, "cursor": None, "token": None, "strategy_id": None, **kw},
+    ))
+    return result, response
+
+
+def test_keyset_pages_cover_feed_in_order_without_lazy_loads(db):
+    seen, cursor = [], None
+    while True:
+        db.statements.clear()
+        items, response = _call(db, limit=3, cursor=cursor)
+        # 1 page query + 1 selectinload of evaluations, independent of page size
+        assert len(db.statements) == 2
+        seen += [i["id"] for i in items]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    legacy, _ = _call(db)
+    assert seen == [i["id"] for i in legacy]
+    assert seen == [1, 3, 2, 5, 4, 7, 6]
+
+    first = legacy[0]
+    assert first["entryPrice"] == 100.0 and first["type"] == "LONG" and first["status"] == "CLOSED"
+    assert first["evaluation"]["result"] == "WIN"
+    assert legacy[1]["status"] == "ACTIVE" and legacy[1]["evaluation"] is None
+
+    # Old offset paging still works
+    page, _ = _call(db, limit=2, offset=2)
+    assert [i["id"] for i in page] == [2, 5]
+
+
+def test_etag_returns_304_until_page_changes(db):
+    _, response = _call(db, limit=3)
+    etag = response.headers["ETag"]
+
+    not_modified, _ = _call(db, etag=etag, limit=3)
+    assert isinstance(not_modified, Response) and not_modified.status_code == 304
+
+    db.get(Signal, 3).status = SIGNAL_CLOSED
+    db.commit()
+    items, response = _call(db, etag=etag, limit=3)
+    assert isinstance(items, list) and response.headers["ETag"] != etag
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core import strategy_rollups
+from models_db import Base, Signal, SignalEvaluation, StrategyConfig, StrategyPerformanceDaily
+
+T0 = datetime(2025, 4, 1, 12, 0)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _evaluate(db, sig_id, strategy_id, token, result, pnl_r, when=T0):
+    """Writes one evaluation + its rollup contribution in one transaction (like the writers)."""
+    db.add(Signal(id=sig_id, timestamp=when - timedelta(minutes=sig_id), token=token, timeframe="4h",
+                  direction="long", entry=100.0, source="t", strategy_id=strategy_id))
+    db.add(SignalEvaluation(signal_id=sig_id, evaluated_at=when, result=result, pnl_r=pnl_r))
+    strategy_rollups.apply_evaluations(
+        db, [strategy_rollups.rollup_entry(strategy_id, token, "4h", when, result, pnl_r)]
+    )
+    db.commit()
+
+
+def test_incremental_rollup_matches_rebuild(db):
+    db.add(StrategyConfig(strategy_id="donchian_v2", win_rate=0.0, total_signals=0))
+    db.commit()
+
+    _evaluate(db, 1, "donchian_v2", "btc", "WIN", 1.5)
+    _evaluate(db, 2, "donchian_v2", "BTC", "hit-sl", -1.0)
+    _evaluate(db, 3, "donchian_v2", "BTC", "BE", 0.0)
+    _evaluate(db, 4, "donchian_v2", "ETH", "hit-tp", 2.0, when=T0 + timedelta(days=1))
+    _evaluate(db, 5, "donchian_v2", "ETH", "neutral", 0.0, when=T0 + timedelta(days=1))
+    _evaluate(db, 6, "other", "ETH", "LOSS", -1.0)
+
+    rows = {
+        (r.token, r.day): (r.wins, r.losses, r.breakeven, r.count, r.sum_r)
+        for r in db.query(StrategyPerformanceDaily).filter_by(strategy_id="donchian_v2")
+    }
+    assert rows == {
+        ("BTC", "2025-04-01"): (1, 1, 1, 3, 0.5),
+        ("ETH", "2025-04-02"): (1, 0, 0, 2, 2.0),
+    }
+
+    totals = strategy_rollups.strategy_totals(db)
+    assert totals["donchian_v2"]["count"] == 5
+    assert totals["donchian_v2"]["win_rate"] == 40.0
+
+    # StrategyConfig refreshed in the same transaction
+    cfg = db.query(StrategyConfig).filter_by(strategy_id="donchian_v2").one()
+    assert (cfg.total_signals, cfg.win_rate) == (5, 40.0)
+
+    # Rebuild from evaluations gives the same rollup
+    before = sorted(
+        (r.strategy_id, r.token, r.timeframe, r.day, r.wins, r.losses, r.breakeven, r.count, r.sum_r)
+        for r in db.query(StrategyPerformanceDaily)
+    )
+    db.query(StrategyPerformanceDaily).delete()
+    db.commit()
+    assert strategy_rollups.rebuild(db) == 3
+    after = sorted(
+        (r.strategy_id, r.token, r.timeframe, r.day, r.wins, r.losses, r.breakeven, r.count, r.sum_r)
+        for r in db.query(StrategyPerformanceDaily)
+    )
+    assert after == before
+
+
+def test_open_results_and_unknown_strategy_are_skipped():
+    assert strategy_rollups.rollup_entry("s", "BTC", "4h", T0, "open", 0.0) is None
+    assert strategy_rollups.rollup_entry(None, "BTC", "4h", T0, "WIN", 1.0) is None
+
+
+def test_marketplace_offering_stats():
+    from routers.strategies import _offering_stats
+
+    totals = {
+        ("donchian_v2", "4h"): {"wins": 3, "losses": 1, "breakeven": 0, "count": 4, "sum_r": 3.5},
+        ("donchian_v2", "1h"): {"wins": 0, "losses": 5, "breakeven": 0, "count": 5, "sum_r": -5.0},
+        ("TITAN_BREAKOUT_4H", "4h"): {"wins": 1, "losses": 0, "breakeven": 0, "count": 1, "sum_r": 1.0},
+    }
+    offering = {"id": "TITAN_BREAKOUT_4H", "strategy_code": "TITAN_BREAKOUT", "timeframe": "4H"}
+    stats = _offering_stats(offering, totals)
+    assert stats == {"total_signals": 5, "wins": 4, "losses": 1, "win_rate": 80.0, "pnl_r": 4.5}
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from services.telegram_queue import TelegramQueue, TokenBucket
+
+
+class StubBotAPI:
+    """Local stub of the Bot API sendMessage endpoint (first call per chat -> 429 if asked)."""
+
+    def __init__(self, throttle_chats=(), retry_after=1):
+        self.throttle_chats = set(throttle_chats)
+        self.retry_after = retry_after
+        self.calls = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        self.calls.append((time.monotonic(), payload))
+        chat = payload["chat_id"]
+        if chat in self.throttle_chats:
+            self.throttle_chats.discard(chat)
+            return httpx.Response(
+                429,
+                json={"ok": False, "error_code": 429, "parameters": {"retry_after": self.retry_after}},
+            )
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": len(self.calls)}})
+
+
+def test_coalesces_per_chat_and_honours_retry_after():
+    stub = StubBotAPI(throttle_chats={"200"}, retry_after=0.2)
+    q = TelegramQueue(token="t", api_base="http://stub", transport=httpx.MockTransport(stub))
+
+    q.enqueue(100, "BTC LONG")
+    q.enqueue(100, "ETH SHORT")
+    q.enqueue(200, "BTC LONG")
+    res = q.flush_cycle(wait=True, timeout=5)
+
+    assert res == {"sent": 2, "failed": 0}
+    texts = {p["chat_id"]: p["text"] for _, p in stub.calls}
+    assert texts["100"] == "BTC LONG\n\nETH SHORT"
+    # chat 200: 429 then retried after retry_after
+    retries = [t for t, p in stub.calls if p["chat_id"] == "200"]
+    assert len(retries) == 2
+    assert retries[1] - retries[0] >= 0.18
+
+    stats = q.stats()
+    assert stats["coalesced"] == 1
+    assert stats["rate_limited"] == 1
+    assert stats["sent"] == 2
+
+
+def test_token_bucket_limits_rate():
+    async def _run():
+        bucket = TokenBucket(rate=20, capacity=1)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # 1 immediate + 4 refills at 20/s ~= 0.2s
+    assert asyncio.run(_run()) >= 0.18
+
+
+def test_flush_without_token_does_not_send(monkeypatch):
+    monkeypatch.delenv("TELEGRAM_BOT_TOKEN", raising=False)
+    monkeypatch.delenv("TRADERCOPILOT_BOT_TOKEN", raising=False)
+    q = TelegramQueue(token="", api_base="http://stub")
+    q.enqueue(1, "x")
+    assert q.flush_cycle() == {"sent": 0, "failed": 1}
+    assert q.stats()["pending_chats"] == 0
+
+
+def test_long_batches_split_at_message_boundaries(monkeypatch):
+    stub = StubBotAPI()
+    q = TelegramQueue(token="t", api_base="http://stub", transport=httpx.MockTransport(stub))
+    alert = "⚡ <b>PRO ALERT</b>\n🟢 <b>BTC LONG</b>\n" + "x" * 900
+    for _ in range(10):
+        q.enqueue(100, alert)
+    assert q.flush_cycle(wait=True, timeout=5) == {"sent": 3, "failed": 0}
+
+    texts = [p["text"] for _, p in stub.calls]
+    assert all(len(t) <= 4096 for t in texts)
+    # Every alert delivered whole (no tag cut in half), in order
+    assert [a for t in texts for a in t.split("\n\n")] == [alert] * 10
+    assert q.stats()["coalesced"] == 7
+
+    # Idle chats don't keep a bucket forever
+    monkeypatch.setattr("services.telegram_queue.CHAT_BUCKET_IDLE_SECONDS", 0)
+    q._chat_buckets["100"].updated -= 10
+    q._evict_idle_buckets()
+    assert q.stats()["chat_buckets"] == 0
+
+
+def test_oversized_single_alert_splits_at_lines():
+    parts = TelegramQueue._coalesce(["<b>a</b>\n" + "y" * 30, "z"], limit=20)
+    assert parts == ["<b>a</b>", "y" * 20, "y" * 10 + "\n\nz"]
+
+
+def test_send_tracked_reports_each_chat():
+    def api(request):
+        chat = json.loads(request.content)["chat_id"]
+        if chat == "300":
+            return httpx.Response(403, json={"ok": False, "description": "bot was blocked"})
+        if chat == "400":
+            return httpx.Response(502)
+        return httpx.Response(200, json={"ok": True})
+
+    q = TelegramQueue(token="t", api_base="http://stub", max_retries=0, transport=httpx.MockTransport(api))
+    items = [(100, "BTC", 1), (100, "ETH", 2), (300, "BTC", 1), (400, "BTC", 1)]
+    assert q.send_tracked(items, timeout=5) == {
+        (1, "100"): "sent", (2, "100"): "sent", (1, "300"): "rejected", (1, "400"): "failed",
+    }
+
+    # Not finished within the timeout -> failed (left for the caller to retry)
+    slow = TelegramQueue(token="t", api_base="http://stub", per_chat_rate=1, transport=httpx.MockTransport(api))
+    out = slow.send_tracked([(100, "x" * 4000, 1), (100, "y" * 4000, 2)], timeout=0.5)
+    assert out == {(1, "100"): "sent", (2, "100"): "failed"}
+
+    # No bot token: nothing delivered
+    assert TelegramQueue(token="", api_base="http://stub").send_tracked([(1, "x", "r")], timeout=1) == {
+        ("r", "1"): "failed"
+    }
@@ -6,7 +6,7 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database import SessionLocal
-from models_db import Signal, SignalEvaluation
+from models_db import SIGNAL_CLOSED, Signal, SignalEvaluation
 from backend.core.backtest_engine import BacktestEngine
 
 # --- CONFIG ---
@@ -87,6 +87,7 @@ def save_backtest_results(db, strategy_id, token, results):
             exit_price=t["exit"],
         )
         db.add(eval_obj)
+        sig.status = SIGNAL_CLOSED
         count += 1
 
     db.commit()
@@ -0,0 +1,38 @@
+import argparse
+import os
+import sys
+
+# Ensure backend dir is in path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+# Load Env BEFORE imports
+from core.config import load_env_if_needed  # noqa: E402
+
+load_env_if_needed()
+
+from database import SessionLocal  # noqa: E402
+from core import strategy_rollups  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild strategy_performance_daily from signal evaluations (backfills)."
+    )
+    parser.add_argument("--strategy", help="Only rebuild this strategy_id", default=None)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        rows = strategy_rollups.rebuild(session, strategy_id=args.strategy)
+        print(f"Done. {rows} rollup rows written.")
+    except Exception as e:
+        session.rollback()
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
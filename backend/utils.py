@@ -1,8 +1,9 @@
 from __future__ import annotations
-import csv
 from pathlib import Path
 from typing import Dict, Any
 
+from core.csv_journal import csv_journal, segments
+
 LOG_ROOT = Path("backend/logs")
 
 
@@ -12,19 +13,18 @@ def ensure_log_dirs() -> None:
 
 
 def log_row(mode: str, token: str, row: Dict[str, Any]) -> str:
-    ensure_log_dirs()
     path = LOG_ROOT / mode.upper() / f"{token.lower()}.csv"
-    write_header = not path.exists()
-    with path.open("a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=list(row.keys()))
-        if write_header:
-            w.writeheader()
-        w.writerow(row)
+    # Write-behind: header/mkdir los resuelve el journal al abrir el fichero
+    csv_journal.append(path, list(row.keys()), row)
     return str(path)
 
 
 def stream_csv(mode: str, token: str) -> str:
     path = LOG_ROOT / mode.upper() / f"{token.lower()}.csv"
-    if not path.exists():
-        return ""
-    return path.read_text(encoding="utf-8")
+    csv_journal.flush()
+    # Segmentos rotados primero; la cabecera solo una vez
+    parts = []
+    for i, seg in enumerate(segments(path)):
+        text = seg.read_text(encoding="utf-8")
+        parts.append(text if i == 0 else text.partition("\n")[2])
+    return "".join(parts)